@@ -1,84 +1,148 @@
+import bisect
+import heapq
 from datastructures.dcel import *
 from algorithms.triangulate import get_direction, Direction
+from datastructures import metrics
+from algorithms.stop import stop_requested
 
 
-def bruteforce_merge_adjacent_faces(dcel: DCEL):
+def bruteforce_merge_adjacent_faces(dcel: DCEL, stop=None):
     """
-    Merges faces by repeatedly picking an arbitrary face and attempting to merge it with an arbitrary neighbour.
-    It keeps doing this until this is no longer possible.
+    Merges faces by repeatedly picking a face and attempting to merge it with a neighbour, until this is no longer
+    possible. The faces that might still be merged are kept in a worklist: a merge can only make new merges possible
+    for the merged face and its neighbours, so only those are examined again. The worklist is ordered on the
+    position of the faces in dcel.faces, and delete_edge keeps the face that is examined (the neighbour is merged
+    into it), such that the faces are merged in the same order as when scanning all faces from the start after every
+    merge. If stop is given, the merging ends early once it is set, which leaves a convex cover as only faces that
+    stay convex are merged.
     """
 
+    convex = convex_after_deleting
+    if metrics.enabled:
+        convex = metrics.counted(convex_after_deleting, "merge_adjacent_attempts")
+
     def merge_face(face: Face):
+        """
+        Deletes the first edge of face whose deletion leaves a convex face, and returns the merged face, or None.
+        """
         edge = face.outer_component
-        if convex_after_deleting(edge):
-            dcel.delete_edge(edge)
-            return True
+        if convex(edge):
+            return dcel.delete_edge(edge)
         edge = edge.next
         while edge != face.outer_component:
-            if convex_after_deleting(edge):
-                dcel.delete_edge(edge)
-                return True
+            if convex(edge):
+                return dcel.delete_edge(edge)
             edge = edge.next
-        return False
+        return None
 
-    did_merge = True
-    while did_merge:
-        did_merge = False
-        for face in dcel.interior_faces():
-            did_merge = merge_face(face)
-            if did_merge:
-                break
+    def push(face: Face):
+        # Only interior faces are in order
+        if face in order and face not in queued:
+            heapq.heappush(worklist, (order[face], face))
+            queued.add(face)
 
+    faces = dcel.interior_faces()
+    order = {face: i for i, face in enumerate(faces)}
+    # A list ordered on the first element is a heap already
+    worklist = [(i, face) for i, face in enumerate(faces)]
+    queued = set(faces)
+    merges = 0
+    iterations = 0
+    while worklist:
+        if stop_requested(stop, iterations):
+            break
+        iterations += 1
+        _, face = heapq.heappop(worklist)
+        queued.discard(face)
+        # The face might have been merged into another one in the meantime
+        if face not in dcel.faces:
+            continue
+        merged = merge_face(face)
+        if merged is None:
+            continue
+        merges += 1
+        push(merged)
+        edge = merged.outer_component
+        push(edge.twin.incident_face)
+        edge = edge.next
+        while edge != merged.outer_component:
+            push(edge.twin.incident_face)
+            edge = edge.next
+    if metrics.enabled:
+        metrics.count("merge_adjacent_merges", merges)
 
-def hertel_mehlhorn(dcel: DCEL, permutation=None):
+
+def hertel_mehlhorn(dcel: DCEL, permutation=None, stop=None):
+    """
+    Deletes every diagonal (in the order of permutation, if given) whose deletion leaves a convex face. If stop is
+    given, the deletion ends early once it is set, which leaves a convex cover.
+    """
     diagonals = [h for h in dcel.half_edges if h.incident_face.type == FaceType.INTERIOR and h.twin.incident_face.type == FaceType.INTERIOR]
     # Permute the diagonals according to input function if it was given
     if permutation:
         permutation(diagonals=diagonals)
 
     # For each diagonal, remove it if the resulting face is convex
+    convex = convex_after_deleting
+    if metrics.enabled:
+        convex = metrics.counted(convex_after_deleting, "hertel_mehlhorn_attempts")
+    merges = 0
     for i in range(len(diagonals)):
+        if stop_requested(stop, i):
+            break
         diagonals[i].twin.marked = True
-        if not diagonals[i].marked and convex_after_deleting(diagonals[i]):
+        if not diagonals[i].marked and convex(diagonals[i]):
             dcel.delete_edge(diagonals[i])
+            merges += 1
+    if metrics.enabled:
+        metrics.count("hertel_mehlhorn_merges", merges)
 
     # Unmark all edges for later computations:
     for h in dcel.half_edges:
         h.marked = False
             
 
-def bruteforce_merge_indirect_neighbours(dcel: DCEL):
+def bruteforce_merge_indirect_neighbours(dcel: DCEL, stop=None):
     """
     Merges (non-adjacent) faces by repeatedly picking an arbitrary face and attempting to merge its neightbours with each other.
+
+    Whether two neighbours of a face can be merged only depends on the boundaries of the neighbours around the edges
+    they share with the face. So after a merge, only the pairs of edges of which one borders the merged face have to
+    be checked again, together with all pairs of the merged face and of the face whose neighbours were merged. The
+    faces with pairs to check are kept in a worklist ordered on their position in dcel.faces, along with the edges
+    whose pairs have to be checked (or None for all pairs). A merge keeps the neighbour across the first edge of the
+    pair, so the merged face keeps its position, such that the faces are merged in the same order as when scanning all
+    pairs of all faces from the start after every merge. If stop is given, the merging ends early once it is set,
+    which leaves a convex cover.
     """
 
     # This face will be set as the incident face of the twins of any new edges we will be adding.
-    dummy_face = Face()
-    dummy_face.type = FaceType.OUTER
+    dummy_face = dcel.new_face(FaceType.OUTER)
 
-    def merge_neighbouring_faces(face):
+    def merge_neighbouring_faces(face, dirty_edges):
         """
-        Iterates over all pairs of edges of face, attempting to merge their incident polygonss
+        Iterates over the pairs of edges of face of which at least one is in dirty_edges (all pairs if dirty_edges is
+        None), attempting to merge their incident polygons. Returns the merged face, or None.
         """
-        edge1 = face.outer_component
-        edge2 = edge1.next
-        while edge2 != face.outer_component:
-            if can_merge(edge1, edge2):
-                merge(edge1, edge2)
-                return True
-            edge2 = edge2.next
-        edge1 = edge1.next
-
-        while edge1 != face.outer_component:
-            edge2 = edge1.next
-            while edge2 != face.outer_component:
+        edges = [face.outer_component]
+        edge = face.outer_component.next
+        while edge != face.outer_component:
+            edges.append(edge)
+            edge = edge.next
+        if dirty_edges is not None:
+            dirty_positions = [i for i, edge in enumerate(edges) if edge in dirty_edges]
+
+        for i, edge1 in enumerate(edges):
+            if dirty_edges is None or edge1 in dirty_edges:
+                candidates = range(i + 1, len(edges))
+            else:
+                candidates = dirty_positions[bisect.bisect_right(dirty_positions, i):]
+            for j in candidates:
+                edge2 = edges[j]
                 if can_merge(edge1, edge2):
-                    merge(edge1, edge2)
-                    return True
-                edge2 = edge2.next
-            edge1 = edge1.next
-        
-        return False
+                    return merge(edge1, edge2)
+
+        return None
     
     def can_merge(edge1, edge2):
         """
@@ -89,6 +153,10 @@ def bruteforce_merge_indirect_neighbours(dcel: DCEL):
         if edge1.twin.incident_face.type != FaceType.INTERIOR or edge2.twin.incident_face.type != FaceType.INTERIOR:
             return False
 
+        # Both edges should border distinct faces
+        if edge1.twin.incident_face == edge2.twin.incident_face:
+            return False
+
         # If neither of the four new corners in the polygon are concave, we can merge
         if ((edge1.twin.origin != edge2.origin and
             get_direction(edge1.twin.prev.origin, edge1.twin.origin, edge2.origin) != Direction.LEFT and
@@ -108,11 +176,12 @@ def bruteforce_merge_indirect_neighbours(dcel: DCEL):
 
     def merge(edge1, edge2):
         """
-        Merges the faces edge1.twin.incident_face and edge2.twin.incident_face, adding edges if necessary
+        Merges the face edge2.twin.incident_face into edge1.twin.incident_face, adding edges if necessary, and
+        returns the merged face
         """
         if edge1.twin.origin != edge2.origin:
-            h1 = HalfEdge(edge1.twin.origin)
-            h2 = HalfEdge(edge2.origin)
+            h1 = dcel.new_half_edge(edge1.twin.origin)
+            h2 = dcel.new_half_edge(edge2.origin)
             h1.twin = h2
             h2.twin = h1
 
@@ -120,14 +189,15 @@ def bruteforce_merge_indirect_neighbours(dcel: DCEL):
             edge1.twin.prev.next = h1
             h1.next = edge2.twin.next
             edge2.twin.next.prev = h1
+            h1.incident_face = edge1.twin.incident_face
             h2.incident_face = dummy_face
         else:
             edge1.twin.prev.next = edge2.twin.next
             edge2.twin.next.prev = edge1.twin.prev
 
         if edge2.twin.origin != edge1.origin:
-            h3 = HalfEdge(edge2.twin.origin)
-            h4 = HalfEdge(edge1.origin)
+            h3 = dcel.new_half_edge(edge2.twin.origin)
+            h4 = dcel.new_half_edge(edge1.origin)
             h3.twin = h4
             h4.twin = h3
 
@@ -135,31 +205,74 @@ def bruteforce_merge_indirect_neighbours(dcel: DCEL):
             edge2.twin.prev.next = h3
             h3.next = edge1.twin.next
             edge1.twin.next.prev = h3
+            h3.incident_face = edge2.twin.incident_face
             h4.incident_face = dummy_face
         else:
             edge2.twin.prev.next = edge1.twin.next
             edge1.twin.next.prev = edge2.twin.prev
 
-        # Merge the faces into one
-        edge = edge1.twin.prev.next
-        while edge.incident_face != edge1.twin.incident_face:
-            edge.incident_face = edge1.twin.incident_face
-            edge = edge.next
-        edge.incident_face.outer_component = edge
-        dcel.faces.remove(edge2.twin.incident_face)
+        # The rotation indices of the endpoints are no longer valid
+        for v in (edge1.origin, edge1.twin.origin, edge2.origin, edge2.twin.origin):
+            dcel.set_rotation_index(v, None)
+
+        # Merge the faces into one, its boundary continues after edge1.twin with the boundary of the other face
+        f = dcel.merge_faces(edge1.twin.incident_face, edge2.twin.incident_face)
+        f.outer_component = edge1.twin.next
 
         # Update the incident faces of the twins such that we can not merge them again
         edge1.twin.incident_face = dummy_face
         edge2.twin.incident_face = dummy_face
+        return f
+
+    def push(face, edge=None):
+        """
+        Adds face to the worklist, to check the pairs with edge (or all pairs if edge is None).
+        """
+        # Only interior faces are in order
+        if face not in order:
+            return
+        if face not in dirty:
+            heapq.heappush(worklist, (order[face], face))
+            dirty[face] = None if edge is None else {edge}
+        elif dirty[face] is not None:
+            if edge is None:
+                dirty[face] = None
+            else:
+                dirty[face].add(edge)
 
+    if metrics.enabled:
+        can_merge = metrics.counted(can_merge, "merge_indirect_attempts")
 
-    did_merge = True
-    while did_merge:
-        did_merge = False
-        for face in dcel.interior_faces():
-            did_merge = merge_neighbouring_faces(face)
-            if did_merge:
-                break
+    faces = dcel.interior_faces()
+    order = {face: i for i, face in enumerate(faces)}
+    # A list ordered on the first element is a heap already
+    worklist = [(i, face) for i, face in enumerate(faces)]
+    dirty = dict.fromkeys(faces)
+    merges = 0
+    iterations = 0
+    while worklist:
+        if stop_requested(stop, iterations):
+            break
+        iterations += 1
+        _, face = heapq.heappop(worklist)
+        dirty_edges = dirty.pop(face)
+        # The face might have been merged into another one in the meantime
+        if face not in dcel.faces:
+            continue
+        merged = merge_neighbouring_faces(face, dirty_edges)
+        if merged is None:
+            continue
+        merges += 1
+        push(face)
+        push(merged)
+        edge = merged.outer_component
+        push(edge.twin.incident_face, edge.twin)
+        edge = edge.next
+        while edge != merged.outer_component:
+            push(edge.twin.incident_face, edge.twin)
+            edge = edge.next
+    if metrics.enabled:
+        metrics.count("merge_indirect_merges", merges)
 
 
 def convex_after_deleting(edge: HalfEdge):
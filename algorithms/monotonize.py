@@ -1,81 +1,86 @@
 from datastructures.dcel import *
 from datastructures.edgebst import *
+from algorithms.stop import stop_requested
 
 
-def monotonize_polygon(dcel: DCEL, verbose=False):
+def monotonize_polygon(dcel: DCEL, verbose=False, direction=0, stop=None):
     """
-    Subdivides the input polygon into y-monotone regions by inserting edges.
+    Subdivides the input polygon into y-monotone regions by inserting edges, where y is the vertical axis of a
+    sweep in the given direction (see sweep_coordinates). If stop is given, the sweep is abandoned once it is set,
+    leaving the DCEL only partly subdivided.
     """
+    types = dcel.vertex_types(direction)
 
-    def handle_vertex(vertex: Vertex, status):
-        if vertex.type == VertexType.START:
+    def is_merge(vertex: Vertex):
+        return vertex and types[vertex.index] == VertexType.MERGE
+
+    def handle_vertex(vertex: Vertex, status: EdgeBST):
+        vertex_type = types[vertex.index]
+        x, y = sweep_coordinates(vertex, direction)
+
+        if vertex_type == VertexType.START:
             # we state the left edge is the incident edge because of the counter clock wise rotation.
-            status = status.insert(vertex.incident_half_edge, vertex.y)
+            status.insert(vertex.incident_half_edge, y)
             vertex.incident_half_edge.helper = vertex
             vertex.incident_half_edge.twin.helper = vertex
 
-        if vertex.type == VertexType.END:
+        if vertex_type == VertexType.END:
             # we state the left edge is the prev of incident edge because of the counter clock wise rotation.
             edge = vertex.incident_half_edge.prev
-            if edge.helper and edge.helper.type == VertexType.MERGE:
+            if is_merge(edge.helper):
                 dcel.insert_edge(edge.helper, vertex)
-            status = status.delete(edge, vertex.y)
+            status.delete(edge, y)
 
-        if vertex.type == VertexType.SPLIT:
-            edge = status.range_query(rat(vertex.x), vertex.y)[0]
+        if vertex_type == VertexType.SPLIT:
+            edge = status.range_query(x, y)[0]
             dcel.insert_edge(edge.helper, vertex)
             edge.helper = vertex
-            edge.helper.twin = vertex
+            edge.twin.helper = vertex
             right_edge = vertex.incident_half_edge
-            status = status.insert(right_edge, vertex.y)
+            status.insert(right_edge, y)
             right_edge.helper = vertex
             right_edge.twin.helper = vertex
 
-        if vertex.type == VertexType.MERGE:
+        if vertex_type == VertexType.MERGE:
             right_edge = vertex.incident_half_edge.prev
-            if right_edge.helper and right_edge.helper.type == VertexType.MERGE:
+            if is_merge(right_edge.helper):
                 dcel.insert_edge(right_edge.helper, vertex)
-            status = status.delete(right_edge, vertex.y)
-            edge_prime = status.range_query(rat(vertex.x), vertex.y)[0]
-            if edge_prime.helper and edge_prime.helper.type == VertexType.MERGE:
+            status.delete(right_edge, y)
+            edge_prime = status.range_query(x, y)[0]
+            if is_merge(edge_prime.helper):
                 dcel.insert_edge(edge_prime.helper, vertex)
             edge_prime.helper = vertex
             edge_prime.twin.helper = vertex
 
-        if vertex.type == VertexType.REGULAR_RIGHT:
-            if (vertex.incident_half_edge.twin.origin.y > vertex.y or
-                vertex.incident_half_edge.twin.origin.y == vertex.y and
-                    vertex.incident_half_edge.twin.origin.x < vertex.x):
+        if vertex_type == VertexType.REGULAR_RIGHT:
+            next_x, next_y = sweep_coordinates(vertex.incident_half_edge.twin.origin, direction)
+            if next_y > y or next_y == y and next_x < x:
                 upper_edge = vertex.incident_half_edge
                 lower_edge = vertex.incident_half_edge.prev
             else:
                 upper_edge = vertex.incident_half_edge.prev
                 lower_edge = vertex.incident_half_edge
-            if upper_edge.helper and upper_edge.helper.type == VertexType.MERGE:
+            if is_merge(upper_edge.helper):
                 dcel.insert_edge(upper_edge.helper, vertex)
-            status = status.delete(upper_edge, vertex.y)
-            status = status.insert(lower_edge, vertex.y)
+            status.delete(upper_edge, y)
+            status.insert(lower_edge, y)
             lower_edge.helper = vertex
 
-        if vertex.type == VertexType.REGULAR_LEFT:
-            edge = status.range_query(rat(vertex.x), vertex.y)[0]
-            if edge.helper and edge.helper.type == VertexType.MERGE:
+        if vertex_type == VertexType.REGULAR_LEFT:
+            edge = status.range_query(x, y)[0]
+            if is_merge(edge.helper):
                 dcel.insert_edge(edge.helper, vertex)
             edge.helper = vertex
 
-        return status
     if verbose:
         print("Subdividing the polygon into y-monotone pieces...")
-    vertices = dcel.vertices
-    vertices.sort(key=lambda coordinate: (-coordinate.y, coordinate.x))
-    status = EdgebstNode()
-    for i in range(len(vertices)):
-        vertex = vertices[i]
-        status = handle_vertex(vertex, status)
+    status = EdgeBST(direction)
+    for i, vertex in enumerate(dcel.event_order(direction)):
+        if stop_requested(stop, i):
+            break
+        handle_vertex(vertex, status)
 
-    # Now that we're finished editing the DCEL we can recompute  the faces
     if verbose:
         print("Finished subdividing the polygon into y-monotone pieces.")
-    dcel.recompute_faces()
 
     return dcel
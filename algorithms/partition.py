@@ -0,0 +1,218 @@
+from datastructures.dcel import DCEL, Face, FaceType
+from datastructures import metrics
+from algorithms.stop import stop_requested
+from algorithms.triangulate import (highest_leftmost, extract_boundaries, merge_boundaries, get_direction, Direction,
+                                    is_convex)
+
+
+class Diagonal:
+    """
+    A half-edge of a diagonal in a triangulation that is not in the DCEL, with the attributes that the permutations
+    of hertel_mehlhorn use. If the diagonal is in the DCEL already, edge is its half-edge.
+    """
+    __slots__ = ("origin", "twin", "incident_face", "edge")
+
+    def __init__(self, origin, twin, incident_face, edge=None):
+        self.origin = origin
+        self.twin = twin
+        self.incident_face = incident_face
+        self.edge = edge
+
+
+class Triangle:
+    """
+    A triangle of a triangulation that is not in the DCEL, of which the permutations only use the origin of the
+    outer component. The triangle is its own outer component.
+    """
+    __slots__ = ("origin", "outer_component")
+
+    def __init__(self):
+        self.origin = None
+        self.outer_component = self
+
+
+def partition_monotone(dcel: DCEL, permutation=None, verbose=False, direction=0, stop=None):
+    """
+    Partitions the y-monotone pieces of the DCEL into convex pieces, where y is the vertical axis of a sweep in the
+    given direction, with the same result as hertel_mehlhorn on the triangulation of triangulate_monotone. The
+    triangulation is computed without changing the DCEL, and hertel_mehlhorn is run on the cycles of vertices of its
+    faces instead, such that only the diagonals that separate the final pieces are inserted, and only the diagonals
+    of the monotone pieces that are merged away are deleted. The diagonals are considered in the order given by
+    permutation, as in hertel_mehlhorn.
+
+    The DCEL is only changed through insert_edge and delete_edge, so the faces end up in a different order and with
+    different outer components than triangulate_monotone and hertel_mehlhorn leave them, and stages that depend on
+    those (such as bruteforce_merge_indirect_neighbours) can give a different result afterwards. If stop is given,
+    the partition is abandoned once it is set, before the DCEL is changed.
+    """
+
+    if verbose:
+        print("Partitioning y-monotone pieces into convex pieces...")
+
+    # The faces are kept as cycles of vertices: a directed edge (u, v) maps to the vertices before u and after v in
+    # its face. Every face is oriented like the interior faces of the DCEL. The edges are keyed by the integers of
+    # edge_key instead of pairs of vertices, which would be tracked by the garbage collector.
+    before, after = {}, {}
+    # The triangle of every directed edge of the triangulation of a non-convex piece
+    triangle_of = {}
+    triangulation = []
+    diagonals = []
+    for i, face in enumerate(dcel.interior_faces()):
+        if stop_requested(stop, i):
+            return
+        if is_convex(face):
+            cycle = face_cycle(face)
+            for i in range(len(cycle)):
+                e = edge_key(cycle[i - 1], cycle[i])
+                before[e], after[e] = cycle[i - 2], cycle[(i + 1) % len(cycle)]
+            continue
+        start = highest_leftmost(face.outer_component, direction)
+        left_boundary, right_boundary = extract_boundaries(start, direction)
+        triangles, pairs = monotone_triangulation(merge_boundaries(left_boundary, right_boundary, direction))
+        for a, b, c in triangles:
+            ab, bc, ca = edge_key(a, b), edge_key(b, c), edge_key(c, a)
+            before[ab], after[ab] = c, c
+            before[bc], after[bc] = a, a
+            before[ca], after[ca] = b, b
+            triangle_of[ab] = triangle_of[bc] = triangle_of[ca] = Triangle()
+        for v1, v2 in pairs:
+            # Like insert_edge, every diagonal becomes the outer component of the faces on both of its sides
+            t1, t2 = triangle_of[edge_key(v1, v2)], triangle_of[edge_key(v2, v1)]
+            t1.origin, t2.origin = v1, v2
+            h1 = Diagonal(v1, None, t1)
+            h2 = Diagonal(v2, h1, t2)
+            h1.twin = h2
+            triangulation.append((v1, v2))
+            diagonals += [h1, h2]
+
+    # The diagonals of the DCEL come first, as in the list of hertel_mehlhorn, on the triangles they would be in
+    existing = []
+    for h in dcel.half_edges:
+        if h.incident_face.type == FaceType.INTERIOR and h.twin.incident_face.type == FaceType.INTERIOR:
+            t = triangle_of.get(edge_key(h.origin, h.twin.origin))
+            existing.append(h if t is None else Diagonal(h.origin, h.twin, t, h))
+    diagonals = existing + diagonals
+
+    # Permute the diagonals according to input function if it was given
+    if permutation:
+        permutation(diagonals=diagonals)
+
+    # For each diagonal, remove it if the resulting face is convex, as in hertel_mehlhorn
+    considered = set()
+    merged = set()
+    deleted = []
+    for i, h in enumerate(diagonals):
+        if stop_requested(stop, i):
+            return
+        a, b = h.origin, h.twin.origin
+        ab, ba = edge_key(a, b), edge_key(b, a)
+        considered.add(ba)
+        if ab in considered:
+            continue
+        p1, n1, p2, n2 = before[ab], after[ab], before[ba], after[ba]
+        # The faces should share a single edge, and neither of the two new corners should be concave
+        if (n1 != p2 and get_direction(p2, b, n1) != Direction.LEFT and
+                get_direction(p1, a, n2) != Direction.LEFT):
+            after[edge_key(p1, a)], before[edge_key(a, n2)] = n2, p1
+            after[edge_key(p2, b)], before[edge_key(b, n1)] = n1, p2
+            del before[ab], after[ab], before[ba], after[ba]
+            edge = h.edge if isinstance(h, Diagonal) else h
+            if edge is None:
+                merged.add(ab)
+                merged.add(ba)
+            else:
+                deleted.append(edge)
+
+    inserted = 0
+    for v1, v2 in triangulation:
+        if edge_key(v1, v2) not in merged:
+            dcel.insert_edge(v1, v2)
+            inserted += 1
+    for h in deleted:
+        dcel.delete_edge(h)
+    if metrics.enabled:
+        metrics.count("partition_diagonals", inserted)
+        metrics.count("partition_merges", len(merged) // 2 + len(deleted))
+
+    if verbose:
+        print("Finished partitioning y-monotone pieces.")
+
+
+def edge_key(u, v):
+    """
+    Returns an integer identifying the directed edge between the vertices, by their indices.
+    """
+    return u.index << 32 | v.index
+
+
+def face_cycle(face: Face):
+    """
+    Returns the origins of the half-edges of the outer component of the face, in order.
+    """
+    cycle = []
+    edge = face.outer_component
+    while True:
+        cycle.append(edge.origin)
+        edge = edge.next
+        if edge == face.outer_component:
+            break
+    return cycle
+
+
+def monotone_triangulation(vertices):
+    """
+    Returns the triangles and the diagonals (pairs of vertices, in order of insertion) of the triangulation that
+    triangulate_monotone computes for a y-monotone polygon, from its vertices as returned by merge_boundaries. The
+    vertices of every triangle are in the order of the boundary of the polygon.
+    """
+    triangles = []
+    diagonals = []
+    n_vertices = len(vertices)
+    stack = [vertices[0], vertices[1]]
+    for i in range(2, n_vertices - 1):
+        vertex_i = vertices[i][0]
+        # If the i-th vertex and the top of the stack are on different boundaries, connect it to all vertices on the
+        # stack, cutting off a triangle with every pair of consecutive vertices
+        if vertices[i][1] != stack[-1][1]:
+            previous = stack.pop()
+            while len(stack) > 0:
+                vertex = stack.pop()
+                diagonals.append((vertex_i, previous[0]))
+                triangles.append(triangle(vertex_i, previous, vertex))
+                previous = vertex
+            stack.append(vertices[i - 1])
+            stack.append(vertices[i])
+        else:
+            is_left_side = vertices[i][1]
+            previous = stack.pop()
+            while len(stack) > 0 and (get_direction(vertex_i, previous[0], stack[-1][0]) == Direction.RIGHT
+                                      if is_left_side else
+                                      get_direction(vertex_i, previous[0], stack[-1][0]) == Direction.LEFT):
+                vertex = stack.pop()
+                diagonals.append((vertex_i, vertex[0]))
+                triangles.append(triangle(vertex_i, previous, vertex))
+                previous = vertex
+            stack.append(previous)
+            stack.append(vertices[i])
+
+    # Connect the last vertex to all vertices on the stack, except for the first and last
+    last = vertices[-1][0]
+    previous = stack.pop()
+    while len(stack) > 1:
+        vertex = stack.pop()
+        diagonals.append((last, vertex[0]))
+        triangles.append(triangle(last, previous, vertex))
+        previous = vertex
+    triangles.append(triangle(last, previous, stack[0]))
+    return triangles, diagonals
+
+
+def triangle(lowest, previous, vertex):
+    """
+    Returns the triangle of the lowest vertex and two vertices from the stack of monotone_triangulation in the order
+    of the boundary. The previous vertex is below the other one, so the triangle turns clockwise (like the faces of
+    the DCEL) if the previous vertex is on the left boundary.
+    """
+    if previous[1]:
+        return lowest, previous[0], vertex[0]
+    return lowest, vertex[0], previous[0]
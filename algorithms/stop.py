@@ -0,0 +1,16 @@
+"""
+Cancellation of the long loops of the pipeline stages.
+
+The stages take an optional stop argument, any object with an is_set method such as a threading or multiprocessing
+Event, and end early once it is set. Querying the event can be slow (the event of a multiprocessing.Manager is
+queried through the manager process), so the loops only query it once every STOP_INTERVAL iterations.
+"""
+
+STOP_INTERVAL = 1024
+
+
+def stop_requested(stop, iteration):
+    """
+    Returns whether stop (an Event, or None) is set, only querying it once every STOP_INTERVAL iterations.
+    """
+    return stop is not None and iteration % STOP_INTERVAL == 0 and stop.is_set()
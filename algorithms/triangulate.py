@@ -1,27 +1,31 @@
-from datastructures.dcel import DCEL, Vertex, HalfEdge, Face
+from datastructures.dcel import DCEL, Vertex, HalfEdge, Face, sweep_coordinates
 from enum import Enum
+from algorithms.stop import stop_requested
 
 
-def triangulate_monotone(dcel: DCEL, verbose=False, triangulate_convex_faces=True):
+def triangulate_monotone(dcel: DCEL, verbose=False, triangulate_convex_faces=True, direction=0, stop=None):
     """
-    Triangulate a y-monotone partitioned polygon.
+    Triangulate a y-monotone partitioned polygon, where y is the vertical axis of a sweep in the given direction.
+    If stop is given, the triangulation is abandoned once it is set, leaving some pieces untriangulated.
     """
 
     if verbose:
         print("Triangulating y-monotone pieces...")
 
     # Triangulate each y-monotone partition
-    for face in dcel.interior_faces():
+    for i, face in enumerate(dcel.interior_faces()):
+        if stop_requested(stop, i):
+            break
         # If face is already convex we don't need to triangulate it
         if not triangulate_convex_faces and is_convex(face):
             continue
 
         # Extract the left and right boundaries
-        start = highest_leftmost(face.outer_component)
-        left_boundary, right_boundary = extract_boundaries(start)
+        start = highest_leftmost(face.outer_component, direction)
+        left_boundary, right_boundary = extract_boundaries(start, direction)
 
         # Merge the boundaries
-        vertices = merge_boundaries(left_boundary, right_boundary)
+        vertices = merge_boundaries(left_boundary, right_boundary, direction)
         n_vertices = len(vertices)
 
         # Initialize stack with first two points
@@ -55,29 +59,28 @@ def triangulate_monotone(dcel: DCEL, verbose=False, triangulate_convex_faces=Tru
             vertex = stack.pop()
             dcel.insert_edge(vertices[-1][0], vertex[0])
 
-    dcel.recompute_faces()
     if verbose:
         print("Finished triangulating y-monotone pieces.")
 
 
-def highest_leftmost(edge: HalfEdge) -> HalfEdge:
+def highest_leftmost(edge: HalfEdge, direction=0) -> HalfEdge:
     """
     Locate the half edge with the highest and leftmost origin in a half cycle.
     """
 
     best = edge
+    best_x, best_y = sweep_coordinates(edge.origin, direction)
     current = edge.next
     while current != edge:
-        if current.origin.y >= best.origin.y:
-            if current.origin.y > best.origin.y:
-                best = current
-            elif current.origin.x < best.origin.x:
-                best = current
+        x, y = sweep_coordinates(current.origin, direction)
+        if y > best_y or y == best_y and x < best_x:
+            best = current
+            best_x, best_y = x, y
         current = current.next
     return best
 
 
-def extract_boundaries(highest_leftmost: HalfEdge) -> tuple[list[Vertex], list[Vertex]]:
+def extract_boundaries(highest_leftmost: HalfEdge, direction=0) -> tuple[list[Vertex], list[Vertex]]:
     """
     Extract the left and right boundaries of a y-monotone polygon using its
     highest and leftmost vertex.
@@ -90,7 +93,7 @@ def extract_boundaries(highest_leftmost: HalfEdge) -> tuple[list[Vertex], list[V
     current = highest_leftmost.prev
 
     while current != highest_leftmost:
-        if current.prev.origin.y > current.origin.y:
+        if sweep_coordinates(current.prev.origin, direction)[1] > sweep_coordinates(current.origin, direction)[1]:
             switched_direction = True
         if not switched_direction:
             left_boundary.append(current.origin)
@@ -103,7 +106,7 @@ def extract_boundaries(highest_leftmost: HalfEdge) -> tuple[list[Vertex], list[V
     return (left_boundary, right_boundary)
 
 
-def merge_boundaries(left_boundary: list[Vertex], right_boundary: list[Vertex]) -> list[tuple[Vertex, bool]]:
+def merge_boundaries(left_boundary: list[Vertex], right_boundary: list[Vertex], direction=0) -> list[tuple[Vertex, bool]]:
     """
     Merge boundaries into a list of vertices sorted decreasingly by their
     y-coordinates. Vertices are accompanied by a boolean indicating whether
@@ -124,7 +127,8 @@ def merge_boundaries(left_boundary: list[Vertex], right_boundary: list[Vertex])
             result.append((left_boundary[left_index], True))
             left_index += 1
         else:
-            if left_boundary[left_index].y >= right_boundary[right_index].y:
+            if (sweep_coordinates(left_boundary[left_index], direction)[1] >=
+                    sweep_coordinates(right_boundary[right_index], direction)[1]):
                 result.append((left_boundary[left_index], True))
                 left_index += 1
             else:
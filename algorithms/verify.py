@@ -0,0 +1,480 @@
+"""
+Verifies solutions in exact integer arithmetic before they are submitted.
+
+Usage (from the repository root):
+    python -m algorithms.verify [results_dir] [--instances-dir DIR] [--partition] [--workers N]
+                                [--cache-dir DIR | --no-cache]
+
+Every *.result.json and *.result.bin file (see datastructures.solution) in the results directory is checked against
+the instance file of the same name, which is looked for in the instances directory (by default the results
+directory, where pipeline.batch writes the result files). The exit status is 1 if any solution is invalid.
+
+Checks:
+    convexity: every piece is a convex polygon, turning the same way (see get_direction) at all of its vertices
+    containment: every piece lies inside the polygon and avoids its holes
+    area: the pieces together are at least as large as the polygon, or exactly as large with --partition, as a
+          quick sanity check
+    coverage: every point of the polygon lies in a piece
+    overlap (only with --partition): no two pieces overlap
+
+The pieces of a convex cover may overlap, as those of bruteforce_merge_indirect_neighbours do, so only with
+--partition are the pieces required to partition the polygon. The overlap check then verifies that the boundaries of
+the pieces and the reversed boundary of the polygon cancel out, which holds exactly if the pieces cover every point
+of the polygon once: it takes time linear in the number of edges, instead of comparing all pairs of pieces.
+
+The area of overlapping pieces can exceed that of the polygon even if they leave a gap, so coverage is checked along
+the edges of the pieces instead: every edge must have another piece or the outside of the polygon on its outer side,
+up to single points.
+
+Containment uses a uniform grid of the boundary edges of the polygon as a spatial index, so every piece is only
+compared with the boundary edges near it. Coverage uses a grid of the same cells for the pieces.
+"""
+import argparse
+import glob
+import math
+import os
+import sys
+from collections import Counter
+from fractions import Fraction
+from concurrent.futures import ProcessPoolExecutor
+from datastructures.boundary import ring_orientations, interior_left
+from datastructures.dcel import Vertex
+from datastructures.instance import Instance, load_instance
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from datastructures.solution import Solution, load_solution
+from algorithms.triangulate import get_direction, Direction
+
+CHECKS = ["convexity", "containment", "area", "coverage", "overlap"]
+
+
+def signed_area2(xs, ys):
+    """
+    Returns twice the signed area of the ring, positive if it is counter-clockwise.
+    """
+    return sum(xs[i - 1] * ys[i] - xs[i] * ys[i - 1] for i in range(len(xs)))
+
+
+def half(value):
+    # Areas are computed twice, as integers
+    return f"{value // 2}.5" if value % 2 else str(value // 2)
+
+
+def sign_changes(values):
+    """
+    Returns the number of sign changes in the cyclic sequence, ignoring zeros.
+    """
+    signs = [v > 0 for v in values if v != 0]
+    return sum(signs[i - 1] != signs[i] for i in range(len(signs)))
+
+
+def convexity_error(xs, ys):
+    """
+    Returns why the piece is not a convex polygon, or None if it is. Collinear vertices are allowed.
+    """
+    m = len(xs)
+    if m < 3:
+        return f"has {m} vertices"
+    vertices = [Vertex(x, y) for x, y in zip(xs, ys)]
+    if any(vertices[i - 1].x == vertices[i].x and vertices[i - 1].y == vertices[i].y for i in range(m)):
+        return "has a repeated vertex"
+    directions = set(get_direction(vertices[i - 2], vertices[i - 1], vertices[i]) for i in range(m))
+    directions.discard(Direction.COLINEAR)
+    if len(directions) != 1:
+        return "has no area" if not directions else "turns both ways"
+    # A ring that turns the same way everywhere is convex if it winds around once, in which case the x and the y
+    # coordinates both go up and down once
+    if (sign_changes([xs[i] - xs[i - 1] for i in range(m)]) > 2
+            or sign_changes([ys[i] - ys[i - 1] for i in range(m)]) > 2):
+        return "winds around more than once"
+    return None
+
+
+def meets_interior(xs, ys, ax, ay, bx, by):
+    """
+    Returns whether the segment from (ax, ay) to (bx, by) meets the interior of the counter-clockwise convex piece.
+    By the separating axis theorem they are disjoint if a line through an edge of the piece or through the segment
+    has them on opposite (closed) sides.
+    """
+    for i in range(len(xs)):
+        px, py, qx, qy = xs[i - 1], ys[i - 1], xs[i], ys[i]
+        # The piece lies to the left of its edges
+        if (qx - px) * (ay - py) - (qy - py) * (ax - px) <= 0 and (qx - px) * (by - py) - (qy - py) * (bx - px) <= 0:
+            return False
+    sides = [(bx - ax) * (y - ay) - (by - ay) * (x - ax) for x, y in zip(xs, ys)]
+    return not (all(side >= 0 for side in sides) or all(side <= 0 for side in sides))
+
+
+def in_interior_cone(wx, wy, ax, ay, bx, by, dx, dy):
+    """
+    Returns whether the direction (dx, dy) points into the interior of the polygon at its vertex (wx, wy), where the
+    boundary comes from (ax, ay) and continues to (bx, by) with the interior to its left.
+    """
+    ux, uy, vx, vy = ax - wx, ay - wy, bx - wx, by - wy
+    if vx * uy - vy * ux > 0:
+        # A convex corner: the interior lies counter-clockwise from the outgoing edge up to the incoming one
+        return vx * dy - vy * dx > 0 and dx * uy - dy * ux > 0
+    # A reflex or straight corner: the direction is inside unless it lies in the closed convex exterior
+    return not (ux * dy - uy * dx >= 0 and dx * vy - dy * vx >= 0)
+
+
+class BoundaryIndex:
+    """
+    The boundary edges of a polygon in a uniform grid of about as many cells as edges. The edges and the neighbours
+    of every vertex are oriented such that the interior lies to the left.
+    """
+
+    def __init__(self, instance: Instance):
+        x, y, offsets = instance.x, instance.y, instance.offsets
+        self.x, self.y = x, y
+        self.edges = []
+        self.previous, self.next = [0] * len(x), [0] * len(x)
+        left = interior_left(ring_orientations(x, y, offsets))
+        for r in range(len(offsets) - 1):
+            start, end = offsets[r], offsets[r + 1]
+            for i in range(start, end):
+                a, b = (i - 1 if i > start else end - 1), (i + 1 if i + 1 < end else start)
+                self.previous[i], self.next[i] = (a, b) if left[r] else (b, a)
+                self.edges.append((x[i], y[i], x[self.next[i]], y[self.next[i]]))
+        self.vertex_index = {(x[i], y[i]): i for i in range(len(x))}
+
+        outer = range(offsets[0], offsets[1])
+        self.min_x, self.min_y = min(x[i] for i in outer), min(y[i] for i in outer)
+        self.size = max(1, math.isqrt(len(self.edges)))
+        self.cell_width = max(1, max(x[i] for i in outer) - self.min_x) / self.size
+        self.cell_height = max(1, max(y[i] for i in outer) - self.min_y) / self.size
+        self.cells = {}
+        for e, edge in enumerate(self.edges):
+            for row, low, high in self.segment_cells(*edge):
+                for column in range(low, high + 1):
+                    self.cells.setdefault((row, column), []).append(e)
+
+    def row(self, y):
+        return min(self.size - 1, max(0, int((y - self.min_y) / self.cell_height)))
+
+    def column(self, x):
+        return min(self.size - 1, max(0, int((x - self.min_x) / self.cell_width)))
+
+    def segment_cells(self, ax, ay, bx, by):
+        """
+        Returns the cells the segment passes through as (row, first column, last column), with a column to spare on
+        each side of the rows it crosses diagonally.
+        """
+        first, last = self.row(min(ay, by)), self.row(max(ay, by))
+        if first == last:
+            return [(first, self.column(min(ax, bx)), self.column(max(ax, bx)))]
+        cells = []
+        for row in range(first, last + 1):
+            # The part of the segment between the bottom and the top of the row
+            y0, y1 = self.min_y + row * self.cell_height, self.min_y + (row + 1) * self.cell_height
+            t0, t1 = sorted(((y0 - ay) / (by - ay), (y1 - ay) / (by - ay)))
+            t0, t1 = max(0.0, t0), min(1.0, t1)
+            x0, x1 = sorted((ax + t0 * (bx - ax), ax + t1 * (bx - ax)))
+            cells.append((row, max(0, self.column(x0) - 1), min(self.size - 1, self.column(x1) + 1)))
+        return cells
+
+    def piece_cells(self, xs, ys):
+        """
+        Returns the cells that the convex piece covers as a dictionary from row to (first column, last column). The
+        cells of a piece spanning at most two rows are those of its bounding box.
+        """
+        first, last = self.row(min(ys)), self.row(max(ys))
+        if last - first <= 1:
+            columns = dict.fromkeys(range(first, last + 1), (self.column(min(xs)), self.column(max(xs))))
+        else:
+            columns = {}
+            for i in range(len(xs)):
+                for row, low, high in self.segment_cells(xs[i - 1], ys[i - 1], xs[i], ys[i]):
+                    columns[row] = ((min(low, columns[row][0]), max(high, columns[row][1])) if row in columns
+                                    else (low, high))
+        return columns
+
+    def near(self, xs, ys):
+        """
+        Returns the indices of the boundary edges in the cells that the convex piece covers.
+        """
+        edges = set()
+        for row, (low, high) in self.piece_cells(xs, ys).items():
+            for column in range(low, high + 1):
+                edges.update(self.cells.get((row, column), ()))
+        return edges
+
+    def contains(self, px, py, scale):
+        """
+        Returns whether the point (px / scale, py / scale), which must not lie on the boundary, lies inside the
+        polygon, by counting the boundary edges that a ray to the right crosses. This compares with all edges.
+        """
+        inside = False
+        for ax, ay, bx, by in self.edges:
+            ax, ay, bx, by = ax * scale, ay * scale, bx * scale, by * scale
+            if (ay > py) != (by > py):
+                side = (ax - px) * (by - ay) + (py - ay) * (bx - ax)
+                if (side > 0) == (by > ay):
+                    inside = not inside
+        return inside
+
+
+def containment_error(index: BoundaryIndex, xs, ys):
+    """
+    Returns why the counter-clockwise convex piece does not lie inside the polygon, or None if it does. It does if no
+    boundary edge meets its interior and a point of its interior lies inside the polygon.
+    """
+    min_x, min_y, max_x, max_y = min(xs), min(ys), max(xs), max(ys)
+    for e in index.near(xs, ys):
+        ax, ay, bx, by = index.edges[e]
+        # Most edges near the piece are not even in its bounding box
+        if (max(ax, bx) > min_x and min(ax, bx) < max_x and max(ay, by) > min_y and min(ay, by) < max_y
+                and meets_interior(xs, ys, ax, ay, bx, by)):
+            return f"is crossed by the boundary edge ({ax}, {ay})-({bx}, {by})"
+    m = len(xs)
+    # A vertex of the polygon decides from the directions into the piece and into the polygon there
+    for i in range(m):
+        w = index.vertex_index.get((xs[i], ys[i]))
+        if w is not None:
+            vx, vy = xs[i], ys[i]
+            ux, uy, nx, ny = xs[i - 1] - vx, ys[i - 1] - vy, xs[(i + 1) % m] - vx, ys[(i + 1) % m] - vy
+            if nx * uy - ny * ux > 0:
+                dx, dy = ux + nx, uy + ny
+            else:
+                dx, dy = -ny, nx
+            a, b = index.previous[w], index.next[w]
+            if in_interior_cone(vx, vy, index.x[a], index.y[a], index.x[b], index.y[b], dx, dy):
+                return None
+            return f"lies outside the polygon at ({vx}, {vy})"
+    # Otherwise the centroid of a corner of the piece is tested
+    for i in range(m):
+        ax, ay, bx, by, cx, cy = xs[i - 2], ys[i - 2], xs[i - 1], ys[i - 1], xs[i], ys[i]
+        if (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) != 0:
+            if index.contains(ax + bx + cx, ay + by + cy, 3):
+                return None
+            return f"lies outside the polygon at ({bx}, {by})"
+    return None
+
+
+def boundary_residue(index: BoundaryIndex, solution: Solution, orientations):
+    """
+    Returns a point at which the boundaries of the pieces (counter-clockwise by their orientations) and the reversed
+    boundary of the polygon do not cancel out, or None if they do. Every directed edge is split at the vertices on
+    its supporting line: the edge from p to q adds one at p and subtracts one at q on its line, given by its primitive
+    direction, and the boundaries cancel out exactly if every point on every line sums to zero.
+    """
+    residue = Counter()
+
+    def add(px, py, qx, qy):
+        dx, dy = qx - px, qy - py
+        g = math.gcd(dx, dy)
+        dx, dy = dx // g, dy // g
+        if dx < 0 or dx == 0 and dy < 0:
+            dx, dy = -dx, -dy
+        residue[dx, dy, px, py] += 1
+        residue[dx, dy, qx, qy] -= 1
+
+    x, y, offsets = solution.x, solution.y, solution.offsets
+    for k, orientation in enumerate(orientations):
+        start, end = offsets[k], offsets[k + 1]
+        for i in range(start, end):
+            j = i + 1 if i + 1 < end else start
+            if orientation > 0:
+                add(x[i], y[i], x[j], y[j])
+            else:
+                add(x[j], y[j], x[i], y[i])
+    for ax, ay, bx, by in index.edges:
+        add(bx, by, ax, ay)
+    for (_, _, px, py), count in residue.items():
+        if count != 0:
+            return px, py
+    return None
+
+
+def piece_interval(xs, ys, ax, ay, bx, by):
+    """
+    Returns the interval (lo, hi) of the t in [0, 1] for which the points just to the right of a + t (b - a) lie in
+    the counter-clockwise convex piece, or None if it has no length.
+    """
+    dx, dy = bx - ax, by - ay
+    lo, hi = Fraction(0), Fraction(1)
+    for i in range(len(xs)):
+        px, py, ex, ey = xs[i - 1], ys[i - 1], xs[i] - xs[i - 1], ys[i] - ys[i - 1]
+        # The point a + t (b - a) is to the left of the edge from p to p + e if c + t * slope > 0
+        c, slope = ex * (ay - py) - ey * (ax - px), ex * dy - ey * dx
+        if slope == 0:
+            # On the line of the edge, the points just to the right of the segment must be to its left
+            if c < 0 or c == 0 and ex * dx + ey * dy >= 0:
+                return None
+        elif slope > 0:
+            lo = max(lo, Fraction(-c, slope))
+        else:
+            hi = min(hi, Fraction(-c, slope))
+        if lo >= hi:
+            return None
+    return lo, hi
+
+
+def boundary_interval(ax, ay, bx, by, cx, cy, ex, ey):
+    """
+    Returns the interval (lo, hi) of the t in [0, 1] for which a + t (b - a) lies on the boundary edge from c to e,
+    or None if it has no length.
+    """
+    dx, dy = bx - ax, by - ay
+    if dx * (cy - ay) - dy * (cx - ax) != 0 or dx * (ey - ay) - dy * (ex - ax) != 0:
+        return None
+    length2 = dx * dx + dy * dy
+    t1, t2 = Fraction(dx * (cx - ax) + dy * (cy - ay), length2), Fraction(dx * (ex - ax) + dy * (ey - ay), length2)
+    lo, hi = max(Fraction(0), min(t1, t2)), min(Fraction(1), max(t1, t2))
+    return (lo, hi) if lo < hi else None
+
+
+def coverage_gap(index: BoundaryIndex, pieces, piece_cells, covered_edges, k):
+    """
+    Returns a point next to piece k that lies inside the polygon but in no piece, or None if there is none. The
+    points just outside every edge of the piece must lie outside the polygon, where the edge is on the boundary, or
+    in another piece. That holds for the edges of all pieces exactly if the pieces cover the polygon: a gap would be
+    bounded by the edges of pieces, as the polygon is connected. Most edges are settled by covered_edges, which holds
+    the edges of the polygon and the reversed edges of the pieces as (ax, ay, bx, by): an edge in it is shared with
+    the outside of the polygon or with another piece.
+    """
+    xs, ys = pieces[k]
+    for i in range(len(xs)):
+        ax, ay, bx, by = xs[i - 1], ys[i - 1], xs[i], ys[i]
+        if (ax, ay, bx, by) in covered_edges:
+            continue
+        near_pieces, near_edges = set(), set()
+        for row, low, high in index.segment_cells(ax, ay, bx, by):
+            for column in range(low, high + 1):
+                near_pieces.update(piece_cells.get((row, column), ()))
+                near_edges.update(index.cells.get((row, column), ()))
+        intervals = [boundary_interval(ax, ay, bx, by, *index.edges[e]) for e in near_edges]
+        min_x, min_y, max_x, max_y = min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)
+        for j in near_pieces:
+            pxs, pys = pieces[j]
+            if j != k and max(pxs) >= min_x and min(pxs) <= max_x and max(pys) >= min_y and min(pys) <= max_y:
+                intervals.append(piece_interval(pxs, pys, ax, ay, bx, by))
+        # The points just outside the edge must be covered up to single points
+        reach = Fraction(0)
+        for lo, hi in sorted(interval for interval in intervals if interval is not None):
+            if lo > reach:
+                break
+            reach = max(reach, hi)
+        else:
+            lo = Fraction(1)
+        if reach < 1:
+            t = (reach + lo) / 2
+            return float(ax + t * (bx - ax)), float(ay + t * (by - ay))
+    return None
+
+
+def verify_solution(instance: Instance, solution: Solution, partition=False):
+    """
+    Checks the solution of the instance (see the module documentation) and returns for every failed check the number
+    of failures and a description of the first one.
+    """
+    failures = {}
+
+    def fail(check, message):
+        count, first = failures.get(check, (0, message))
+        failures[check] = (count + 1, first)
+
+    index = BoundaryIndex(instance)
+    # The convex pieces, counter-clockwise, and the cells they cover
+    pieces = {}
+    piece_cells = {}
+    covered_edges = set(index.edges)
+    orientations = []
+    total_area2 = 0
+    x, y, offsets = solution.x, solution.y, solution.offsets
+    for k in range(solution.faces):
+        xs, ys = list(x[offsets[k]:offsets[k + 1]]), list(y[offsets[k]:offsets[k + 1]])
+        area2 = signed_area2(xs, ys)
+        orientations.append(1 if area2 >= 0 else -1)
+        total_area2 += abs(area2)
+        error = convexity_error(xs, ys)
+        if error:
+            fail("convexity", f"piece {k} {error}")
+            continue
+        if area2 < 0:
+            xs.reverse()
+            ys.reverse()
+        error = containment_error(index, xs, ys)
+        if error:
+            fail("containment", f"piece {k} {error}")
+        pieces[k] = (xs, ys)
+        covered_edges.update((xs[i], ys[i], xs[i - 1], ys[i - 1]) for i in range(len(xs)))
+        for row, (low, high) in index.piece_cells(xs, ys).items():
+            for column in range(low, high + 1):
+                piece_cells.setdefault((row, column), []).append(k)
+
+    polygon_area2 = sum(abs(signed_area2(instance.x[ring.start:ring.stop], instance.y[ring.start:ring.stop]))
+                        * (1 if r == 0 else -1) for r, ring in enumerate(instance.rings()))
+    if total_area2 < polygon_area2 or partition and total_area2 != polygon_area2:
+        fail("area", f"the pieces have area {half(total_area2)}, the polygon {half(polygon_area2)}")
+    if not pieces:
+        fail("coverage", "there are no convex pieces")
+    for k in pieces:
+        point = coverage_gap(index, pieces, piece_cells, covered_edges, k)
+        if point is not None:
+            fail("coverage", f"the pieces leave a gap next to piece {k} at {point}")
+    if partition:
+        point = boundary_residue(index, solution, orientations)
+        if point is not None:
+            fail("overlap", f"the pieces overlap or leave a gap at {point}")
+    return failures
+
+
+def verify_file(result_file, instance_file, partition=False, cache_dir=None):
+    """
+    Verifies a result file (JSON or binary) against its instance file and returns a summary.
+    """
+    if cache_dir:
+        instance = load_cached_instance(instance_file, cache_dir)
+    else:
+        instance = load_instance(instance_file)
+    try:
+        solution = load_solution(result_file)
+    except ValueError as error:
+        return {"result_file": result_file, "pieces": None, "failures": {"convexity": (1, str(error))}}
+    return {"result_file": result_file, "pieces": solution.faces,
+            "failures": verify_solution(instance, solution, partition)}
+
+
+def result_files(results_dir):
+    return sorted(glob.glob(os.path.join(results_dir, "*.result.json"))
+                  + glob.glob(os.path.join(results_dir, "*.result.bin")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the solutions in a directory.")
+    parser.add_argument("results_dir", nargs="?", default="instances/2ima15")
+    parser.add_argument("--instances-dir", help="directory of the instance files (default: the results directory)")
+    parser.add_argument("--partition", action="store_true", help="require the pieces to partition the polygon")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance files instead of using the cache")
+    args = parser.parse_args()
+
+    instances_dir = args.instances_dir or args.results_dir
+    jobs = []
+    for result_file in result_files(args.results_dir):
+        name = os.path.basename(result_file).rsplit(".result.", 1)[0]
+        jobs.append((result_file, os.path.join(instances_dir, f"{name}.instance.json")))
+    invalid = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(verify_file, result_file, instance_file, args.partition,
+                                   None if args.no_cache else args.cache_dir) for result_file, instance_file in jobs]
+        for future in futures:
+            summary = future.result()
+            failures = summary["failures"]
+            invalid += bool(failures)
+            if failures:
+                print(f"{summary['result_file']}: INVALID")
+                for check in CHECKS:
+                    if check in failures:
+                        count, first = failures[check]
+                        print(f"    {check}: {count} failure(s), first: {first}")
+            else:
+                print(f"{summary['result_file']}: valid ({summary['pieces']} pieces)", flush=True)
+    print(f"{len(jobs) - invalid} of {len(jobs)} solutions valid")
+    if invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compares the memory usage and build time of the object DCEL and the array-backed DCEL.
+
+Usage (from the repository root):
+    python -m benchmarks.dcel_memory [instance_file] [--pipeline]
+
+With --pipeline, monotonize_polygon, triangulate_monotone and hertel_mehlhorn are also run on both
+representations and their running times and face counts are reported.
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datastructures.dcel import DCEL
+from datastructures.array_dcel import ArrayDCEL
+from algorithms.monotonize import monotonize_polygon
+from algorithms.triangulate import triangulate_monotone
+from algorithms.merge import hertel_mehlhorn
+
+
+def measure_build(cls, poly):
+    """
+    Returns the DCEL, the build time in seconds, and the retained and peak memory in bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    dcel = cls(poly["outer_boundary"], poly["holes"])
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dcel, elapsed, current, peak
+
+
+def measure_pipeline(dcel):
+    """
+    Returns the time in seconds to compute a convex partition with the DCEL and the resulting number of faces.
+    """
+    start = time.perf_counter()
+    monotonize_polygon(dcel)
+    triangulate_monotone(dcel, triangulate_convex_faces=False)
+    hertel_mehlhorn(dcel)
+    return time.perf_counter() - start, len(dcel.interior_faces())
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    instance_file = args[0] if args else "instances/2ima15/srpg_octa_mc0000784.instance.json"
+    pipeline = "--pipeline" in sys.argv
+
+    with open(instance_file, "r") as f:
+        poly = json.load(f)
+    print(f"{poly['name']}: n = {poly['n']}")
+
+    for cls in (DCEL, ArrayDCEL):
+        dcel, elapsed, current, peak = measure_build(cls, poly)
+        print(f"{cls.__name__:>9}: build {elapsed * 1000:8.1f} ms, "
+              f"retained {current / 2**20:7.2f} MiB, peak {peak / 2**20:7.2f} MiB")
+        if pipeline:
+            elapsed, faces = measure_pipeline(dcel)
+            print(f"{'':>9}  pipeline {elapsed:8.2f} s, {faces} faces")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Generates synthetic instances of any size, for scaling tests beyond the instances of the challenge.
+
+Usage (from the repository root):
+    python -m benchmarks.generate family n [--holes H] [--reflex R] [--seed SEED] [--output FILE]
+                                  [--cache-dir DIR]
+
+Families, after those of the challenge:
+    cheese: a square with H star-shaped holes on a grid, which have all vertices but the 4 of the square
+    orthogonal: an x-monotone orthogonal polygon with H rectangular holes, half of whose vertices are reflex
+    random: a star-shaped polygon with H small star-shaped holes in its middle
+
+R is the fraction of the vertices that are reflex. The vertices of a ring are pulled inwards to make them reflex,
+no two of them adjacent, so at most half of the vertices of the outer boundary are reflex and at least half of the
+vertices of a hole. It has no effect on orthogonal polygons. To keep the vertices on a circle convex after rounding
+to integers, the radius of a ring of m vertices is at least 2 m^2 (see convex_radius), so the coordinates of large
+instances are large as well. The output only depends on the arguments, including the seed.
+
+The instance is written in the format of the instance files (to gen_<family>_<n>_h<H>_s<SEED>.instance.json by
+default). With --cache-dir it is also converted into the binary instance cache (see datastructures.instance_cache).
+"""
+import argparse
+import math
+import random
+from array import array
+from datastructures.boundary import reflex_flags
+from datastructures.instance import Instance
+from datastructures.instance_cache import load_cached_instance
+
+FAMILIES = ["cheese", "orthogonal", "random"]
+# Number of vertices of the holes of the random family
+RANDOM_HOLE_SIZE = 8
+
+
+def pick_inward(rng: random.Random, m, k):
+    """
+    Returns k of the indices 0, ..., m - 1 chosen uniformly at random such that no two of them are adjacent in the
+    ring of m vertices (so k is at most m // 2).
+    """
+    k = min(k, m // 2)
+    # Choosing k of m - k slots and spreading them out leaves a gap after each index, also between the last and the
+    # first one
+    return set(i + slot for i, slot in enumerate(sorted(rng.sample(range(m - k), k))))
+
+
+def convex_radius(m):
+    """
+    Returns a radius at which m vertices on a circle, at least half the regular angle apart, stay convex when they
+    are rounded to integers: the turn at a vertex is about radius^2 / m^3, while rounding changes it by at most
+    about radius / m.
+    """
+    return 2 * m * m
+
+
+def star_ring(rng: random.Random, cx, cy, radius, m, inward_fraction):
+    """
+    Returns the counter-clockwise ring of m vertices around (cx, cy), at jittered angles. A fraction inward_fraction
+    of the vertices (no two of them adjacent) lies between radius / 2 and 0.9 * radius from the center, such that
+    these vertices are reflex, the others lie at radius.
+    """
+    inward = pick_inward(rng, m, round(inward_fraction * m))
+    ring = []
+    for i in range(m):
+        angle = (i + 0.5 * rng.random() - 0.25) * 2 * math.pi / m
+        r = radius * (0.5 + 0.4 * rng.random()) if i in inward else radius
+        ring.append((cx + round(r * math.cos(angle)), cy + round(r * math.sin(angle))))
+    return ring
+
+
+def grid_cells(count, left, bottom, size):
+    """
+    Returns the centers and the size of the first count cells of the smallest square grid of at least count cells
+    that covers the square with the given lower left corner and size.
+    """
+    g = math.isqrt(count - 1) + 1 if count > 0 else 0
+    cell = size // g if g else size
+    centers = [(left + (i % g) * cell + cell // 2, bottom + (i // g) * cell + cell // 2) for i in range(count)]
+    return centers, cell
+
+
+def hole_inward_fraction(reflex):
+    # The inward vertices of a hole are reflex on the hole, so convex in the polygon
+    return 1 - reflex
+
+
+def generate_cheese(rng: random.Random, n, holes, reflex):
+    if holes < 1 or n < 4 + 3 * holes:
+        raise ValueError("A cheese polygon needs at least one hole and 3 vertices per hole")
+    sizes = [(n - 4) // holes + (i < (n - 4) % holes) for i in range(holes)]
+    # The holes have a radius of 0.4 times the size of their cell
+    size = math.ceil(max(64 * max(sizes), convex_radius(max(sizes)) / 0.4)) * (math.isqrt(holes - 1) + 1)
+    centers, cell = grid_cells(holes, 0, 0, size)
+    outer = [(0, 0), (size, 0), (size, size), (0, size)]
+    rings = [star_ring(rng, cx, cy, int(0.4 * cell), m, hole_inward_fraction(reflex))[::-1]
+             for (cx, cy), m in zip(centers, sizes)]
+    return outer, rings
+
+
+def generate_orthogonal(rng: random.Random, n, holes):
+    columns = (n - 4 * holes) // 4
+    if columns < 1 or holes > columns:
+        raise ValueError("An orthogonal polygon needs at least 4 vertices per column and one column per hole")
+    width, height = 8, 4 * columns + 8
+    # Every column spans from below the middle to above it, so neighbouring columns overlap
+    bottoms, tops = [], []
+    for _ in range(columns):
+        bottom, top = rng.randrange(height // 2 - 2), rng.randrange(height // 2 + 3, height + 1)
+        # Equal heights of neighbouring columns would make their shared vertices collinear
+        while bottoms and bottom == bottoms[-1]:
+            bottom = rng.randrange(height // 2 - 2)
+        while tops and top == tops[-1]:
+            top = rng.randrange(height // 2 + 3, height + 1)
+        bottoms.append(bottom)
+        tops.append(top)
+    outer = []
+    for i, bottom in enumerate(bottoms):
+        outer += [(i * width, bottom), ((i + 1) * width, bottom)]
+    for i in reversed(range(columns)):
+        outer += [((i + 1) * width, tops[i]), (i * width, tops[i])]
+    rings = []
+    for i in sorted(rng.sample(range(columns), holes)):
+        # The column is at least 6 high, the hole lies strictly inside it
+        low = rng.randrange(bottoms[i] + 1, (bottoms[i] + tops[i]) // 2)
+        high = rng.randrange((bottoms[i] + tops[i]) // 2 + 1, tops[i])
+        left, right = i * width + 1 + rng.randrange(3), (i + 1) * width - 1 - rng.randrange(3)
+        rings.append([(left, low), (left, high), (right, high), (right, low)])
+    return outer, rings
+
+
+def generate_random(rng: random.Random, n, holes, reflex):
+    m = n - holes * RANDOM_HOLE_SIZE
+    if m < 8:
+        raise ValueError(f"A random polygon needs at least 8 vertices besides the {RANDOM_HOLE_SIZE} of every hole")
+    radius = max(100 * n, convex_radius(m))
+    outer = star_ring(rng, 0, 0, radius, m, reflex)
+    # Every vertex of the outer boundary is at least radius / 2 from the center and the angle between neighbouring
+    # vertices is small enough for the polygon to contain the disk of radius 0.3 * radius, and so this square
+    half = int(0.2 * radius)
+    centers, cell = grid_cells(holes, -half, -half, 2 * half)
+    rings = [star_ring(rng, cx, cy, int(0.4 * cell), RANDOM_HOLE_SIZE, hole_inward_fraction(reflex))[::-1]
+             for cx, cy in centers]
+    return outer, rings
+
+
+def generate(family, n, holes=0, reflex=0.25, seed=0, name=None) -> Instance:
+    """
+    Returns an instance of the family (one of FAMILIES) with n vertices, see the module documentation.
+    """
+    rng = random.Random(seed)
+    if family == "cheese":
+        outer, rings = generate_cheese(rng, n, holes, reflex)
+    elif family == "orthogonal":
+        outer, rings = generate_orthogonal(rng, n, holes)
+    elif family == "random":
+        outer, rings = generate_random(rng, n, holes, reflex)
+    else:
+        raise ValueError(f"Unknown family: {family}")
+    x, y, offsets = array("q"), array("q"), array("q", [0])
+    for ring in [outer] + rings:
+        x.extend(p[0] for p in ring)
+        y.extend(p[1] for p in ring)
+        offsets.append(len(x))
+    return Instance(name or f"gen_{family}_{n}_h{holes}_s{seed}", "CGSHOP2023_Instance", x, y, offsets)
+
+
+def write_instance(instance: Instance, instance_file):
+    """
+    Writes the instance in the format of the instance files, one ring at a time.
+    """
+    with open(instance_file, "w") as f:
+        f.write(f'{{"type": "{instance.type}", "name": "{instance.name}", "n": {instance.n}, "outer_boundary": ')
+        for i, ring in enumerate(instance.rings()):
+            if i == 1:
+                f.write(', "holes": [')
+            elif i > 1:
+                f.write(", ")
+            f.write("[" + ", ".join(f'{{"x": {instance.x[j]}, "y": {instance.y[j]}}}' for j in ring) + "]")
+        f.write("]}" if len(instance.offsets) > 2 else ', "holes": []}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic instance.")
+    parser.add_argument("family", choices=FAMILIES)
+    parser.add_argument("n", type=int, help="number of vertices (orthogonal polygons round it down to a multiple of 4)")
+    parser.add_argument("--holes", type=int, help="number of holes (default: n // 100 for cheese, else 0)")
+    parser.add_argument("--reflex", type=float, default=0.25, help="fraction of reflex vertices")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="instance file to write")
+    parser.add_argument("--cache-dir", help="also convert the instance into the binary instance cache in this dir")
+    args = parser.parse_args()
+
+    holes = args.holes if args.holes is not None else max(1, args.n // 100) if args.family == "cheese" else 0
+    instance = generate(args.family, args.n, holes, args.reflex, args.seed)
+    instance_file = args.output or f"{instance.name}.instance.json"
+    write_instance(instance, instance_file)
+    if args.cache_dir:
+        load_cached_instance(instance_file, args.cache_dir)
+    reflex = sum(reflex_flags(instance.x, instance.y, instance.offsets))
+    print(f"{instance_file}: n = {instance.n}, {len(instance.offsets) - 2} holes, {reflex / instance.n:.0%} reflex")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark of the Rationals type on the sweep and DCEL workloads.
+
+Usage (from the repository root):
+    python -m benchmarks.rationals [instance_file] [repeats]
+"""
+import json
+import math
+import sys
+import timeit
+from datastructures.dcel import DCEL, edge_angle
+from datastructures.edgebst import x_of_edge
+from datastructures.rationals import Rationals
+
+
+class EagerRationals:
+    """
+    The previous implementation of Rationals, which reduces on every construction. Used as the baseline.
+    """
+
+    def __init__(self, numerator, denominator=1):
+        gcd = math.gcd(numerator, denominator)
+        if (denominator >= 0):
+            self.num = numerator // gcd
+            self.den = denominator // gcd
+        else:
+            self.num = numerator // gcd * -1
+            self.den = denominator // gcd * -1
+
+    def __eq__(self, other):
+        return self.num * other.den == other.num * self.den
+
+    def __gt__(self, other):
+        return self.num * other.den > other.num * self.den
+
+    def __lt__(self, other):
+        return self.num * other.den < other.num * self.den
+
+    def __mul__(self, other):
+        return EagerRationals(self.num * other.num, self.den * other.den)
+
+    def __truediv__(self, other):
+        return EagerRationals(self.num * other.den, self.den * other.num)
+
+    def __sub__(self, other):
+        return EagerRationals(self.num * other.den - other.num * self.den, self.den * other.den)
+
+
+def sweep_workload(rat, edges, heights):
+    """
+    Computes the intersection of every edge with the sweep line at the given heights and compares
+    consecutive edges, mirroring x_of_edge and the comparisons in the sweep-line status.
+    """
+    for y in heights:
+        previous = None
+        for (x1, y1, x2, y2) in edges:
+            if x1 == x2:
+                x = rat(x1)
+            elif y1 == y2:
+                x = rat(max(x1, x2))
+            else:
+                slope = rat(y2 - y1, x2 - x1)
+                b = rat(y1) - slope * rat(x1)
+                x = (rat(y) - b) / slope
+            if previous:
+                previous < x
+            previous = x
+
+
+def dcel_workload(rat, vertices):
+    """
+    Compares the angles of the edges around each vertex, mirroring edge_angle and the angular walk
+    that DCEL.insert_edge used to do.
+    """
+    def angle(v1, v2):
+        if v2[0] - v1[0] > 0:
+            return (0, rat(v2[1] - v1[1], v2[0] - v1[0]))
+        elif v2[0] - v1[0] < 0:
+            return (2, rat(v2[1] - v1[1], v2[0] - v1[0]))
+        elif v2[1] > v1[1]:
+            return (1, None)
+        else:
+            return (3, None)
+
+    for i in range(len(vertices)):
+        v = vertices[i]
+        prev = vertices[i - 1]
+        following = vertices[(i + 1) % len(vertices)]
+        opposite = vertices[(i + len(vertices) // 2) % len(vertices)]
+        if opposite == v:
+            continue
+        angle(v, following) > angle(v, prev)
+        angle(v, following) > angle(v, opposite)
+        angle(v, prev) < angle(v, opposite)
+
+
+def library_workload(dcel, heights):
+    """
+    Runs the x_of_edge and edge_angle functions of the repository, which use the integer fast paths.
+    """
+    for y in heights:
+        for h in dcel.half_edges:
+            x_of_edge(h, y)
+    for v in dcel.vertices:
+        edge_angle(v, v.incident_half_edge.twin.origin)
+        edge_angle(v, v.incident_half_edge.prev.origin)
+
+
+def main():
+    instance_file = sys.argv[1] if len(sys.argv) > 1 else "instances/2ima15/srpg_octa_mc0000784.instance.json"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with open(instance_file, "r") as f:
+        poly = json.load(f)
+    dcel = DCEL(poly["outer_boundary"], poly["holes"])
+    edges = [(h.origin.x, h.origin.y, h.twin.origin.x, h.twin.origin.y) for h in dcel.half_edges]
+    vertices = [(v.x, v.y) for v in dcel.vertices]
+    ys = sorted(v[1] for v in vertices)
+    heights = ys[::max(1, len(ys) // 8)]
+
+    print(f"{poly['name']}: {len(vertices)} vertices, {len(edges)} half-edges, best of {repeats} runs")
+    for workload, run in [
+        ("sweep", lambda rat: sweep_workload(rat, edges, heights)),
+        ("dcel", lambda rat: dcel_workload(rat, vertices)),
+    ]:
+        eager = min(timeit.repeat(lambda: run(EagerRationals), number=1, repeat=repeats))
+        lazy = min(timeit.repeat(lambda: run(Rationals), number=1, repeat=repeats))
+        print(f"{workload:>8}: eager {eager * 1000:8.1f} ms, Rationals {lazy * 1000:8.1f} ms, speedup {eager / lazy:.2f}x")
+
+    library = min(timeit.repeat(lambda: library_workload(dcel, heights), number=1, repeat=repeats))
+    print(f"{'library':>8}: x_of_edge and edge_angle {library * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
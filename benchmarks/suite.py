@@ -0,0 +1,222 @@
+"""
+Times every stage of the pipeline on instances of different sizes, to find regressions and stages that do not scale
+linearly.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [instances_dir ...] [--per-bucket K] [--max-n N] [--repeat R]
+                               [--baseline FILE [--threshold T] [--min-time S]] [--save FILE]
+
+The instances are grouped into buckets by their number of vertices n (see BUCKETS), and at most K instances of every
+bucket are benchmarked, spread evenly over the sizes in the bucket. For every stage the report shows the time per
+bucket and the exponent e of the best fit of time ~ n^e over all benchmarked instances, where an exponent clearly
+above 1 exposes a super-linear stage.
+
+With --save the timings are written to a baseline file. With --baseline the timings are compared to those in a
+baseline file, per bucket and stage over the instances in both: a stage is reported as a regression if it got more
+than a fraction T slower and more than S seconds slower, in which case the exit status is 1.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+import time
+from datastructures.dcel import DCEL
+from datastructures.instance import load_instance, peek_header
+from algorithms.monotonize import monotonize_polygon
+from algorithms.triangulate import triangulate_monotone
+from algorithms.merge import hertel_mehlhorn, bruteforce_merge_adjacent_faces, bruteforce_merge_indirect_neighbours
+from algorithms.partition import partition_monotone
+from pipeline.cover import get_permutation
+
+# Lower bounds of the size buckets, every bucket ranges up to the lower bound of the next one
+BUCKETS = [0, 100, 1000, 10000, 100000]
+STAGES = ["build", "monotonize", "triangulate", "hertel_mehlhorn", "merge_indirect", "format_solution",
+          "merge_adjacent", "partition"]
+# Times below this are too noisy to fit the scaling exponent on
+MIN_FIT_TIME = 1e-4
+
+
+def bucket_name(lower):
+    def short(n):
+        return f"{n // 1000}k" if n >= 1000 else str(n)
+    i = BUCKETS.index(lower)
+    if i == len(BUCKETS) - 1:
+        return f">={short(lower)}"
+    return f"{short(lower)}-{short(BUCKETS[i + 1])}"
+
+
+def bucket_of(n):
+    return max(lower for lower in BUCKETS if lower <= n)
+
+
+def select_instances(instance_files, per_bucket, max_n=None):
+    """
+    Returns (n, instance_file) pairs of at most per_bucket instances of every bucket, spread evenly over the sizes
+    in the bucket, ordered on n.
+    """
+    buckets = {}
+    for instance_file in instance_files:
+        n = peek_header(instance_file, ("n",)).get("n")
+        if n is None:
+            n = load_instance(instance_file).n
+        if max_n is None or n <= max_n:
+            buckets.setdefault(bucket_of(n), []).append((n, instance_file))
+    selected = []
+    for instances in buckets.values():
+        instances.sort()
+        if len(instances) <= per_bucket:
+            selected.extend(instances)
+        elif per_bucket == 1:
+            selected.append(instances[len(instances) // 2])
+        else:
+            step = (len(instances) - 1) / (per_bucket - 1)
+            selected.extend(instances[round(i * step)] for i in range(per_bucket))
+    return sorted(selected)
+
+
+def time_stages(instance):
+    """
+    Runs all stages once on the instance and returns the time of every stage in seconds. The stages up to
+    format_solution form the default pipeline, merge_adjacent is run on a second triangulation afterwards, and
+    partition (which replaces triangulate and hertel_mehlhorn) on a third monotonization.
+    """
+    times = {}
+
+    def timed(stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        times[stage] = time.perf_counter() - start
+        return result
+
+    dcel = timed("build", DCEL.from_instance, instance)
+    timed("monotonize", monotonize_polygon, dcel)
+    timed("triangulate", lambda: triangulate_monotone(dcel, triangulate_convex_faces=False))
+    timed("hertel_mehlhorn", hertel_mehlhorn, dcel, get_permutation("sort_on_yx"))
+    timed("merge_indirect", bruteforce_merge_indirect_neighbours, dcel)
+    timed("format_solution", dcel.format_solution)
+
+    dcel.reset()
+    monotonize_polygon(dcel)
+    triangulate_monotone(dcel, triangulate_convex_faces=False)
+    timed("merge_adjacent", bruteforce_merge_adjacent_faces, dcel)
+
+    dcel.reset()
+    monotonize_polygon(dcel)
+    timed("partition", partition_monotone, dcel, get_permutation("sort_on_yx"))
+    return times
+
+
+def benchmark(selected, repeat=1, verbose=True):
+    """
+    Returns the results of the benchmarked instances by instance name: n and the minimum time of every stage over
+    repeat runs.
+    """
+    results = {}
+    for n, instance_file in selected:
+        instance = load_instance(instance_file)
+        times = {}
+        for _ in range(repeat):
+            for stage, t in time_stages(instance).items():
+                times[stage] = min(t, times.get(stage, t))
+        results[instance.name] = {"n": n, "times": times}
+        if verbose:
+            print(f"{instance.name} (n = {n}): {sum(times.values()):.2f}s", file=sys.stderr, flush=True)
+    return results
+
+
+def scaling_exponent(points):
+    """
+    Returns the slope of the least squares fit of log(time) against log(n), or None if there are too few points.
+    """
+    points = [(math.log(n), math.log(t)) for n, t in points if n > 1 and t >= MIN_FIT_TIME]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def bucket_totals(results, names=None):
+    """
+    Returns the total time of every stage per bucket, over the instances in names (all if None).
+    """
+    totals = {}
+    for name, result in results.items():
+        if names is None or name in names:
+            bucket = totals.setdefault(bucket_of(result["n"]), {stage: 0.0 for stage in STAGES})
+            for stage, t in result["times"].items():
+                bucket[stage] += t
+    return totals
+
+
+def report(results):
+    totals = bucket_totals(results)
+    counts = {}
+    for result in results.values():
+        counts[bucket_of(result["n"])] = counts.get(bucket_of(result["n"]), 0) + 1
+    buckets = sorted(totals)
+    print(f"{'stage':<16}" + "".join(f"{f'{bucket_name(b)} ({counts[b]})':>16}" for b in buckets) + f"{'n^e':>8}")
+    for stage in STAGES:
+        exponent = scaling_exponent([(r["n"], r["times"][stage]) for r in results.values()])
+        print(f"{stage:<16}" + "".join(f"{totals[b][stage]:>15.3f}s" for b in buckets)
+              + (f"{exponent:>8.2f}" if exponent is not None else f"{'-':>8}"))
+
+
+def compare(results, baseline, threshold, min_time):
+    """
+    Prints the change of every stage per bucket relative to the baseline, and returns the number of regressions.
+    """
+    names = set(results) & set(baseline["results"])
+    if not names:
+        print("No instances in common with the baseline")
+        return 0
+    current = bucket_totals(results, names)
+    previous = bucket_totals(baseline["results"], names)
+    regressions = 0
+    print(f"Compared to the baseline ({len(names)} instances):")
+    for bucket in sorted(current):
+        for stage in STAGES:
+            new, old = current[bucket][stage], previous[bucket][stage]
+            # Stages that are not in the baseline yet are not regressions
+            regression = old > 0 and new - old > min_time and new > old * (1 + threshold)
+            regressions += regression
+            change = f"{new / old - 1:+.0%}" if old > 0 else "new"
+            print(f"{bucket_name(bucket):>10} {stage:<16} {old:9.3f}s -> {new:9.3f}s {change:>7}"
+                  + ("  REGRESSION" if regression else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the pipeline on instances of all sizes.")
+    parser.add_argument("instances_dirs", nargs="*", default=["instances/all"])
+    parser.add_argument("--per-bucket", type=int, default=3, help="number of instances per size bucket")
+    parser.add_argument("--max-n", type=int, help="skip instances with more vertices")
+    parser.add_argument("--repeat", type=int, default=1, help="take the minimum time over this many runs")
+    parser.add_argument("--baseline", help="baseline file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that is a regression")
+    parser.add_argument("--min-time", type=float, default=0.01, help="absolute slowdown (s) that is a regression")
+    parser.add_argument("--save", help="file to save the timings to, for use as a baseline")
+    args = parser.parse_args()
+
+    instance_files = sorted(f for d in args.instances_dirs for f in glob.glob(os.path.join(d, "*.instance.json")))
+    selected = select_instances(instance_files, args.per_bucket, args.max_n)
+    results = benchmark(selected, args.repeat)
+    report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_time):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
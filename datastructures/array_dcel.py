@@ -0,0 +1,494 @@
+from array import array
+from datastructures.dcel import DCEL, FaceType, event_key
+
+# Struct-of-arrays backend for the DCEL. Vertices, half-edges and faces are identified by their index
+# in the arrays below, -1 takes the role of None. The algorithms operate on light-weight views
+# (ArrayVertex, ArrayHalfEdge, ArrayFace) which are created on access and only store a reference
+# to the DCEL and an index, such that only the arrays are kept in memory.
+
+FACE_TYPES = list(FaceType)
+
+
+def is_int64_array(a):
+    return isinstance(a, array) and a.typecode == "q" or isinstance(a, memoryview) and a.format == "q"
+
+
+class ArrayVertex:
+    __slots__ = ("dcel", "index")
+
+    def __init__(self, dcel, index):
+        self.dcel = dcel
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayVertex) and self.index == other.index and self.dcel is other.dcel
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def x(self):
+        return self.dcel.x[self.index]
+
+    @x.setter
+    def x(self, x):
+        self.dcel.x[self.index] = x
+
+    @property
+    def y(self):
+        return self.dcel.y[self.index]
+
+    @y.setter
+    def y(self, y):
+        self.dcel.y[self.index] = y
+
+    @property
+    def incident_half_edge(self):
+        return self.dcel.half_edge(self.dcel.incident_half_edge[self.index])
+
+    @incident_half_edge.setter
+    def incident_half_edge(self, h):
+        self.dcel.incident_half_edge[self.index] = h.index
+
+
+class ArrayHalfEdge:
+    __slots__ = ("dcel", "index")
+
+    def __init__(self, dcel, index):
+        self.dcel = dcel
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayHalfEdge) and self.index == other.index and self.dcel is other.dcel
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def origin(self):
+        return ArrayVertex(self.dcel, self.dcel.origin[self.index])
+
+    @property
+    def twin(self):
+        return self.dcel.half_edge(self.dcel.twin[self.index])
+
+    @twin.setter
+    def twin(self, h):
+        self.dcel.twin[self.index] = h.index
+
+    @property
+    def next(self):
+        return self.dcel.half_edge(self.dcel.next[self.index])
+
+    @next.setter
+    def next(self, h):
+        self.dcel.next[self.index] = h.index
+
+    @property
+    def prev(self):
+        return self.dcel.half_edge(self.dcel.prev[self.index])
+
+    @prev.setter
+    def prev(self, h):
+        self.dcel.prev[self.index] = h.index
+
+    @property
+    def incident_face(self):
+        """
+        The incident face, resolved to the face it has been merged into if any.
+        """
+        f = self.dcel.incident_face[self.index]
+        if f < 0:
+            return None
+        if self.dcel.face_parent[f] >= 0:
+            f = self.dcel.find_face(f)
+            self.dcel.incident_face[self.index] = f
+        return ArrayFace(self.dcel, f)
+
+    @incident_face.setter
+    def incident_face(self, f):
+        self.dcel.incident_face[self.index] = f.index if f else -1
+
+    @property
+    def marked(self):
+        return self.dcel.marked[self.index] == 1
+
+    @marked.setter
+    def marked(self, marked):
+        self.dcel.marked[self.index] = 1 if marked else 0
+
+    @property
+    def helper(self):
+        v = self.dcel.helper[self.index]
+        return ArrayVertex(self.dcel, v) if v >= 0 else None
+
+    @helper.setter
+    def helper(self, v):
+        self.dcel.helper[self.index] = v.index if v else -1
+
+    @property
+    def sweep_line(self):
+        return self.dcel.sweep_lines.get(self.index)
+
+    @sweep_line.setter
+    def sweep_line(self, line):
+        self.dcel.sweep_lines[self.index] = line
+
+
+class ArrayFace:
+    __slots__ = ("dcel", "index")
+
+    def __init__(self, dcel, index):
+        self.dcel = dcel
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayFace) and self.index == other.index and self.dcel is other.dcel
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def outer_component(self):
+        return self.dcel.half_edge(self.dcel.outer_component[self.index])
+
+    @outer_component.setter
+    def outer_component(self, h):
+        self.dcel.outer_component[self.index] = h.index if h else -1
+
+    @property
+    def type(self):
+        return FACE_TYPES[self.dcel.face_type[self.index]]
+
+    @type.setter
+    def type(self, t):
+        self.dcel.face_type[self.index] = t.value
+
+    @property
+    def parent(self):
+        f = self.dcel.face_parent[self.index]
+        return ArrayFace(self.dcel, f) if f >= 0 else None
+
+    @parent.setter
+    def parent(self, f):
+        self.dcel.face_parent[self.index] = f.index if f else -1
+
+    def find(self):
+        return ArrayFace(self.dcel, self.dcel.find_face(self.index))
+
+
+class ArraySet:
+    """
+    Insertion-ordered set of the live elements of one kind, backed by a bytearray of flags.
+    Iterating yields views, in the order in which the elements were created.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.alive = bytearray()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        view = self.view
+        alive = self.alive
+        # Elements might be added during the iteration, those are not yielded
+        for i in range(len(alive)):
+            if alive[i]:
+                yield view(i)
+
+    def __contains__(self, element):
+        return element.index < len(self.alive) and self.alive[element.index] == 1
+
+    def grow(self, size):
+        self.alive.extend(bytes(size - len(self.alive)))
+
+    def add(self, index):
+        if not self.alive[index]:
+            self.alive[index] = 1
+            self.count += 1
+
+    def remove(self, index):
+        if self.alive[index]:
+            self.alive[index] = 0
+            self.count -= 1
+
+
+class ArrayDCEL(DCEL):
+    """
+    A doubly connected edge list stored as a struct of arrays, see DCEL for the interface.
+
+    Attributes:
+        x, y: coordinates of the vertices
+        incident_half_edge: per vertex
+        origin, twin, next, prev, incident_face, marked, helper: per half-edge
+        outer_component, face_type, face_parent: per face
+        half_edges: ArraySet of the half-edges
+        faces: ArraySet of the faces
+        rings: list of (start, length, inner face, outer face) like in DCEL, the half-edges of a ring are the
+            indices start, ..., start + 2 * length - 1
+    """
+
+    def __init__(self, outer_boundary: list[dict], holes: list[dict], verbose=False):
+        """
+        Creates the DCEL from input in the same format as DCEL.
+        """
+        rings = [outer_boundary] + holes
+        offsets = array("q", [0])
+        for ring in rings:
+            offsets.append(offsets[-1] + len(ring))
+        self.build(array("q", (p["x"] for ring in rings for p in ring)),
+                   array("q", (p["y"] for ring in rings for p in ring)), offsets, verbose)
+
+    def build(self, x, y, offsets, verbose=False):
+        """
+        Creates the DCEL from coordinates in the same format as DCEL.build. The coordinate arrays are used as is
+        if they are arrays or memoryviews of type "q", such as those of an Instance.
+        """
+
+        if verbose:
+            print("Building array DCEL...")
+
+        n = len(x)
+        self.x = x if is_int64_array(x) else array("q", x)
+        self.y = y if is_int64_array(y) else array("q", y)
+        self.incident_half_edge = array("q", range(0, 2 * n, 2))
+
+        self.origin = array("q", bytes(8 * 2 * n))
+        self.twin = array("q", bytes(8 * 2 * n))
+        self.next = array("q", bytes(8 * 2 * n))
+        self.prev = array("q", bytes(8 * 2 * n))
+        self.incident_face = array("q", bytes(8 * 2 * n))
+        self.marked = bytearray(2 * n)
+        self.helper = array("q", [-1]) * (2 * n)
+        self.sweep_lines = {}
+        # Rotation indices of the vertices for which one has been built, see DCEL.rotation_index
+        self.rotation_indices = {}
+        self.vertex_type_cache = {}
+        self.event_order_cache = {}
+
+        # The holes come first, followed by the interior face and the outer face, like in DCEL
+        self.outer_component = array("q")
+        self.face_type = array("b")
+        self.face_parent = array("q")
+
+        self.half_edges = ArraySet(self.half_edge)
+        self.half_edges.grow(2 * n)
+        self.faces = ArraySet(self.face)
+
+        holes = range(len(offsets) - 2)
+        hole_faces = [self.new_face(FaceType.HOLE) for _ in holes]
+        interior_face = self.new_face(FaceType.INTERIOR)
+        boundary_outer_face = self.new_face(FaceType.OUTER)
+        # Faces of the cycles around holes that are not yet connected, see DCEL.build
+        hole_interior_faces = [self.new_face(FaceType.INTERIOR) for _ in holes]
+
+        self.rings = []
+        for i, inner_face, outer_face in zip(range(len(offsets) - 1), [interior_face] + hole_interior_faces,
+                                             [boundary_outer_face] + hole_faces):
+            start, length = offsets[i], offsets[i + 1] - offsets[i]
+            self.rings.append((2 * start, length, inner_face, outer_face))
+            self.process_ring(start, length, inner_face, outer_face)
+
+        self.initial_faces = hole_faces + [interior_face, boundary_outer_face]
+        for f in self.initial_faces:
+            self.add_face(f)
+
+        if verbose:
+            print("Finished building array DCEL.")
+
+    def process_ring(self, start: int, length: int, inner_face: ArrayFace, outer_face: ArrayFace):
+        """
+        Auxiliary function that sets up the half-edges of the ring of vertices start, ..., start + length - 1.
+        Vertex i has outgoing half-edge 2 * i on the outer face and incoming half-edge 2 * i + 1 on the inner face,
+        which mirrors the order in which DCEL.process_boundary creates them.
+        """
+        for i in range(start, start + length):
+            j = i + 1 if i + 1 < start + length else start
+            k = i - 1 if i > start else start + length - 1
+            h1 = 2 * i
+            h2 = 2 * i + 1
+            self.origin[h1] = i
+            self.origin[h2] = j
+            self.twin[h1] = h2
+            self.twin[h2] = h1
+            self.next[h1] = 2 * j
+            self.prev[h1] = 2 * k
+            self.next[h2] = 2 * k + 1
+            self.prev[h2] = 2 * j + 1
+            self.incident_face[h1] = outer_face.index
+            self.incident_face[h2] = inner_face.index
+            self.half_edges.add(h1)
+            self.half_edges.add(h2)
+
+        last = start + length - 1
+        inner_face.outer_component = self.half_edge(2 * last + 1)
+        if outer_face.type != FaceType.OUTER:
+            outer_face.outer_component = self.half_edge(2 * last)
+
+    def reset(self):
+        """
+        Truncates the arrays to the boundary half-edges and the initial faces and sets up the rings again,
+        see DCEL.reset.
+        """
+        m = 2 * len(self.x)
+        for a in (self.origin, self.twin, self.next, self.prev, self.incident_face, self.helper):
+            del a[m:]
+        del self.marked[m:]
+        self.marked[:] = bytes(m)
+        self.helper[:] = array("q", [-1]) * m
+        self.half_edges.alive = bytearray(m)
+        self.half_edges.count = 0
+        self.sweep_lines = {h: line for h, line in self.sweep_lines.items() if h < m}
+        self.rotation_indices = {}
+
+        self.clear_faces()
+        for f in range(len(self.initial_faces)):
+            self.outer_component[f] = -1
+        # Add back the pending faces of the holes, which are not part of self.faces
+        for _ in range(len(self.rings) - 1):
+            self.new_face(FaceType.INTERIOR)
+
+        for start, length, inner_face, outer_face in self.rings:
+            self.process_ring(start // 2, length, inner_face, outer_face)
+        for f in self.initial_faces:
+            self.add_face(f)
+
+    def event_order(self, direction=0):
+        """
+        Like DCEL.event_order, but only the sorted vertex indices are cached.
+        """
+        axis = direction % 2
+        if axis not in self.event_order_cache:
+            self.event_order_cache[axis] = array("q", sorted(
+                range(len(self.x)), key=lambda i: event_key(ArrayVertex(self, i), axis)))
+        order = self.event_order_cache[axis]
+        return (ArrayVertex(self, i) for i in (order if direction < 2 else reversed(order)))
+
+    def vertex(self, index):
+        return ArrayVertex(self, index)
+
+    def coordinate_arrays(self):
+        offsets = [start // 2 for start, _, _, _ in self.rings]
+        offsets.append(len(self.x))
+        return self.x, self.y, offsets
+
+    @property
+    def vertices(self):
+        return [ArrayVertex(self, i) for i in range(len(self.x))]
+
+    def half_edge(self, index):
+        return ArrayHalfEdge(self, index) if index >= 0 else None
+
+    def face(self, index):
+        return ArrayFace(self, index) if index >= 0 else None
+
+    def new_half_edge(self, origin: ArrayVertex):
+        self.origin.append(origin.index)
+        for a in (self.twin, self.next, self.prev, self.incident_face, self.helper):
+            a.append(-1)
+        self.marked.append(0)
+        self.half_edges.grow(len(self.origin))
+        return ArrayHalfEdge(self, len(self.origin) - 1)
+
+    def new_face(self, type: FaceType):
+        self.outer_component.append(-1)
+        self.face_type.append(type.value)
+        self.face_parent.append(-1)
+        self.faces.grow(len(self.face_type))
+        return ArrayFace(self, len(self.face_type) - 1)
+
+    def find_face(self, f: int):
+        """
+        Returns the index of the face that face f has (transitively) been merged into, compressing the path.
+        """
+        root = f
+        while self.face_parent[root] >= 0:
+            root = self.face_parent[root]
+        while self.face_parent[f] >= 0 and self.face_parent[f] != root:
+            self.face_parent[f], f = root, self.face_parent[f]
+        return root
+
+    def get_rotation_index(self, v: ArrayVertex):
+        return self.rotation_indices.get(v.index)
+
+    def set_rotation_index(self, v: ArrayVertex, outgoing):
+        if outgoing is None:
+            self.rotation_indices.pop(v.index, None)
+        else:
+            self.rotation_indices[v.index] = outgoing
+
+    def add_half_edge(self, h: ArrayHalfEdge):
+        self.half_edges.add(h.index)
+
+    def remove_half_edge(self, h: ArrayHalfEdge):
+        self.half_edges.remove(h.index)
+
+    def add_face(self, f: ArrayFace):
+        self.faces.add(f.index)
+
+    def remove_face(self, f: ArrayFace):
+        self.faces.remove(f.index)
+
+    def clear_faces(self):
+        """
+        Removes all faces and truncates the face arrays to the initial faces, whose rows reset() reuses, such that
+        the arrays do not grow with every reset or recompute_faces. No half-edge may refer to the other faces
+        afterwards.
+        """
+        k = len(self.initial_faces)
+        for a in (self.outer_component, self.face_type, self.face_parent):
+            del a[k:]
+        self.face_parent[:] = array("q", [-1]) * k
+        self.faces.alive = bytearray(k)
+        self.faces.count = 0
+
+    def rotate_right(self, times=1):
+        for _ in range(times):
+            self.x, self.y = self.y, array("q", (-x for x in self.x))
+        self.clear_caches()
+
+    def rotate_left(self, times=1):
+        for _ in range(times):
+            self.x, self.y = array("q", (-y for y in self.y)), self.x
+        self.clear_caches()
+
+    def clear_caches(self):
+        self.sweep_lines = {}
+        self.vertex_type_cache = {}
+        self.event_order_cache = {}
+
+    def format_solution(self):
+        polygons = list()
+        x, y, origin, prev = self.x, self.y, self.origin, self.prev
+
+        # Each interior face corresponds to a polygon:
+        for f in self.interior_faces():
+            polygon = list()
+            start = self.outer_component[f.index]
+            e = start
+            while True:
+                v = origin[e]
+                polygon.append({"x": x[v], "y": y[v]})
+                e = prev[e]
+                if e == start:
+                    break
+            polygons.append(polygon)
+
+        return {"polygons": polygons}
+
+    def solution_coordinates(self):
+        x, y, origin, prev = self.x, self.y, self.origin, self.prev
+        for f in self.interior_faces():
+            coordinates = list()
+            start = self.outer_component[f.index]
+            e = start
+            while True:
+                v = origin[e]
+                coordinates += (x[v], y[v])
+                e = prev[e]
+                if e == start:
+                    break
+            yield coordinates
@@ -0,0 +1,203 @@
+"""
+Analysis of the boundary rings of a polygon, computed for all rings at once from the coordinate arrays (see
+datastructures.instance for the format of x, y and offsets): the turn direction at every vertex, which vertices are
+reflex, and the vertex types of a sweep.
+
+All computations use exact integer arithmetic. If NumPy is installed (it is optional) and the coordinates are small
+enough for the cross products to fit in 64-bit integers, they are vectorized over all vertices. Otherwise the same
+computations are done in a single pass in Python.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Values of datastructures.dcel.VertexType
+START, END, MERGE, SPLIT, REGULAR_RIGHT, REGULAR_LEFT = range(6)
+# If the differences between coordinates are below this bound, cross products of differences fit in 64 bits
+INT64_DIFFERENCE_BOUND = 2 ** 31
+
+
+def sweep_arrays(x, y, direction=0):
+    """
+    Returns the coordinates after rotating the polygon direction * 90 degrees clockwise, like
+    datastructures.dcel.sweep_coordinates.
+    """
+    if direction == 0:
+        return x, y
+    if direction == 1:
+        return y, [-c for c in x]
+    if direction == 2:
+        return [-c for c in x], [-c for c in y]
+    return [-c for c in y], x
+
+
+def neighbour_coordinates(x, y, offsets):
+    """
+    Returns the lists of coordinates of all vertices, and those of their previous and next vertices in their ring.
+    """
+    xs, ys = list(x), list(y)
+    px, py = xs[-1:] + xs[:-1], ys[-1:] + ys[:-1]
+    nx, ny = xs[1:] + xs[:1], ys[1:] + ys[:1]
+    for r in range(len(offsets) - 1):
+        first, last = offsets[r], offsets[r + 1] - 1
+        px[first], py[first] = xs[last], ys[last]
+        nx[last], ny[last] = xs[first], ys[first]
+    return xs, ys, px, py, nx, ny
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def turn_directions(x, y, offsets):
+    """
+    Returns for every vertex whether its ring turns left (1), right (-1) or goes straight on (0) at the vertex.
+    """
+    arrays = numpy_arrays(x, y)
+    if arrays is not None:
+        return numpy_turn_directions(*arrays, offsets).tolist()
+    xs, ys, px, py, nx, ny = neighbour_coordinates(x, y, offsets)
+    return [sign((x1 - x0) * (y2 - y1) - (y1 - y0) * (x2 - x1))
+            for x0, y0, x1, y1, x2, y2 in zip(px, py, xs, ys, nx, ny)]
+
+
+def ring_orientations(x, y, offsets, turns=None):
+    """
+    Returns for every ring whether it is counter-clockwise (1) or clockwise (-1). The orientation of a ring is the
+    turn direction at its lowest leftmost vertex, which is always a convex corner of the ring.
+    """
+    if turns is None:
+        turns = turn_directions(x, y, offsets)
+    orientations = []
+    for r in range(len(offsets) - 1):
+        start, end = offsets[r], offsets[r + 1]
+        _, _, lowest = min(zip(y[start:end], x[start:end], range(start, end)))
+        orientations.append(turns[lowest])
+    return orientations
+
+
+def interior_left(orientations):
+    """
+    Returns for every ring whether the interior of the polygon lies to the left of it, which is the case for a
+    counter-clockwise outer boundary (ring 0) and for clockwise holes.
+    """
+    return [(orientations[r] > 0) == (r == 0) for r in range(len(orientations))]
+
+
+def per_vertex(values, offsets):
+    """
+    Repeats the value of every ring for each of its vertices.
+    """
+    result = []
+    for r in range(len(offsets) - 1):
+        result.extend([values[r]] * (offsets[r + 1] - offsets[r]))
+    return result
+
+
+def reflex_flags(x, y, offsets):
+    """
+    Returns for every vertex whether the interior angle of the polygon at the vertex is larger than 180 degrees.
+    """
+    turns = turn_directions(x, y, offsets)
+    left = interior_left(ring_orientations(x, y, offsets, turns))
+    reflex_turns = per_vertex([-1 if l else 1 for l in left], offsets)
+    return [turn == reflex_turn for turn, reflex_turn in zip(turns, reflex_turns)]
+
+
+def classify_vertices(x, y, offsets, direction=0):
+    """
+    Returns the vertex type (one of START, ..., REGULAR_LEFT) of every vertex for a sweep from top to bottom in the
+    given direction. A vertex is above another one if its y-coordinate is larger, or if it is equal and its
+    x-coordinate is smaller.
+    """
+    arrays = numpy_arrays(x, y)
+    if arrays is not None:
+        return numpy_classify_vertices(*numpy_sweep_arrays(*arrays, direction), offsets).tolist()
+
+    x, y = sweep_arrays(x, y, direction)
+    turns = turn_directions(x, y, offsets)
+    left = per_vertex(interior_left(ring_orientations(x, y, offsets, turns)), offsets)
+    xs, ys, px, py, nx, ny = neighbour_coordinates(x, y, offsets)
+    types = []
+    for x0, y0, x1, y1, x2, y2, turn, l in zip(px, py, xs, ys, nx, ny, turns, left):
+        prev_above = y0 > y1 or y0 == y1 and x0 < x1
+        next_above = y2 > y1 or y2 == y1 and x2 < x1
+        if prev_above == next_above:
+            convex = turn == (1 if l else -1)
+            if prev_above:
+                types.append(END if convex else MERGE)
+            else:
+                types.append(START if convex else SPLIT)
+        # Going downwards, the interior is to the right of the vertex if it is to the left of the ring
+        elif prev_above:
+            types.append(REGULAR_RIGHT if l else REGULAR_LEFT)
+        else:
+            types.append(REGULAR_LEFT if l else REGULAR_RIGHT)
+    return types
+
+
+def numpy_arrays(x, y):
+    """
+    Returns x and y as NumPy arrays of 64-bit integers, or None if NumPy is not installed or the coordinates are too
+    far apart for the cross products to be computed exactly in 64 bits.
+    """
+    if np is None or len(x) == 0:
+        return None
+    try:
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+    except OverflowError:
+        return None
+    if max(int(x.max()) - int(x.min()), int(y.max()) - int(y.min())) >= INT64_DIFFERENCE_BOUND:
+        return None
+    return x, y
+
+
+def numpy_sweep_arrays(x, y, direction=0):
+    if direction == 0:
+        return x, y
+    if direction == 1:
+        return y, -x
+    if direction == 2:
+        return -x, -y
+    return -y, x
+
+
+def numpy_neighbours(offsets):
+    offsets = np.asarray(offsets, dtype=np.int64)
+    index = np.arange(offsets[-1])
+    prev = index - 1
+    next = index + 1
+    prev[offsets[:-1]] = offsets[1:] - 1
+    next[offsets[1:] - 1] = offsets[:-1]
+    return prev, next
+
+
+def numpy_turn_directions(x, y, offsets):
+    prev, next = numpy_neighbours(offsets)
+    cross = (x - x[prev]) * (y[next] - y) - (y - y[prev]) * (x[next] - x)
+    return np.sign(cross).astype(np.int8)
+
+
+def numpy_ring_orientations(x, y, offsets, turns):
+    lengths = np.diff(np.asarray(offsets, dtype=np.int64))
+    ring = np.repeat(np.arange(len(lengths)), lengths)
+    # Sorted on ring, then y, then x, the first vertex of every ring is its lowest leftmost vertex
+    order = np.lexsort((x, y, ring))
+    return turns[order[np.asarray(offsets[:-1], dtype=np.int64)]].tolist()
+
+
+def numpy_classify_vertices(x, y, offsets):
+    prev, next = numpy_neighbours(offsets)
+    turns = numpy_turn_directions(x, y, offsets)
+    lengths = np.diff(np.asarray(offsets, dtype=np.int64))
+    left = np.repeat(np.array(interior_left(numpy_ring_orientations(x, y, offsets, turns)), dtype=bool), lengths)
+
+    prev_above = (y[prev] > y) | (y[prev] == y) & (x[prev] < x)
+    next_above = (y[next] > y) | (y[next] == y) & (x[next] < x)
+    convex = turns == np.where(left, 1, -1)
+    return np.select(
+        [~prev_above & ~next_above, prev_above & next_above, prev_above],
+        [np.where(convex, START, SPLIT), np.where(convex, END, MERGE), np.where(left, REGULAR_RIGHT, REGULAR_LEFT)],
+        np.where(left, REGULAR_LEFT, REGULAR_RIGHT))
@@ -1,5 +1,7 @@
 from enum import Enum
 from datastructures.rationals import Rationals as rat
+from datastructures.boundary import classify_vertices
+from datastructures import metrics
 
 
 class FaceType(Enum):
@@ -16,6 +18,10 @@ class VertexType(Enum):
     REGULAR_RIGHT = 4
     REGULAR_LEFT = 5
 
+
+# VertexTypes by value, the vertex types computed by datastructures.boundary are values
+VERTEX_TYPES = list(VertexType)
+
 # every (half-)edge:
 #   origin (vertex)
 #   twin (half-edge)
@@ -32,31 +38,64 @@ class VertexType(Enum):
 
 
 class Vertex:
-    def __init__(self, x, y):
+    def __init__(self, x, y, index=None):
         self.x = x
         self.y = y
+        # Position in DCEL.vertices
+        self.index = index
         self.incident_half_edge = None
-        # Required for algorithm
-        self.type = None
+        # Outgoing half-edges in counter-clockwise order, built on demand by DCEL.rotation_index
+        self.outgoing = None
 
 
 class HalfEdge:
     def __init__(self, origin: Vertex):
         self.origin = origin
         self.twin = None
-        self.incident_face = None
+        self._incident_face = None
         self.next = None
         self.prev = None
         # Used for computing faces after insertions
         self.marked = False
         # Required for algorithm
         self.helper = None
+        # Cached intersection data with the sweep line, see edgebst.sweep_line
+        self.sweep_line = None
+
+    @property
+    def incident_face(self):
+        """
+        The incident face, resolved to the face it has been merged into if any.
+        """
+        f = self._incident_face
+        if f and f.parent:
+            f = f.find()
+            self._incident_face = f
+        return f
+
+    @incident_face.setter
+    def incident_face(self, f):
+        self._incident_face = f
 
 
 class Face:
     def __init__(self):
         self.outer_component = None
         self.type = None
+        # Union-find structure, parent is the face this face has been merged into (None if it is a root)
+        self.parent = None
+
+    def find(self):
+        """
+        Returns the face this face has (transitively) been merged into, compressing the path along the way.
+        """
+        root = self
+        while root.parent:
+            root = root.parent
+        f = self
+        while f.parent and f.parent != root:
+            f.parent, f = root, f.parent
+        return root
 
 
 class DCEL:
@@ -64,9 +103,15 @@ class DCEL:
     An implementation of a doubly connected edge list
 
     Attributes:
-        half_edges: list of HalfEdges
+        half_edges: insertion-ordered set of HalfEdges (a dict with None values), allowing O(1) removal
         vertices: list of Vertices
-        faces: list of Faces
+        faces: insertion-ordered set of Faces (a dict with None values), allowing O(1) removal
+        rings: list of (start, length, inner face, outer face) for the outer boundary and the holes, the half-edges
+            of a ring are boundary_half_edges[start:start + 2 * length]
+        boundary_half_edges: list of the half-edges on the boundary of the polygon, in order of creation
+
+    Algorithms that sweep the polygon take a direction, the number of times the polygon is rotated 90 degrees
+    clockwise before sweeping from top to bottom (see sweep_coordinates). The coordinates themselves are not changed.
     """
 
     def __init__(self, outer_boundary: list[dict], holes: list[dict], verbose=False):
@@ -80,86 +125,188 @@ class DCEL:
         holes:
             A list of lists of vertices adhering to the same format as outer_boundary.
         """
+        rings = [outer_boundary] + holes
+        offsets = [0]
+        for ring in rings:
+            offsets.append(offsets[-1] + len(ring))
+        self.build([p["x"] for ring in rings for p in ring], [p["y"] for ring in rings for p in ring], offsets,
+                   verbose)
+
+    @classmethod
+    def from_instance(cls, instance, verbose=False):
+        """
+        Creates the DCEL from an Instance (see datastructures.instance), without going through dicts.
+        """
+        dcel = cls.__new__(cls)
+        dcel.build(instance.x, instance.y, instance.offsets, verbose)
+        return dcel
+
+    def build(self, x, y, offsets, verbose=False):
+        """
+        Creates the DCEL from the coordinates of all vertices, where ring i (the outer boundary followed by the
+        holes) consists of the vertices offsets[i], ..., offsets[i + 1] - 1.
+        """
 
         if verbose:
             print("Building DCEL...")
 
-        self.half_edges = []
+        self.half_edges = {}
         self.vertices = []
-        self.faces = []
+        self.faces = {}
+        self.rings = []
+        self.boundary_half_edges = []
+        # Caches of vertex_types and event_order
+        self.vertex_type_cache = {}
+        self.event_order_cache = {}
 
         # Outer face incident to outer boundary
-        boundary_outer_face = Face()
-        boundary_outer_face.type = FaceType.OUTER
+        boundary_outer_face = self.new_face(FaceType.OUTER)
         # The face that is the interior of the polygon
         # (our input format guarantees that at initalization there is at most 1 such face)
-        interior_face = Face()
-        interior_face.type = FaceType.INTERIOR
+        interior_face = self.new_face(FaceType.INTERIOR)
 
         # Initialize vertices and edges on outer boundary:
         self.process_boundary(
-            outer_boundary, interior_face, boundary_outer_face)
+            x, y, offsets[0], offsets[1], interior_face, boundary_outer_face)
 
         # Initialize vertices and edge on hole boundaries:
-        for hole_boundary in holes:
-            hole_outer_face = Face()
-            hole_outer_face.type = FaceType.HOLE
+        for i in range(1, len(offsets) - 1):
+            hole_outer_face = self.new_face(FaceType.HOLE)
+            # Until the hole is connected to the rest of the polygon by an edge, the cycle around it has a face
+            # of its own that is not part of self.faces, see insert_edge
+            hole_interior_face = self.new_face(FaceType.INTERIOR)
             self.process_boundary(
-                hole_boundary, interior_face, hole_outer_face)
-            self.faces.append(hole_outer_face)
+                x, y, offsets[i], offsets[i + 1], hole_interior_face, hole_outer_face)
+            self.add_face(hole_outer_face)
 
-        self.faces.append(interior_face)
-        self.faces.append(boundary_outer_face)
-        self.compute_vertex_types()
+        self.add_face(interior_face)
+        self.add_face(boundary_outer_face)
+        self.boundary_half_edges = list(self.half_edges)
+        self.initial_faces = list(self.faces)
 
         if verbose:
             print("Finished building DCEL.")
 
-    def in_between(self, v1, v2, v1_incident_edge):
+    def reset(self):
         """
-        Checks whether the edge (v1, v2) falls in between v1_incident_edge and its prev
+        Removes all edges that have been inserted and restores the faces, such that the DCEL represents the input
+        polygon again. Cached data that only depends on the coordinates (vertex types, event orders and sweep lines)
+        is kept, which makes this much cheaper than building a new DCEL.
         """
-        if edge_angle(v1, v1_incident_edge.twin.origin) > edge_angle(v1, v1_incident_edge.prev.origin):
-            if (edge_angle(v1, v1_incident_edge.twin.origin) > edge_angle(v1, v2) and
-                    edge_angle(v1, v1_incident_edge.prev.origin) < edge_angle(v1, v2)):
-                return True
-            else:
-                return False
-        # The direction vertically downwards is included in the interval between v1_incident_edge
-        # and its prev
-        else:
-            if (edge_angle(v1, v1_incident_edge.twin.origin) > edge_angle(v1, v2) or
-                    edge_angle(v1, v1_incident_edge.prev.origin) < edge_angle(v1, v2)):
-                return True
+        boundary = self.boundary_half_edges
+        for start, length, inner_face, outer_face in self.rings:
+            for i in range(length):
+                j = (i + 1) % length
+                k = (i - 1) % length
+                h1 = boundary[start + 2 * i]
+                h2 = boundary[start + 2 * i + 1]
+                h1.next = boundary[start + 2 * j]
+                h1.prev = boundary[start + 2 * k]
+                h2.next = boundary[start + 2 * k + 1]
+                h2.prev = boundary[start + 2 * j + 1]
+                h1.incident_face = outer_face
+                h2.incident_face = inner_face
+                h1.helper = h2.helper = None
+                h1.marked = h2.marked = False
+            for f in (inner_face, outer_face):
+                f.parent = None
+            last = start + 2 * (length - 1)
+            inner_face.outer_component = boundary[last + 1]
+            if outer_face.type != FaceType.OUTER:
+                outer_face.outer_component = boundary[last]
+        for v in self.vertices:
+            self.set_rotation_index(v, None)
+        self.half_edges = dict.fromkeys(boundary)
+        self.faces = dict.fromkeys(self.initial_faces)
+
+    def vertex_types(self, direction=0):
+        """
+        Returns the list of VertexTypes of the vertices (indexed by Vertex.index) for sweeping in the given direction.
+        The types are computed once per direction.
+        """
+        if direction not in self.vertex_type_cache:
+            self.vertex_type_cache[direction] = self.compute_vertex_types(direction)
+        return self.vertex_type_cache[direction]
+
+    def event_order(self, direction=0):
+        """
+        Returns the vertices in the order in which a sweep in the given direction handles them: decreasing in the
+        sweep y-coordinate, and increasing in the sweep x-coordinate for equal y. As opposite directions handle the
+        vertices in reverse order, the vertices are only sorted once per axis.
+        """
+        axis = direction % 2
+        if axis not in self.event_order_cache:
+            self.event_order_cache[axis] = sorted(self.vertices, key=lambda v: event_key(v, axis))
+        order = self.event_order_cache[axis]
+        return order if direction < 2 else order[::-1]
+
+    def rotation_index(self, v: Vertex):
+        """
+        Returns the outgoing half-edges of v in counter-clockwise order. The list is built on first use by walking
+        around v and is kept up to date by insert_edge and delete_edge.
+        """
+        outgoing = self.get_rotation_index(v)
+        if outgoing is None:
+            outgoing = [v.incident_half_edge]
+            e = v.incident_half_edge.twin.next
+            while e != v.incident_half_edge:
+                outgoing.append(e)
+                e = e.twin.next
+            self.set_rotation_index(v, outgoing)
+        return outgoing
+
+    def get_rotation_index(self, v: Vertex):
+        return v.outgoing
+
+    def set_rotation_index(self, v: Vertex, outgoing):
+        v.outgoing = outgoing
+
+    def insertion_position(self, v1: Vertex, v2: Vertex):
+        """
+        Returns the position in the rotation index of v1 at which the edge (v1, v2) should be inserted, i.e. the
+        index of the first outgoing half-edge that comes after (v1, v2) in counter-clockwise order (or the length of
+        the index if that is the first half-edge in the index). Uses binary search on the angle relative to the first
+        half-edge in the index, which is compared exactly using integer cross products.
+        """
+        outgoing = self.rotation_index(v1)
+        reference = outgoing[0].twin.origin
+        rx, ry = reference.x - v1.x, reference.y - v1.y
+        dx, dy = v2.x - v1.x, v2.y - v1.y
+        half = angular_half(rx, ry, dx, dy)
+
+        low, high = 1, len(outgoing)
+        while low < high:
+            middle = (low + high) // 2
+            w = outgoing[middle].twin.origin
+            mx, my = w.x - v1.x, w.y - v1.y
+            middle_half = angular_half(rx, ry, mx, my)
+            if half < middle_half or half == middle_half and dx * my - dy * mx > 0:
+                high = middle
             else:
-                return False
+                low = middle + 1
+        return low
 
     def insert_edge(self, v1: Vertex, v2: Vertex):
         """
         Inserts an edge between v1 and v2, v1 and v2 should be vertices in self.vertices.
-        Does not update the faces, for this self.recompute_faces() should be called.
+        If the edge splits a face, the part with the smallest boundary becomes a new face. If it connects a hole
+        to the boundary of a face instead, the cycle around the hole becomes part of that face.
         """
         # Find the outgoing half edge of v1 that comes after the new edge in counter-clockwise order
-        v1_edge_incident_to_f = v1.incident_half_edge
-        while not self.in_between(v1, v2, v1_edge_incident_to_f):
-            # if v1_edge_incident_to_f.twin.origin.x == v2.x and v1_edge_incident_to_f.twin.origin.y == v2.y: #TODO: THIS HAPPENS IN CASE WE'RE INSERTING A DUPE.
-            #     print(f"Inserting Duplicate edge: (({v1.x}, {v1.y}), ({v2.x}, {v2.y}))")
-            #     return
-            # elif edge_angle(v1, v2) == edge_angle(v1, v1_edge_incident_to_f.twin.origin):
-            #     print(f"Inserting overlapping edge: (({v1.x}, {v1.y}), ({v2.x}, {v2.y}))")
-            #     return
-            v1_edge_incident_to_f = v1_edge_incident_to_f.twin.next
+        v1_outgoing = self.rotation_index(v1)
+        v1_position = self.insertion_position(v1, v2)
+        v1_edge_incident_to_f = v1_outgoing[v1_position % len(v1_outgoing)]
 
         # Find the outgoing half edge of v2 that comes after the new edge in counter-clockwise order
-        v2_edge_incident_to_f = v2.incident_half_edge
-        while not self.in_between(v2, v1, v2_edge_incident_to_f):
-            # if edge_angle(v2, v1) == edge_angle(v2, v2_edge_incident_to_f.twin.origin):
-            #     print(f"Inserting overlapping edge: (({v2.x}, {v2.y}), ({v1.x}, {v1.y}))")
-            #     return
-            v2_edge_incident_to_f = v2_edge_incident_to_f.twin.next
+        v2_outgoing = self.rotation_index(v2)
+        v2_position = self.insertion_position(v2, v1)
+        v2_edge_incident_to_f = v2_outgoing[v2_position % len(v2_outgoing)]
+
+        f1 = v1_edge_incident_to_f.incident_face
+        f2 = v2_edge_incident_to_f.incident_face
 
-        h1 = HalfEdge(v1)
-        h2 = HalfEdge(v2)
+        h1 = self.new_half_edge(v1)
+        h2 = self.new_half_edge(v2)
 
         h1.twin = h2
         h2.twin = h1
@@ -174,8 +321,46 @@ class DCEL:
         v1_edge_incident_to_f.prev = h2
         v2_edge_incident_to_f.prev = h1
 
-        self.half_edges.append(h1)
-        self.half_edges.append(h2)
+        v1_outgoing.insert(v1_position, h1)
+        v2_outgoing.insert(v2_position, h2)
+
+        self.add_half_edge(h1)
+        self.add_half_edge(h2)
+
+        # Walk along the cycles of h1 and h2 simultaneously, until either one of them turns out to be a separate
+        # cycle, in which case the face is split, or they turn out to be the same cycle.
+        e1 = h1.next
+        e2 = h2.next
+        steps = 0
+        while e1 != h1 and e2 != h2 and e1 != h2 and e2 != h1:
+            e1 = e1.next
+            e2 = e2.next
+            steps += 1
+        if metrics.enabled:
+            metrics.count("insert_edge")
+            metrics.count("insert_edge_walk_steps", steps)
+
+        if e1 == h1 or e2 == h2:
+            # Relabel the smallest of the two cycles with a new face
+            smallest, largest = (h1, h2) if e1 == h1 else (h2, h1)
+            largest.incident_face = f1
+            f1.outer_component = largest
+            g = self.new_face(f1.type)
+            g.outer_component = smallest
+            e = smallest
+            e.incident_face = g
+            e = e.next
+            while e != smallest:
+                e.incident_face = g
+                e = e.next
+            self.add_face(g)
+        else:
+            # The cycle around a hole that was not yet connected becomes part of the face it lies in, which is the
+            # face in self.faces if either is (the face of the hole is not)
+            if f1 != f2:
+                f1 = self.merge_faces(f1, f2) if f1 in self.faces else self.merge_faces(f2, f1)
+            h1.incident_face = f1
+            h2.incident_face = f1
 
     def recompute_faces(self, verbose=False):
         """
@@ -185,36 +370,47 @@ class DCEL:
         if verbose:
             print("Recomputing faces...")
 
-        new_faces = []
+        # The types of the cycles are read before the faces are cleared, as clear_faces may free their storage
+        cycles = []
         for e in self.half_edges:
             if not e.marked:
-                f = Face()
                 # Even though a face might be subdivided it does not change type
                 if e.incident_face:
-                    f.type = e.incident_face.type
+                    cycles.append((e, e.incident_face.type))
                 # If an edge does not have an incident face it was newly inserted,
                 # and thus adjacent to an interior face
                 else:
-                    f.type = FaceType.INTERIOR
-                f.outer_component = e
-                new_faces.append(f)
+                    cycles.append((e, FaceType.INTERIOR))
                 while not e.marked:
-                    e.incident_face = f
                     e.marked = True
                     e = e.next
+        self.clear_faces()
+        for start, type in cycles:
+            f = self.new_face(type)
+            f.outer_component = start
+            self.add_face(f)
+            e = start
+            e.incident_face = f
+            e = e.next
+            while e != start:
+                e.incident_face = f
+                e = e.next
         # Undo the marking for later computations
         for e in self.half_edges:
             e.marked = False
-        self.faces = new_faces
 
         if verbose:
             print("Finished recomputing faces.")
 
     def delete_edge(self, e: HalfEdge):
         """
-        Deletes the half-edge e, e should be a half-edge contained in self.half_edges
+        Deletes the half-edge e, e should be a half-edge contained in self.half_edges. The face of the twin of e is
+        merged into the face of e, which is returned.
         """
 
+        if metrics.enabled:
+            metrics.count("delete_edge")
+
         # Update the pointers
         e_prev = e.prev
         e_next = e.next
@@ -226,22 +422,64 @@ class DCEL:
         twin_prev.next = e_next
         twin_next.prev = e_prev
 
-        # If deleted edge was the outer component of its incident face, update the pointer of the face to another edge
+        # Merge the face of the twin into the face of e, the edges of the merged face are not relabeled, their
+        # incident face is resolved through the union-find structure of the faces instead.
         f = e.incident_face
-        if f.outer_component == e:
+        g = e.twin.incident_face
+        if f != g:
+            self.merge_faces(f, g)
+        # If the outer component was e or its twin, update it to an edge that is still present
+        if f.outer_component == e or f.outer_component == e.twin:
             f.outer_component = e_next
 
-        # Update faces
-        current_edge = e_next
-        current_edge.incident_face = f
-        current_edge = current_edge.next
-        while current_edge != e_next:
-            current_edge.incident_face = f
-            current_edge = current_edge.next
+        for h in (e, e.twin):
+            outgoing = self.get_rotation_index(h.origin)
+            if outgoing is not None:
+                outgoing.remove(h)
+
+        self.remove_half_edge(e)
+        self.remove_half_edge(e.twin)
+        return f
+
+    def merge_faces(self, f: Face, g: Face):
+        """
+        Merges the face g into the face f (which should be distinct) and returns f. g is removed from self.faces if
+        it is in there (the face of a hole that is not yet connected is not, see insert_edge). f is always kept, such
+        that it keeps its position in self.faces, so the union-find structure relies on path compression alone. The
+        outer component of f is not updated.
+        """
+        g.parent = f
+        self.remove_face(g)
+        return f
 
-        self.faces.remove(e.twin.incident_face)
-        self.half_edges.remove(e)
-        self.half_edges.remove(e.twin)
+    def new_half_edge(self, origin: Vertex):
+        """
+        Creates a half-edge with the given origin, it is not added to self.half_edges.
+        """
+        return HalfEdge(origin)
+
+    def new_face(self, type: FaceType):
+        """
+        Creates a face of the given type, it is not added to self.faces.
+        """
+        f = Face()
+        f.type = type
+        return f
+
+    def add_half_edge(self, h: HalfEdge):
+        self.half_edges[h] = None
+
+    def remove_half_edge(self, h: HalfEdge):
+        del self.half_edges[h]
+
+    def add_face(self, f: Face):
+        self.faces[f] = None
+
+    def remove_face(self, f: Face):
+        self.faces.pop(f, None)
+
+    def clear_faces(self):
+        self.faces = {}
 
     def rotate_right(self, times=1):
         """
@@ -250,7 +488,7 @@ class DCEL:
         for _ in range(times):
             for v in self.vertices:
                 v.x, v.y = v.y, -v.x
-        self.compute_vertex_types()
+        self.clear_caches()
 
     def rotate_left(self, times=1):
         """
@@ -259,7 +497,16 @@ class DCEL:
         for _ in range(times):
             for v in self.vertices:
                 v.x, v.y = -v.y, v.x
-        self.compute_vertex_types()
+        self.clear_caches()
+
+    def clear_caches(self):
+        """
+        Invalidates all data cached per sweep direction, needed after the coordinates changed.
+        """
+        for h in self.half_edges:
+            h.sweep_line = None
+        self.vertex_type_cache = {}
+        self.event_order_cache = {}
 
     def interior_faces(self):
         """
@@ -287,17 +534,34 @@ class DCEL:
 
         return {"polygons": polygons}
 
-    def process_boundary(self, boundary: list[dict], inner_face: Face, outer_face: Face):
+    def solution_coordinates(self):
+        """
+        Yields the coordinates of every polygon of format_solution, in the same order, as a flat list
+        [x1, y1, x2, y2, ...], without building the whole solution.
+        """
+        for f in self.interior_faces():
+            coordinates = list()
+            e = f.outer_component
+            while True:
+                coordinates += (e.origin.x, e.origin.y)
+                e = e.prev
+                if e == f.outer_component:
+                    break
+            yield coordinates
+
+    def process_boundary(self, x, y, start: int, end: int, inner_face: Face, outer_face: Face):
         """
-        Auxiliary function that creates vertices and half edges corresponding to input boundary
+        Auxiliary function that creates vertices and half edges corresponding to the input boundary consisting of
+        the vertices start, ..., end - 1
         """
+        self.rings.append((2 * len(self.vertices), end - start, inner_face, outer_face))
         old_h1 = None
         old_h2 = None
-        v1 = Vertex(boundary[0]["x"], boundary[0]["y"])
-        for i in range(1, len(boundary)):
-            v2 = Vertex(boundary[i]["x"], boundary[i]["y"])
-            h1 = HalfEdge(v1)
-            h2 = HalfEdge(v2)
+        v1 = Vertex(x[start], y[start], len(self.vertices))
+        for i in range(start + 1, end):
+            v2 = Vertex(x[i], y[i], len(self.vertices) + 1)
+            h1 = self.new_half_edge(v1)
+            h2 = self.new_half_edge(v2)
 
             v1.incident_half_edge = h1
 
@@ -309,7 +573,7 @@ class DCEL:
             h1.incident_face = outer_face
             h2.incident_face = inner_face
 
-            if i == 1:
+            if i == start + 1:
                 first_vertex = v1
                 first_h1 = h1
                 first_h2 = h2
@@ -320,16 +584,16 @@ class DCEL:
                 h2.next = old_h2
 
             self.vertices.append(v1)
-            self.half_edges.append(h1)
-            self.half_edges.append(h2)
+            self.add_half_edge(h1)
+            self.add_half_edge(h2)
 
             old_h1 = h1
             old_h2 = h2
             v1 = v2
 
         # Add edges between the last and the first vertex in the list
-        h1 = HalfEdge(v1)
-        h2 = HalfEdge(first_vertex)
+        h1 = self.new_half_edge(v1)
+        h2 = self.new_half_edge(first_vertex)
 
         v1.incident_half_edge = h1
 
@@ -349,155 +613,84 @@ class DCEL:
         first_h2.next = h2
 
         self.vertices.append(v1)
-        self.half_edges.append(h1)
-        self.half_edges.append(h2)
+        self.add_half_edge(h1)
+        self.add_half_edge(h2)
 
         # outer_face.inner_components.append(h1)
-        if outer_face.type == FaceType.OUTER:
-            inner_face.outer_component = h2
-        else:
+        inner_face.outer_component = h2
+        if outer_face.type != FaceType.OUTER:
             outer_face.outer_component = h1
 
-    def compute_vertex_types(self):
-        def compute_vertex_types_of_boundary(vertex: Vertex, hole):
-            # Find the topmost leftmost vertex
-            v_max = vertex
-            v = vertex.incident_half_edge.twin.origin
-            while v != vertex:
-                if v_max.y <= v.y and (v_max.y != v.y or v_max.x > v.x):
-                    v_max = v
-                v = v.incident_half_edge.twin.origin
-            # we start at the top of the outer boundary where the topmost vertex is always located
-            # we will always move downwards to the left for the first edge
-            if not hole:
-                v_max.type = VertexType.START
-            else:
-                v_max.type = VertexType.SPLIT
-
-            left_of_polygon = not hole
-            up = False
-
-            # cycle trough all the edges of the face and their respective origins
-            current_edge = v_max.incident_half_edge.next
-            current_vertex = current_edge.origin
-            while current_vertex != v_max:
-                next_edge = current_edge.next
-                next_vertex = next_edge.origin
-
-                # current_edge is going down
-                if current_vertex.y > next_vertex.y or (current_vertex.y == next_vertex.y and next_vertex.x > current_vertex.x):
-                    # previous edge was also going down, direction did not change
-                    if not up:
-                        if left_of_polygon:
-                            if not hole:
-                                current_vertex.type = VertexType.REGULAR_RIGHT
-                            else:
-                                current_vertex.type = VertexType.REGULAR_LEFT
-                        else:
-                            if not hole:
-                                current_vertex.type = VertexType.REGULAR_LEFT
-                            else:
-                                current_vertex.type = VertexType.REGULAR_RIGHT
-
-                    # direction changed from up to down
-                    else:
-                        up = False
-                        if left_of_polygon == (leftmost_edge(current_edge, current_edge.prev.twin, up) == current_edge):
-                            if not hole:
-                                current_vertex.type = VertexType.SPLIT
-                            else:
-                                current_vertex.type = VertexType.START
-                        else:
-                            if not hole:
-                                current_vertex.type = VertexType.START
-                            else:
-                                current_vertex.type = VertexType.SPLIT
-                        left_of_polygon = not left_of_polygon
-
-                # current_edge is going up
-                else:
-                    # previous edge was also going up, direction did not change
-                    if up:
-                        if left_of_polygon:
-                            if not hole:
-                                current_vertex.type = VertexType.REGULAR_RIGHT
-                            else:
-                                current_vertex.type = VertexType.REGULAR_LEFT
-                        else:
-                            if not hole:
-                                current_vertex.type = VertexType.REGULAR_LEFT
-                            else:
-                                current_vertex.type = VertexType.REGULAR_RIGHT
-                    # direction changed from down to up
-                    else:
-                        up = True
-                        if left_of_polygon == (leftmost_edge(current_edge, current_edge.prev.twin, up) == current_edge):
-                            if not hole:
-                                current_vertex.type = VertexType.MERGE
-                            else:
-                                current_vertex.type = VertexType.END
-                        else:
-                            if not hole:
-                                current_vertex.type = VertexType.END
-                            else:
-                                current_vertex.type = VertexType.MERGE
-                        left_of_polygon = not left_of_polygon
-
-                # Move on to the next vertex
-                current_edge = next_edge
-                current_vertex = next_vertex
-
-        # Do the same for the holes
-        for f in self.faces:
-            if f.type == FaceType.INTERIOR:
-                compute_vertex_types_of_boundary(
-                    f.outer_component.origin, hole=False)
-            if f.type == FaceType.HOLE:
-                compute_vertex_types_of_boundary(
-                    f.outer_component.origin, hole=True)
-
-
-def edge_angle(v1: Vertex, v2: Vertex):
+    def compute_vertex_types(self, direction=0):
+        """
+        Classifies the vertices for a sweep in the given direction, returns a list of VertexTypes indexed by Vertex.index.
+        """
+        return [VERTEX_TYPES[t] for t in classify_vertices(*self.coordinate_arrays(), direction)]
+
+    def coordinate_arrays(self):
+        """
+        Returns the coordinates of the vertices and the ring offsets in the format of datastructures.instance.
+        """
+        offsets = [start // 2 for start, _, _, _ in self.rings]
+        offsets.append(len(self.vertices))
+        return [v.x for v in self.vertices], [v.y for v in self.vertices], offsets
+
+    def vertex(self, index):
+        return self.vertices[index]
+
+
+def sweep_coordinates(v: Vertex, direction=0):
+    """
+    Returns the coordinates (x, y) of v after rotating the polygon direction * 90 degrees clockwise.
+    """
+    if direction == 0:
+        return v.x, v.y
+    if direction == 1:
+        return v.y, -v.x
+    if direction == 2:
+        return -v.x, -v.y
+    return -v.y, v.x
+
+
+def event_key(v: Vertex, direction=0):
     """
-    Returns a pair (a, b), where a is either 0, 1, 2, or 3, and b is the slope of the edge (v1, v2) (or None if the slope is (-)infinity).
+    Sort key of the order in which a sweep in the given direction handles the vertices.
+    """
+    x, y = sweep_coordinates(v, direction)
+    return (-y, x)
+
+
+def edge_angle(v1: Vertex, v2: Vertex, direction=0):
+    """
+    Returns a pair (a, b), where a is either 0, 1, 2, or 3, and b is the slope of the edge (v1, v2) (or None if the slope is (-)infinity),
+    in the coordinates of a sweep in the given direction.
     a = 0 implies that (v1, v2) points to the right
     a = 1 implies that (v1, v2) points upwards
     a = 2 implies that (v1, v2) points to the left
     a = 3 implies that (v1, v2) points downwards
     """
+    x1, y1 = sweep_coordinates(v1, direction)
+    x2, y2 = sweep_coordinates(v2, direction)
     # Edge points to the right
-    if v2.x-v1.x > 0:
-        return (0, rat(v2.y - v1.y, v2.x - v1.x))
+    if x2-x1 > 0:
+        return (0, rat(y2 - y1, x2 - x1))
     # Edge points to the left
-    elif v2.x-v1.x < 0:
-        return (2, rat(v2.y - v1.y, v2.x - v1.x))
+    elif x2-x1 < 0:
+        return (2, rat(y2 - y1, x2 - x1))
     # Edge points vertically upwards
-    elif v2.y > v1.y:
+    elif y2 > y1:
         return (1, None)
     # Edge points vertically downwards
     else:
         return (3, None)
 
 
-def leftmost_edge(e1, e2, up):
+def angular_half(rx, ry, dx, dy):
     """
-    Returns the leftmost_edge given two adjacent edges that both point upwards or both point downwards.
+    Returns 0 if the direction (dx, dy) lies within the half-open half-plane of directions that are at most 180 degrees
+    counter-clockwise from (rx, ry) (including (rx, ry) itself), and 1 otherwise.
     """
-    angle_e1 = edge_angle(e1.origin, e1.twin.origin)
-    angle_e2 = edge_angle(e2.origin, e2.twin.origin)
-    if up:
-        if angle_e1 > angle_e2:
-            return e1
-        else:
-            return e2
-    else:
-        if angle_e1[0] == 0 and angle_e2[0] == 0 or angle_e1[0] >= 2 and angle_e2[0] >= 2:
-            if angle_e1 > angle_e2:
-                return e2
-            else:
-                return e1
-        else:
-            if angle_e1 > angle_e2:
-                return e1
-            else:
-                return e2
+    cross = rx * dy - ry * dx
+    if cross > 0 or cross == 0 and rx * dx + ry * dy > 0:
+        return 0
+    return 1
@@ -1,4 +1,6 @@
 from datastructures.rationals import Rationals as rat
+from datastructures.dcel import sweep_coordinates
+from datastructures import metrics
 
 
 def slope(edge):
@@ -14,238 +16,289 @@ def x_of_edge(edge, y):
         return rat(max(edge.origin.x, edge.twin.origin.x))
     # Edge is not horizontal nor vertical:
     else:
-        b = rat(edge.origin.y) - slope(edge) * rat(edge.origin.x)
-        x_edge = (rat(y) - b) / slope(edge)
+        m = slope(edge)
+        b = edge.origin.y - m * edge.origin.x
+        x_edge = (y - b) / m
         return x_edge
 
 
-def edge_smaller(edge1, edge2, y):
-    x_edge1 = x_of_edge(edge1, y)
-    x_edge2 = x_of_edge(edge2, y)
-    return x_edge1 < x_edge2
+def sweep_line(edge, direction=0):
+    """
+    Returns a tuple (direction, c, a, d) such that the edge intersects the sweep line at height y at
+    x = (c + a * y) / d in the coordinates of a sweep in the given direction, with d > 0. Horizontal edges are
+    placed at their right endpoint, like in x_of_edge. The tuple is cached on the half-edge, so it is only
+    computed once per direction in a row.
+    """
+    line = edge.sweep_line
+    if line and line[0] == direction:
+        return line
+    x1, y1 = sweep_coordinates(edge.origin, direction)
+    x2, y2 = sweep_coordinates(edge.twin.origin, direction)
+    if y1 == y2:
+        line = (direction, max(x1, x2), 0, 1)
+    elif x1 == x2:
+        line = (direction, x1, 0, 1)
+    else:
+        if y2 < y1:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        line = (direction, x1 * (y2 - y1) - y1 * (x2 - x1), x2 - x1, y2 - y1)
+    edge.sweep_line = line
+    return line
+
+
+def x_intercept(edge, y, direction=0):
+    """
+    Returns the x-coordinate at which the edge intersects the sweep line at height y as a pair (num, den),
+    with den > 0.
+    """
+    _, c, a, d = sweep_line(edge, direction)
+    return (c + a * y, d)
+
+
+def edge_smaller(edge1, edge2, y, direction=0):
+    """
+    Returns whether edge1 intersects the sweep line at height y left of edge2, by cross-multiplication.
+    """
+    num1, den1 = x_intercept(edge1, y, direction)
+    num2, den2 = x_intercept(edge2, y, direction)
+    return num1 * den2 < num2 * den1
 
 
 class EdgebstNode:
-    def __init__(self, val=None, right_end=None):
+    def __init__(self, edge):
+        self.edge = edge
         self.left = None
         self.right = None
-        self.val = val
-        self.right_end = right_end
+        self.parent = None
+        self.height = 1
+        # In-order neighbours, so the right end of an interval is found without walking the tree
+        self.prev = None
+        self.next = None
+
+
+def height(node):
+    return node.height if node else 0
+
+
+class EdgeBST:
+    """
+    Sweep-line status structure: an AVL tree of edges ordered on the x-coordinate at which they intersect
+    the sweep line. Every edge in the tree is the left end of an interval, whose right end is the next edge
+    in the tree (or None for the rightmost interval). All operations are iterative and take O(log n) time.
+    Coordinates are those of a sweep in the given direction, see sweep_coordinates.
+    """
+
+    def __init__(self, direction=0):
+        self.direction = direction
+        self.root = None
+        # Maps the edges in the tree to their nodes, such that they can be deleted without searching for them
+        self.nodes = {}
+        # Intercepts of edges with the sweep line at height self.y, valid for the duration of one event
+        self.y = None
+        self.intercepts = {}
+
+    def __len__(self):
+        return len(self.nodes)
 
-    def insert_interval(self, val, right_end, y):
+    def intercept(self, edge, y):
         """
-        Inserts a new interval node into the tree, used by insert()
+        Memoized x_intercept(edge, y), the memo is cleared whenever the sweep line moves.
         """
-        if not self.val:
-            self.val = val
-            self.right_end = right_end
-            return
+        if y != self.y:
+            self.y = y
+            self.intercepts = {}
+        intercept = self.intercepts.get(edge)
+        if not intercept:
+            intercept = x_intercept(edge, y, self.direction)
+            self.intercepts[edge] = intercept
+        return intercept
 
-        if self.val == val or self.val == self.val.twin:
+    def insert(self, edge, y):
+        """
+        Inserts a new edge into the tree. The interval it was contained in is now rightbounded by the
+        newly inserted edge, and the new edge is the left end of the remainder of that interval.
+        """
+        if edge in self.nodes or edge.twin in self.nodes:
             return
 
-        if edge_smaller(val, self.val, y):
-            if self.left:
-                self.left.insert_interval(val, right_end, y)
-                return
-            self.left = EdgebstNode(val, right_end)
+        node = EdgebstNode(edge)
+        self.nodes[edge] = node
+        if metrics.enabled:
+            metrics.count("edgebst_insert")
+        if not self.root:
+            self.root = node
             return
 
-        if self.right:
-            self.right.insert_interval(val, right_end, y)
+        num, den = self.intercept(edge, y)
+        parent = self.root
+        while True:
+            parent_num, parent_den = self.intercept(parent.edge, y)
+            if num * parent_den < parent_num * den:
+                if not parent.left:
+                    parent.left = node
+                    node.next = parent
+                    node.prev = parent.prev
+                    break
+                parent = parent.left
+            else:
+                if not parent.right:
+                    parent.right = node
+                    node.prev = parent
+                    node.next = parent.next
+                    break
+                parent = parent.right
+        node.parent = parent
+        if node.prev:
+            node.prev.next = node
+        if node.next:
+            node.next.prev = node
+        self.rebalance(parent)
+        if metrics.enabled:
+            metrics.record_maximum("edgebst_depth", self.root.height)
+
+    def delete(self, edge, y):
+        """
+        Deletes an edge from the tree. If there was an interval left of the deleted edge it extends up to
+        the right end of the interval of the deleted edge.
+        """
+        node = self.nodes.pop(edge, None) or self.nodes.pop(edge.twin, None)
+        if not node:
             return
-        self.right = EdgebstNode(val, right_end)
-
-    def delete_subfunction(self, val, y):
-        if self == None:
-            return self
-        # Element is located in left subtree
-        if edge_smaller(val, self.val, y):
-            if self.left:
-                self.left = self.left.delete_subfunction(val, y)
-            return self
-        # Element is locate in right subtree
-        if not edge_smaller(val, self.val, y) and val != self.val and val != self.val.twin:
-            if self.right:
-                self.right = self.right.delete_subfunction(val, y)
-            return self
-        # Current element should be deleted
-        if self.right == None:
-            return self.left
-        if self.left == None:
-            return self.right
-        min_larger_node = self.right
-        while min_larger_node.left:
-            min_larger_node = min_larger_node.left
-        self.val = min_larger_node.val
-        self.right_end = min_larger_node.right_end
-        self.right = self.right.delete_subfunction(min_larger_node.val, y)
-        return self
+
+        if node.left and node.right:
+            # Move the in-order successor into this node and remove the successor instead
+            successor = node.next
+            node.edge = successor.edge
+            self.nodes[node.edge] = node
+            node.next = successor.next
+            if node.next:
+                node.next.prev = node
+            node = successor
+        else:
+            if node.prev:
+                node.prev.next = node.next
+            if node.next:
+                node.next.prev = node.prev
+
+        # The node to be removed has at most one child, which takes its place
+        child = node.left or node.right
+        parent = node.parent
+        if child:
+            child.parent = parent
+        if not parent:
+            self.root = child
+        elif parent.left == node:
+            parent.left = child
+        else:
+            parent.right = child
+        self.rebalance(parent)
 
     def range_query(self, x, y):
         """
-        returns a tuple consisting of the endpoints of the range in which the querypoint is contained
+        Returns a tuple consisting of the endpoints of the interval in which the query point (x, y) is contained,
+        or None if the query point lies left of the leftmost interval. x should be an integer.
         """
-        if not self.val:
-            return None
-        if x_of_edge(self.val, y) < x and (not self.right_end or x < x_of_edge(self.right_end, y)):
-            return (self.val, self.right_end)
-        if x_of_edge(self.val, y) > x:
-            if self.left:
-                return self.left.range_query(x, y)
+        node = self.root
+        best = None
+        while node:
+            num, den = self.intercept(node.edge, y)
+            if num < x * den:
+                best = node
+                node = node.right
             else:
-                # The query point lies left of the leftmost interval
-                return None
-        if x_of_edge(self.right_end, y) < x:
-            return self.right.range_query(x, y)
-
-    def right_end_query(self, val, y):
-        """
-        given the left end of an interval, returns the right end of that interval
-        """
-        if self.val == val or self.val == val.twin:
-            return self.right_end
-        if x_of_edge(self.val, y) > x_of_edge(val, y):
-            return self.left.right_end_query(val, y)
-        if x_of_edge(self.val, y) < x_of_edge(val, y):
-            return self.right.right_end_query(val, y)
-
-    def left_end_query(self, right_end, y):
-        """
-        given the right end of an interval, returns the left end of that interval
-        """
-        if self.right_end == right_end or self.right_end == right_end.twin:
-            return self.val
-        if not self.right_end or x_of_edge(self.right_end, y) > x_of_edge(right_end, y):
-            if not self.left:
-                return None
-            return self.left.left_end_query(right_end, y)
-        if x_of_edge(self.right_end, y) < x_of_edge(right_end, y):
-            return self.right.left_end_query(right_end, y)
-
-    def get_left_most_edge(self):
-        if not self.left:
-            return self.val
-        else:
-            return self.left.get_left_most_edge()
+                node = node.left
+        if not best:
+            return None
+        return (best.edge, best.next.edge if best.next else None)
 
-    def insert(self, val, y):
+    def rebalance(self, node):
         """
-        Inserts a new edge into the tree by first querying the interval this new edge is contained in
-        (which will now be rightbounded by the newly inserted edge) and replacing it with the two new
-        intervals.
+        Restores the AVL property on the path from node up to the root.
         """
-        if self.val == None:
-            self.insert_interval(val, None, y)
-            return self
-        else:
-            # First query the interval in which the new edge is contained
-            interval = self.range_query(x_of_edge(val, y), y)
-            if not interval:
-                # The edge we are inserting is the leftmost edge, i.e. it is not contained in any existing intervals
-                right_end = self.get_left_most_edge()
-                self.insert_interval(val, right_end, y)
-                return self
-            else:
-                old_val, old_right_end = interval
-                # Delete the interval from the tree and replace it with two new ones
-                t = self.delete_subfunction(old_val, y)
-                if not t:
-                    t = EdgebstNode()
-                t.insert_interval(old_val, val, y)
-                t.insert_interval(val, old_right_end, y)
-                return t
-
-    def delete(self, val, y):
-        """
-        Deletes an edge from the tree. If there was an interval left of the deleted edge it extends,
-        hence we replace this interval with the updated one.
-        """
-        # Find right end of interval being deleted
-        right_end = self.right_end_query(val, y)
-        # Find left edge of interval whose left end now changed and replace it
-        left_end = self.left_end_query(val, y)
-        if not left_end:
-            # Interval deleted was leftmost interval, no interval to replace
-            t = self.delete_subfunction(val, y)
-            if not t:
-                t = EdgebstNode()
-            return t
+        while node:
+            node.height = 1 + max(height(node.left), height(node.right))
+            balance = height(node.left) - height(node.right)
+            if balance > 1:
+                if height(node.left.left) < height(node.left.right):
+                    self.rotate_left(node.left)
+                node = self.rotate_right(node)
+            elif balance < -1:
+                if height(node.right.right) < height(node.right.left):
+                    self.rotate_right(node.right)
+                node = self.rotate_left(node)
+            node = node.parent
+
+    def rotate_left(self, node):
+        pivot = node.right
+        node.right = pivot.left
+        if pivot.left:
+            pivot.left.parent = node
+        self.replace_child(node, pivot)
+        pivot.left = node
+        node.parent = pivot
+        node.height = 1 + max(height(node.left), height(node.right))
+        pivot.height = 1 + max(height(pivot.left), height(pivot.right))
+        return pivot
+
+    def rotate_right(self, node):
+        pivot = node.left
+        node.left = pivot.right
+        if pivot.right:
+            pivot.right.parent = node
+        self.replace_child(node, pivot)
+        pivot.right = node
+        node.parent = pivot
+        node.height = 1 + max(height(node.left), height(node.right))
+        pivot.height = 1 + max(height(pivot.left), height(pivot.right))
+        return pivot
+
+    def replace_child(self, node, replacement):
+        """
+        Puts replacement in the position of node in the tree (as seen from the parent of node).
+        """
+        parent = node.parent
+        replacement.parent = parent
+        if not parent:
+            self.root = replacement
+        elif parent.left == node:
+            parent.left = replacement
         else:
-            # Delete the edge that we want to delete
-            t = self.delete_subfunction(val, y)
-            # Replace the edge that changed because of the deletion
-            t = t.delete_subfunction(left_end, y)
-            if not t:
-                t = EdgebstNode()
-            t.insert_interval(left_end, right_end, y)
-            return t
+            parent.right = replacement
 
     # ===== DEBUGGING FUNCTIONS =============================================
 
+    def edges(self):
+        """
+        Returns the edges in the tree from left to right.
+        """
+        edges = []
+        node = self.root
+        while node and node.left:
+            node = node.left
+        while node:
+            edges.append(node.edge)
+            node = node.next
+        return edges
+
+    def depth(self):
+        return height(self.root)
+
     def print_nodes(self):
-        if not self.val:
-            return
-        print(
-            f"left: (({self.val.origin.x}, {self.val.origin.y}), ({self.val.twin.origin.x}, {self.val.twin.origin.y}))")
-        if self.right_end:
-            print(
-                f"right: (({self.right_end.origin.x}, {self.right_end.origin.y}), ({self.right_end.twin.origin.x}, {self.right_end.twin.origin.y}))")
-        else:
-            print("right: None")
-        if self.left:
-            self.left.print_nodes()
-        if self.right:
-            self.right.print_nodes()
-
-    def nodes_to_string(self):
-        if not self.val:
-            return
-        str_rep = f"(({self.val.origin.x}, {self.val.origin.y}), ({self.val.twin.origin.x}, {self.val.twin.origin.y}))"
-        if self.left:
-            str_rep = str_rep + " : (left: " + self.left.nodes_to_string()
-        else:
-            str_rep = str_rep + "(left: ()"
-        if self.right:
-            str_rep = str_rep + "right: " + self.right.nodes_to_string() + ")"
-        else:
-            str_rep = str_rep + "right ())"
-        return str_rep
-
-    def node_count(self):
-        count = 0
-        if self.left:
-            count += self.left.node_count()
-        if self.right:
-            count += self.right.node_count()
-        return count
-
-    def is_valid_bst_val(self, y):
-        valid = True
-        if self.left:
-            valid = (valid and self.left.is_valid_bst_val(y) and
-                     x_of_edge(self.left.val, y) < x_of_edge(self.val, y))
-        if self.right:
-            valid = (valid and self.right.is_valid_bst_val(y) and
-                     x_of_edge(self.right.val, y) > x_of_edge(self.val, y))
-        return valid
-
-    def is_valid_bst_right_end(self, y):
-        valid = True
-        if self.left:
-            valid = (valid and self.left.is_valid_bst_right_end(y) and
-                     (not self.right_end or x_of_edge(self.left.right_end, y) < x_of_edge(self.right_end, y)))
-        if self.right:
-            valid = (valid and self.right.is_valid_bst_right_end(y) and
-                     (not self.right.right_end or x_of_edge(self.right.right_end, y) > x_of_edge(self.right_end, y)))
-        return valid
-
-    def exists_right_none(self):
-        exists = True
-        if self.right_end:
-            exists = False
-        if self.right:
-            exists = exists or self.right.exists_right_none()
-        if self.left:
-            exists = exists or self.left.exists_right_none()
-        return exists
+        for edge in self.edges():
+            print(f"(({edge.origin.x}, {edge.origin.y}), ({edge.twin.origin.x}, {edge.twin.origin.y}))")
+
+    def is_valid(self, y):
+        """
+        Checks whether the edges are sorted at height y and the tree is balanced.
+        """
+        edges = self.edges()
+        for i in range(1, len(edges)):
+            if edge_smaller(edges[i], edges[i - 1], y, self.direction):
+                return False
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if abs(height(node.left) - height(node.right)) > 1:
+                return False
+            stack.extend(child for child in (node.left, node.right) if child)
+        return len(edges) == len(self.nodes)
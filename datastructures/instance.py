@@ -0,0 +1,181 @@
+import json
+import os
+import re
+from array import array
+
+# Reads CG:SHOP 2023 instance files directly into integer coordinate arrays, without building a dict per vertex
+# like json.load does. The rings (the outer boundary followed by the holes) are stored one after another in the
+# arrays x and y, ring i consisting of the vertices offsets[i], ..., offsets[i + 1] - 1.
+
+HEADER_FIELDS = {
+    "type": re.compile(r'"type"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    "name": re.compile(r'"name"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    "n": re.compile(r'"n"\s*:\s*(\d+)'),
+}
+BOUNDARY_KEY = re.compile(r'"(outer_boundary|holes)"\s*:\s*\[')
+# Maps every character that cannot be part of an integer to a space, such that a ring can be split into its numbers
+INTEGER_CHARACTERS = str.maketrans({chr(c): " " for c in range(128) if chr(c) not in "-0123456789"})
+WHITESPACE = " \t\r\n,"
+
+
+class Instance:
+    """
+    A polygon with holes in a compact representation.
+
+    Attributes:
+        name, type: the header fields of the instance
+        x, y: arrays of the coordinates of all vertices, the outer boundary first, followed by the holes
+        offsets: array with the index of the first vertex of every ring, followed by the total number of vertices
+    """
+
+    def __init__(self, name, type, x: array, y: array, offsets: array):
+        self.name = name
+        self.type = type
+        self.x = x
+        self.y = y
+        self.offsets = offsets
+
+    @property
+    def n(self):
+        return len(self.x)
+
+    def rings(self):
+        """
+        Returns the ranges of the vertex indices of the rings, the outer boundary first.
+        """
+        return [range(self.offsets[i], self.offsets[i + 1]) for i in range(len(self.offsets) - 1)]
+
+    def ring_to_dicts(self, ring: range):
+        return [{"x": self.x[i], "y": self.y[i]} for i in ring]
+
+    def to_dict(self):
+        """
+        Returns the instance in the format of the instance files, as read by json.load.
+        """
+        rings = self.rings()
+        return {
+            "type": self.type,
+            "name": self.name,
+            "n": self.n,
+            "outer_boundary": self.ring_to_dicts(rings[0]),
+            "holes": [self.ring_to_dicts(ring) for ring in rings[1:]],
+        }
+
+    @classmethod
+    def from_dict(cls, poly: dict):
+        rings = [poly["outer_boundary"]] + poly["holes"]
+        offsets = array("q", [0])
+        for ring in rings:
+            offsets.append(offsets[-1] + len(ring))
+        x = array("q", (p["x"] for ring in rings for p in ring))
+        y = array("q", (p["y"] for ring in rings for p in ring))
+        return cls(poly.get("name"), poly.get("type"), x, y, offsets)
+
+
+def load_instance(instance_file) -> Instance:
+    """
+    Reads an instance file. Files that the fast parser does not understand, e.g. because they contain non-integer
+    coordinates, are read with json.load instead.
+    """
+    with open(instance_file, "r") as f:
+        text = f.read()
+    try:
+        return parse_instance(text)
+    except ValueError:
+        return Instance.from_dict(json.loads(text))
+
+
+def parse_instance(text: str) -> Instance:
+    """
+    Parses the contents of an instance file. Raises a ValueError if the text is not in the expected format.
+    """
+    outer_boundary = None
+    holes = None
+    for match in BOUNDARY_KEY.finditer(text):
+        if match.group(1) == "outer_boundary":
+            outer_boundary = match.end()
+        else:
+            holes = match.end()
+    if outer_boundary is None:
+        raise ValueError("Instance has no outer boundary")
+
+    x = array("q")
+    y = array("q")
+    offsets = array("q", [0])
+    parse_ring(text, outer_boundary, x, y)
+    offsets.append(len(x))
+    if holes is not None:
+        # holes points just after the opening bracket of the list of rings
+        pos = skip_whitespace(text, holes)
+        while text[pos] == "[":
+            pos = skip_whitespace(text, parse_ring(text, pos + 1, x, y) + 1)
+            offsets.append(len(x))
+        if text[pos] != "]":
+            raise ValueError(f"Unexpected character in holes at position {pos}")
+
+    header = {field: pattern.search(text) for field, pattern in HEADER_FIELDS.items()}
+    n = header["n"]
+    if n and int(n.group(1)) != len(x):
+        raise ValueError(f"Instance has {len(x)} vertices instead of n = {n.group(1)}")
+    name = header["name"].group(1) if header["name"] else None
+    type = header["type"].group(1) if header["type"] else None
+    return Instance(name, type, x, y, offsets)
+
+
+def parse_ring(text: str, start: int, x: array, y: array):
+    """
+    Appends the coordinates of the ring whose list of points starts at position start (just after the opening
+    bracket) to x and y, and returns the position of the closing bracket.
+    """
+    end = text.index("]", start)
+    section = text[start:end]
+    # Non-integer coordinates are split into several numbers, which is caught by the check on the count below
+    coordinates = array("q", map(int, section.translate(INTEGER_CHARACTERS).split()))
+    first_x = section.find('"x"')
+    first_y = section.find('"y"')
+    if len(coordinates) != 2 * section.count('"x"') or len(coordinates) != 2 * section.count('"y"'):
+        raise ValueError(f"Malformed ring at position {start}")
+    if first_x < first_y:
+        x.extend(coordinates[0::2])
+        y.extend(coordinates[1::2])
+    else:
+        y.extend(coordinates[0::2])
+        x.extend(coordinates[1::2])
+    return end
+
+
+def skip_whitespace(text: str, pos: int):
+    while text[pos] in WHITESPACE:
+        pos += 1
+    return pos
+
+
+def peek_header(instance_file, fields=("name", "n"), chunk_size=4096):
+    """
+    Returns a dict with the requested header fields (any of "type", "name" and "n") of an instance file without
+    parsing it. The header fields are looked for at the start and at the end of the file, where the instance files
+    put them, and only if they are not found there the whole file is read. Missing fields are not in the result.
+    """
+    result = {}
+
+    def search(text):
+        for field in fields:
+            if field not in result:
+                match = HEADER_FIELDS[field].search(text)
+                # A number at the very end of a chunk might continue in the next one
+                if match and match.end() < len(text):
+                    result[field] = int(match.group(1)) if field == "n" else match.group(1)
+        return len(result) == len(fields)
+
+    size = os.path.getsize(instance_file)
+    with open(instance_file, "rb") as f:
+        if search(f.read(chunk_size).decode("utf-8", "ignore")):
+            return result
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            if search(f.read().decode("utf-8", "ignore")):
+                return result
+        if size > 2 * chunk_size:
+            f.seek(0)
+            search(f.read().decode("utf-8"))
+    return result
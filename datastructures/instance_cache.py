@@ -0,0 +1,168 @@
+"""
+Binary cache of instance files, such that they only have to be parsed once.
+
+Usage (from the repository root), to convert all instances in a directory up front:
+    python -m datastructures.instance_cache [instances_dir] [--cache-dir DIR]
+
+Every instance is stored in a file of its own, consisting of a header followed by the arrays of an Instance (the
+ring offsets and the x and y coordinates, as native 8-byte integers). Cached instances are memory-mapped instead of
+read, so loading is near-instant and all processes that load the same instance share its pages. A cache file is
+valid as long as the size and modification time of the source match those in the header. If they do not, the
+source is hashed, and the cache file is only rebuilt if the SHA-256 hash of the source changed as well. Cache files
+are named after the instance and a hash of the resolved path of the source, such that instances with the same name
+in different directories do not share a cache file. A cache that is read-only is used as is.
+"""
+import argparse
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datastructures.instance import Instance, load_instance
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "instances")
+MAGIC = b"CGINST" + (b"LE" if sys.byteorder == "little" else b"BE")
+# magic, n, number of rings, source size, source modification time (ns), source SHA-256, name length, type length
+HEADER = struct.Struct("=8sqqqq32sqq")
+
+
+class MappedInstance(Instance):
+    """
+    An Instance whose arrays are read-only views into a memory-mapped cache file. When it is sent to another
+    process, only the path of the cache file is pickled and the other process maps the file itself.
+    """
+
+    def __init__(self, path, mapping: mmap.mmap, name, type, x, y, offsets):
+        super().__init__(name, type, x, y, offsets)
+        self.path = path
+        self.mapping = mapping
+
+    def __reduce__(self):
+        return map_instance, (self.path,)
+
+
+def cache_path(instance_file, cache_dir=DEFAULT_CACHE_DIR):
+    name = os.path.basename(instance_file)
+    if name.endswith(".instance.json"):
+        name = name[:-len(".instance.json")]
+    source = hashlib.sha256(os.path.realpath(instance_file).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}.{source}.instance.bin")
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def padding(size):
+    return -size % 8
+
+
+def write_cache(instance: Instance, source, path):
+    """
+    Writes the instance to the cache file path, recording the size, modification time and hash of the source file.
+    The file is written under a temporary name first, such that concurrent readers never see a partial file.
+    """
+    stat = os.stat(source)
+    name = (instance.name or "").encode("utf-8")
+    type = (instance.type or "").encode("utf-8")
+    header = HEADER.pack(MAGIC, instance.n, len(instance.offsets) - 1, stat.st_size, stat.st_mtime_ns,
+                         file_hash(source), len(name), len(type))
+    strings = name + type
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(strings + bytes(padding(len(strings))))
+        for a in (instance.offsets, instance.x, instance.y):
+            array("q", a).tofile(f)
+    os.replace(temporary, path)
+
+
+def map_instance(path) -> MappedInstance:
+    """
+    Memory-maps a cache file written by write_cache.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n, rings, _, _, _, name_length, type_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an instance cache file of this platform")
+    view = memoryview(mapping)
+    pos = HEADER.size
+    name = bytes(view[pos:pos + name_length]).decode("utf-8") or None
+    type = bytes(view[pos + name_length:pos + name_length + type_length]).decode("utf-8") or None
+    pos += name_length + type_length
+    pos += padding(pos)
+    offsets = view[pos:pos + 8 * (rings + 1)].cast("q")
+    pos += 8 * (rings + 1)
+    x = view[pos:pos + 8 * n].cast("q")
+    y = view[pos + 8 * n:pos + 16 * n].cast("q")
+    return MappedInstance(path, mapping, name, type, x, y, offsets)
+
+
+def is_valid(path, source):
+    """
+    Returns whether the cache file path holds the current contents of the source file. If only the modification
+    time of the source changed, the header is updated if the cache file is writable, such that the source is not
+    hashed again next time.
+    """
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(source)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return False
+        with mmap.mmap(f.fileno(), HEADER.size, access=mmap.ACCESS_READ) as mapping:
+            magic, n, rings, size, mtime, digest, name_length, type_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        return False
+    if size == stat.st_size and mtime == stat.st_mtime_ns:
+        return True
+    if digest != file_hash(source):
+        return False
+    try:
+        with open(path, "r+b") as f:
+            f.write(HEADER.pack(magic, n, rings, stat.st_size, stat.st_mtime_ns, digest, name_length, type_length))
+    except OSError:
+        # A shared, read-only cache stays valid, the source is just hashed again next time
+        pass
+    return True
+
+
+def load_cached_instance(instance_file, cache_dir=DEFAULT_CACHE_DIR) -> MappedInstance:
+    """
+    Returns the instance in instance_file from the cache, converting it first if it is not cached or the cache is
+    out of date.
+    """
+    path = cache_path(instance_file, cache_dir)
+    if not is_valid(path, instance_file):
+        write_cache(load_instance(instance_file), instance_file, path)
+    return map_instance(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert instance files into the binary instance cache.")
+    parser.add_argument("instances_dir", nargs="?", default="instances/all")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    instance_files = sorted(glob.glob(os.path.join(args.instances_dir, "*.instance.json")))
+    converted = 0
+    for instance_file in instance_files:
+        path = cache_path(instance_file, args.cache_dir)
+        if not is_valid(path, instance_file):
+            write_cache(load_instance(instance_file), instance_file, path)
+            converted += 1
+    print(f"Converted {converted} of {len(instance_files)} instances [{time.perf_counter() - start:.1f}s]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Instrumentation of the pipeline: wall time and peak memory per phase, and counters of events on the hot paths.
+
+Metrics are disabled by default. The hot paths only test the module attribute enabled before counting, or count in
+a local variable that is added to the counters once at the end, so the instrumentation costs close to nothing when
+it is disabled. Peak memory is measured with tracemalloc, which slows down allocations considerably, so it can be
+left out with enable(memory=False).
+
+Counters:
+    insert_edge, delete_edge: calls of DCEL.insert_edge and DCEL.delete_edge
+    insert_edge_walk_steps: steps of the walks along the two cycles in insert_edge that decide whether a face is split
+    edgebst_insert: insertions into an EdgeBST, with the maximum tree depth in the maximum edgebst_depth
+    rationals: constructions of Rationals
+    <merge>_attempts, <merge>_merges: checks whether two faces can be merged and the merges that followed, for the
+        merges hertel_mehlhorn, merge_adjacent and merge_indirect
+"""
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+enabled = False
+counters = Counter()
+maxima = {}
+phases = []
+
+
+def enable(memory=True):
+    """
+    Starts collecting metrics, discarding the metrics collected so far.
+    """
+    global enabled
+    reset()
+    enabled = True
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global enabled
+    enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset():
+    counters.clear()
+    maxima.clear()
+    phases.clear()
+
+
+def count(name, amount=1):
+    """
+    Adds amount to the counter name. Callers on hot paths should check enabled first.
+    """
+    counters[name] += amount
+
+
+def record_maximum(name, value):
+    if name not in maxima or value > maxima[name]:
+        maxima[name] = value
+
+
+def counted(function, name):
+    """
+    Returns a wrapper of function that counts its calls in the counter name. Hot paths use it to count the calls of a
+    function without testing enabled on every call: they only wrap the function when metrics are enabled.
+    """
+    def wrapper(*args):
+        counters[name] += 1
+        return function(*args)
+    return wrapper
+
+
+@contextmanager
+def phase(name):
+    """
+    Records the wall time, the peak memory (if traced) and the counters of the code run in the context as the phase
+    name. Does nothing if metrics are disabled.
+    """
+    if not enabled:
+        yield
+        return
+    before = counters.copy()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {"phase": name, "time": time.perf_counter() - start}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["memory"] = current
+            record["peak_memory"] = peak
+        record["counters"] = dict(counters - before)
+        phases.append(record)
+
+
+def snapshot():
+    """
+    Returns the metrics collected so far as a dict that can be exported as JSON.
+    """
+    return {
+        "phases": [dict(record) for record in phases],
+        "counters": dict(counters),
+        "maxima": dict(maxima),
+    }
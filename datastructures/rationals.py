@@ -1,44 +1,137 @@
 import math
+from datastructures import metrics
 
 
 class Rationals:
+    """
+    Exact rational number num / den with den >= 0.
+
+    The fraction is only reduced to lowest terms when num, den or the hash are requested, comparisons and
+    arithmetic work on the unreduced representation. Integers can be used as operands directly.
+    """
+
+    __slots__ = ("_num", "_den", "_reduced")
+
     def __init__(self, numerator, denominator=1):
-        gcd = math.gcd(numerator, denominator)
-        if (denominator >= 0):
-            self.num = numerator // gcd
-            self.den = denominator // gcd
-        else:
-            self.num = numerator // gcd * -1
-            self.den = denominator // gcd * -1
+        if metrics.enabled:
+            metrics.count("rationals")
+        if denominator < 0:
+            numerator = -numerator
+            denominator = -denominator
+        self._num = numerator
+        self._den = denominator
+        self._reduced = denominator == 1
+
+    def reduce(self):
+        if not self._reduced:
+            gcd = math.gcd(self._num, self._den)
+            if gcd > 1:
+                self._num //= gcd
+                self._den //= gcd
+            self._reduced = True
+
+    @property
+    def num(self):
+        self.reduce()
+        return self._num
+
+    @property
+    def den(self):
+        self.reduce()
+        return self._den
 
     def __eq__(self, other):
-        return self.num * other.den == other.num * self.den
+        if isinstance(other, int):
+            return self._num == other * self._den
+        if isinstance(other, Rationals):
+            return self._num * other._den == other._num * self._den
+        return NotImplemented
 
     def __ge__(self, other):
-        return self.num * other.den >= other.num * self.den
+        if isinstance(other, int):
+            return self._num >= other * self._den
+        if isinstance(other, Rationals):
+            return self._num * other._den >= other._num * self._den
+        return NotImplemented
 
     def __le__(self, other):
-        return self.num * other.den <= other.num * self.den
+        if isinstance(other, int):
+            return self._num <= other * self._den
+        if isinstance(other, Rationals):
+            return self._num * other._den <= other._num * self._den
+        return NotImplemented
 
     def __gt__(self, other):
-        return self.num * other.den > other.num * self.den
+        if isinstance(other, int):
+            return self._num > other * self._den
+        if isinstance(other, Rationals):
+            return self._num * other._den > other._num * self._den
+        return NotImplemented
 
     def __lt__(self, other):
-        return self.num * other.den < other.num * self.den
+        if isinstance(other, int):
+            return self._num < other * self._den
+        if isinstance(other, Rationals):
+            return self._num * other._den < other._num * self._den
+        return NotImplemented
+
+    def __hash__(self):
+        self.reduce()
+        # Equal to the hash of the integer if the value is integral, as they compare equal
+        if self._den == 1:
+            return hash(self._num)
+        return hash((self._num, self._den))
 
     def __mul__(self, other):
-        return Rationals(self.num * other.num, self.den * other.den)
+        if isinstance(other, int):
+            return Rationals(self._num * other, self._den)
+        if isinstance(other, Rationals):
+            return Rationals(self._num * other._num, self._den * other._den)
+        return NotImplemented
 
     def __truediv__(self, other):
-        return Rationals(self.num * other.den, self.den * other.num)
+        if isinstance(other, int):
+            return Rationals(self._num, self._den * other)
+        if isinstance(other, Rationals):
+            return Rationals(self._num * other._den, self._den * other._num)
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        if isinstance(other, int):
+            return Rationals(other * self._den, self._num)
+        return NotImplemented
 
     def __add__(self, other):
-        return Rationals(self.num * other.den + other.num * self.den, self.den * other.den)
+        if isinstance(other, int):
+            return Rationals(self._num + other * self._den, self._den)
+        if not isinstance(other, Rationals):
+            return NotImplemented
+        if self._den == 1 and other._den == 1:
+            return Rationals(self._num + other._num)
+        return Rationals(self._num * other._den + other._num * self._den, self._den * other._den)
 
     def __sub__(self, other):
-        return Rationals(self.num * other.den - other.num * self.den, self.den * other.den)
+        if isinstance(other, int):
+            return Rationals(self._num - other * self._den, self._den)
+        if not isinstance(other, Rationals):
+            return NotImplemented
+        if self._den == 1 and other._den == 1:
+            return Rationals(self._num - other._num)
+        return Rationals(self._num * other._den - other._num * self._den, self._den * other._den)
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return Rationals(other * self._den - self._num, self._den)
+        return NotImplemented
+
+    def __neg__(self):
+        return Rationals(-self._num, self._den)
 
     __rmul__ = __mul__
+    __radd__ = __add__
 
     def __str__(self):
         return '{}/{}'.format(self.num, self.den)
+
+    def __repr__(self):
+        return 'Rationals({}, {})'.format(self.num, self.den)
@@ -0,0 +1,229 @@
+"""
+Convex covers in a compact representation, and writers that stream a solution to disk without building the list of
+dicts of DCEL.format_solution first.
+
+Formats:
+    JSON: the result files, {"polygons": [[{"x": ..., "y": ...}, ...], ...], "instance": ..., "type": ...}, exactly
+        as json.dumps writes the solution of format_solution with the instance and type added
+    binary: a header followed by the name of the instance, its type and the arrays of a Solution (the piece offsets
+        and the x and y coordinates, as native 8-byte integers), like the instance cache files. Binary solutions are
+        memory-mapped when they are read.
+
+Usage (from the repository root), to convert a solution from one format into the other:
+    python -m datastructures.solution solution_file [--output FILE]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"CGSOL\x00" + (b"LE" if sys.byteorder == "little" else b"BE")
+# magic, number of pieces, number of points, instance name length, type length
+HEADER = struct.Struct("=8sqqqq")
+# Number of pieces that are written to a JSON file at once
+CHUNK_SIZE = 1000
+
+
+class Solution:
+    """
+    A convex cover in a compact representation.
+
+    Attributes:
+        instance, type: the name and type of the instance
+        x, y: arrays of the coordinates of the vertices of all pieces, one piece after another
+        offsets: array with the index of the first vertex of every piece, followed by the total number of vertices
+    """
+
+    def __init__(self, instance, type, x, y, offsets):
+        self.instance = instance
+        self.type = type
+        self.x = x
+        self.y = y
+        self.offsets = offsets
+
+    @property
+    def faces(self):
+        return len(self.offsets) - 1
+
+    def coordinates(self):
+        """
+        Yields the coordinates of every piece as a flat list [x1, y1, x2, y2, ...], like DCEL.solution_coordinates.
+        """
+        for i in range(self.faces):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            coordinates = [0] * (2 * (end - start))
+            coordinates[0::2] = self.x[start:end]
+            coordinates[1::2] = self.y[start:end]
+            yield coordinates
+
+    def pieces(self):
+        """
+        Yields every piece as a list of points (x, y).
+        """
+        for i in range(self.faces):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            yield list(zip(self.x[start:end], self.y[start:end]))
+
+    def to_dict(self):
+        """
+        Returns the solution in the format of the result files, as read by json.load.
+        """
+        solution = {"polygons": [[{"x": x, "y": y} for x, y in piece] for piece in self.pieces()]}
+        if self.instance is not None:
+            solution["instance"] = self.instance
+        if self.type is not None:
+            solution["type"] = self.type
+        return solution
+
+    @classmethod
+    def from_dict(cls, solution: dict):
+        """
+        Converts a solution in the format of the result files. Raises a ValueError if it has non-integer coordinates.
+        """
+        x, y, offsets = array("q"), array("q"), array("q", [0])
+        try:
+            for polygon in solution["polygons"]:
+                x.extend(p["x"] for p in polygon)
+                y.extend(p["y"] for p in polygon)
+                offsets.append(len(x))
+        except TypeError:
+            raise ValueError("Solution has non-integer coordinates")
+        return cls(solution.get("instance"), solution.get("type"), x, y, offsets)
+
+    @classmethod
+    def from_coordinates(cls, pieces, instance=None, type=None):
+        """
+        Collects pieces given as flat coordinate lists, e.g. from DCEL.solution_coordinates.
+        """
+        x, y, offsets = array("q"), array("q"), array("q", [0])
+        for coordinates in pieces:
+            x.extend(coordinates[0::2])
+            y.extend(coordinates[1::2])
+            offsets.append(len(x))
+        return cls(instance, type, x, y, offsets)
+
+
+class MappedSolution(Solution):
+    """
+    A Solution whose arrays are read-only views into a memory-mapped binary solution file.
+    """
+
+    def __init__(self, path, mapping: mmap.mmap, instance, type, x, y, offsets):
+        super().__init__(instance, type, x, y, offsets)
+        self.path = path
+        self.mapping = mapping
+
+
+def replace_atomically(path, write, mode="w"):
+    """
+    Calls write with a file object for a temporary file, which then replaces path, such that readers never see a
+    partially written file.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, mode) as f:
+        write(f)
+    os.replace(temporary, path)
+
+
+def write_solution_json(path, pieces, instance=None, type=None):
+    """
+    Writes the pieces (flat coordinate lists, e.g. from DCEL.solution_coordinates) to path in the format of the result
+    files, CHUNK_SIZE pieces at a time. The instance name and type are added if given.
+    """
+    def write(f):
+        f.write('{"polygons": [')
+        chunk = []
+        first = True
+        for coordinates in pieces:
+            points = ", ".join(f'{{"x": {coordinates[i]}, "y": {coordinates[i + 1]}}}'
+                               for i in range(0, len(coordinates), 2))
+            chunk.append(f"[{points}]" if first else f", [{points}]")
+            first = False
+            if len(chunk) == CHUNK_SIZE:
+                f.write("".join(chunk))
+                chunk = []
+        f.write("".join(chunk) + "]")
+        if instance is not None:
+            f.write(f', "instance": {json.dumps(instance)}')
+        if type is not None:
+            f.write(f', "type": {json.dumps(type)}')
+        f.write("}")
+
+    replace_atomically(path, write)
+
+
+def write_solution_binary(path, solution: Solution):
+    """
+    Writes the solution to path in the binary format.
+    """
+    def write(f):
+        instance = (solution.instance or "").encode("utf-8")
+        type = (solution.type or "").encode("utf-8")
+        f.write(HEADER.pack(MAGIC, solution.faces, len(solution.x), len(instance), len(type)))
+        strings = instance + type
+        f.write(strings + bytes(-len(strings) % 8))
+        for a in (solution.offsets, solution.x, solution.y):
+            array("q", a).tofile(f)
+
+    replace_atomically(path, write, "wb")
+
+
+def read_solution_binary(path) -> MappedSolution:
+    """
+    Memory-maps a binary solution file written by write_solution_binary.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, faces, n, instance_length, type_length = HEADER.unpack_from(mapping)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary solution file of this platform")
+    view = memoryview(mapping)
+    pos = HEADER.size
+    instance = bytes(view[pos:pos + instance_length]).decode("utf-8") or None
+    type = bytes(view[pos + instance_length:pos + instance_length + type_length]).decode("utf-8") or None
+    pos += instance_length + type_length
+    pos += -pos % 8
+    offsets = view[pos:pos + 8 * (faces + 1)].cast("q")
+    pos += 8 * (faces + 1)
+    x = view[pos:pos + 8 * n].cast("q")
+    y = view[pos + 8 * n:pos + 16 * n].cast("q")
+    return MappedSolution(path, mapping, instance, type, x, y, offsets)
+
+
+def is_binary_solution(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_solution(path) -> Solution:
+    """
+    Reads a solution file in either format.
+    """
+    if is_binary_solution(path):
+        return read_solution_binary(path)
+    with open(path, "r") as f:
+        return Solution.from_dict(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a solution between the JSON and the binary format.")
+    parser.add_argument("solution_file")
+    parser.add_argument("--output", help="file to write (default: the solution file with .json and .bin swapped)")
+    args = parser.parse_args()
+
+    binary = is_binary_solution(args.solution_file)
+    solution = load_solution(args.solution_file)
+    if binary:
+        output = args.output or args.solution_file.replace(".bin", "") + ".json"
+        write_solution_json(output, solution.coordinates(), solution.instance, solution.type)
+    else:
+        output = args.output or args.solution_file.replace(".json", "") + ".bin"
+        write_solution_binary(output, solution)
+    print(f"Wrote {solution.faces} pieces to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Solves a single instance within a wall-clock time budget.
+
+Usage (from the repository root):
+    python -m pipeline.anytime instance_file [--time-limit SECONDS] [--checkpoint FILE] [--no-cache]
+
+A valid convex cover is available as soon as the first configuration has triangulated the polygon. From then on
+configurations (rotations, permutations, merge strategies and random seeds) are run one after another, keeping the
+cover with the fewest pieces, until the time is up. Every improvement is written to the checkpoint file (by default
+the result file of the instance), so a job that is killed still leaves its best cover behind.
+"""
+import argparse
+import itertools
+import time
+from datastructures.dcel import DCEL
+from datastructures.instance import Instance, load_instance
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from datastructures.solution import Solution, write_solution_json
+from pipeline.cover import compute_convex_cover, get_permutation
+
+
+class Deadline:
+    """
+    A point in time, which can be passed as the stop argument of compute_convex_cover. A deadline that is not armed
+    is never set, even if the time is up.
+    """
+
+    def __init__(self, seconds, armed=True):
+        self.end = time.perf_counter() + seconds
+        self.armed = armed
+
+    def remaining(self):
+        return self.end - time.perf_counter()
+
+    def is_set(self):
+        return self.armed and self.remaining() <= 0
+
+
+def anytime_configurations():
+    """
+    Yields configurations (times_rotated, permutation, seed, merge) without end: first the deterministic ones, most
+    promising first, then the random permutation with increasing seeds.
+    """
+    for permutation, merge in [("sort_on_yx", "hertel_mehlhorn"), ("sort_on_face", "hertel_mehlhorn"),
+                               ("sort_on_yx", "adjacent")]:
+        for times_rotated in range(4):
+            yield times_rotated, permutation, 0, merge
+    for seed in itertools.count(1):
+        for times_rotated in range(4):
+            yield times_rotated, "random", seed, "hertel_mehlhorn"
+
+
+def write_checkpoint(checkpoint_file, solution: Solution):
+    """
+    Streams the solution to the checkpoint file in the result format. The file is replaced atomically, such that it
+    always holds a complete solution.
+    """
+    write_solution_json(checkpoint_file, solution.coordinates(), solution.instance, solution.type)
+
+
+def solve_anytime(instance: Instance, time_limit, checkpoint_file=None, configurations=None, verbose=False):
+    """
+    Runs configurations (anytime_configurations() by default) until time_limit seconds have passed, and returns
+    the number of pieces, the solution (a Solution) and the configuration of the best cover found, which is also
+    written to checkpoint_file (if given) every time it improves. A configuration that is still running at the
+    deadline stops within its current stage. A merge stage that is stopped still leaves a cover, which is kept if
+    it is the best one. The first configuration is always completed up to its first cover, so that a
+    solution is returned even if the time limit is too small.
+    """
+    # The deadline is armed once there is a cover
+    deadline = Deadline(time_limit, armed=False)
+    best = {"faces": float("inf"), "solution": None, "configuration": None}
+
+    def on_cover(dcel, configuration):
+        deadline.armed = True
+        faces = len(dcel.interior_faces())
+        if faces < best["faces"]:
+            solution = Solution.from_coordinates(dcel.solution_coordinates(), instance.name, instance.type)
+            best["faces"], best["solution"], best["configuration"] = faces, solution, configuration
+            if checkpoint_file:
+                write_checkpoint(checkpoint_file, solution)
+            if verbose:
+                print(f"{configuration}: {faces} faces [{time_limit - deadline.remaining():.1f}s]", flush=True)
+
+    dcel = DCEL.from_instance(instance)
+    for configuration in configurations or anytime_configurations():
+        if deadline.is_set():
+            break
+        times_rotated, permutation, seed, merge = configuration
+        dcel.reset()
+        compute_convex_cover(dcel, times_rotated, get_permutation(permutation, seed, times_rotated), merge,
+                             stop=deadline, on_cover=lambda dcel: on_cover(dcel, configuration))
+
+    return best["faces"], best["solution"], best["configuration"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve an instance within a time limit.")
+    parser.add_argument("instance_file")
+    parser.add_argument("--time-limit", type=float, default=60, help="wall-clock time budget in seconds")
+    parser.add_argument("--checkpoint", help="file to write the best solution to (default: the result file)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance file instead of using the cache")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.no_cache:
+        instance = load_instance(args.instance_file)
+    else:
+        instance = load_cached_instance(args.instance_file, args.cache_dir)
+    checkpoint_file = args.checkpoint or args.instance_file.replace("instance.json", "result.json")
+    faces, _, configuration = solve_anytime(instance, args.time_limit - (time.perf_counter() - start),
+                                            checkpoint_file, verbose=args.verbose)
+    times_rotated, permutation, seed, merge = configuration
+    print(f"{instance.name} (rotated {times_rotated} times, {permutation}, seed {seed}, {merge}) - "
+          f"Faces: {faces} [{time.perf_counter() - start:.1f}s]")
+
+
+if __name__ == "__main__":
+    main()
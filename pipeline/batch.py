@@ -0,0 +1,164 @@
+"""
+Solves all instances in a directory on a pool of worker processes.
+
+Usage (from the repository root):
+    python -m pipeline.batch [instances_dir] [--workers N] [--seeds N] [--permutation NAME] [--summary FILE]
+                             [--cache-dir DIR | --no-cache] [--store-dir DIR | --no-store]
+
+For every *.instance.json file a *.result.json file is written next to it. The instances are scheduled largest
+first, such that a single huge instance does not end up running on its own at the end of the batch. Instances
+are loaded through the binary instance cache (see datastructures.instance_cache) unless --no-cache is given.
+
+Unless --no-store is given, results are looked up in and added to the result store (see pipeline.store), so
+configurations that have been computed before are not computed again, and a result file is only written if the
+solution improves on the best known one. Solutions are kept in the compact representation of
+datastructures.solution and streamed to the result files.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datastructures.dcel import DCEL
+from datastructures.instance import load_instance, peek_header
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from datastructures.solution import Solution, write_solution_json
+from pipeline.cover import compute_convex_cover, get_permutation, PERMUTATIONS
+from pipeline.store import ResultStore, configuration, instance_hash, DEFAULT_STORE_DIR
+
+
+def instance_size(instance_file, cache_dir=None):
+    """
+    Returns the number of vertices n of an instance, read from its header. Falls back to loading the instance
+    (through the instance cache in cache_dir, if given, so the worker finds it cached) if the header does not
+    contain n.
+    """
+    n = peek_header(instance_file, ("n",)).get("n")
+    if n is None:
+        instance = load_cached_instance(instance_file, cache_dir) if cache_dir else load_instance(instance_file)
+        n = instance.n
+    return n
+
+
+def solve_instance(instance_file, seeds, permutation, cache_dir=None, store_dir=None):
+    """
+    Computes the best convex cover over all rotations and seeds, writes it to the result file and returns a
+    summary of the result. The instance is loaded through the instance cache in cache_dir, if given. If store_dir
+    is given, the result store in it is used, and the result file is only written if the best known solution
+    improves (or if it does not exist yet).
+    """
+    start = time.perf_counter()
+    if cache_dir:
+        instance = load_cached_instance(instance_file, cache_dir)
+    else:
+        instance = load_instance(instance_file)
+    # Instance files without a name are stored and reported under the name of the file, like their result file
+    name = instance.name or os.path.basename(instance_file).replace(".instance.json", "")
+    store = ResultStore(store_dir) if store_dir else None
+    digest = instance_hash(instance_file) if store else None
+
+    min_result = float("inf")
+    opt_configuration = None
+    opt_solution = None
+    opt_seed = None
+    cached = 0
+    dcel = None
+    for seed in range(seeds):
+        for times_rotated in range(4):
+            c = configuration(times_rotated, permutation, seed)
+            entry = store.get(digest, c) if store else None
+            if entry is not None:
+                result, solution = entry
+                cached += 1
+            else:
+                # The DCEL is only built once a configuration is not in the store
+                if dcel is None:
+                    dcel = DCEL.from_instance(instance)
+                else:
+                    dcel.reset()
+                result = compute_convex_cover(dcel, times_rotated, get_permutation(permutation, seed, times_rotated))
+                solution = Solution.from_coordinates(dcel.solution_coordinates(), name, instance.type)
+                if store:
+                    store.put(digest, c, result, solution)
+            if result < min_result:
+                min_result = result
+                opt_configuration = c
+                opt_solution = solution
+                opt_seed = seed
+
+    result_file = instance_file.replace("instance.json", "result.json")
+    if store:
+        improved = store.update_best(name, digest, min_result, opt_configuration, opt_solution)
+        best = store.best(name, digest)
+        write = improved or not os.path.exists(result_file)
+        best_faces, export = best["faces"], best["solution"]
+    else:
+        improved = write = True
+        best_faces, export = min_result, opt_solution
+
+    if write:
+        write_solution_json(result_file, export.coordinates(), name, instance.type)
+
+    return {
+        "instance": name,
+        "n": instance.n,
+        "faces": min_result,
+        "rotation": opt_configuration["rotation"],
+        "seed": opt_seed,
+        "best": best_faces,
+        "improved": improved,
+        "cached": cached,
+        "time": time.perf_counter() - start,
+    }
+
+
+def solve_batch(instances_dir, workers=None, seeds=1, permutation="sort_on_yx", cache_dir=None, store_dir=None):
+    """
+    Solves all instances in instances_dir and returns the list of result summaries, in order of completion.
+    """
+    instance_files = glob.glob(os.path.join(instances_dir, "*.instance.json"))
+    # Largest instances first, as these determine the total running time
+    instance_files.sort(key=lambda f: instance_size(f, cache_dir), reverse=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_instance, f, seeds, permutation, cache_dir, store_dir) for f in instance_files]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"{result['instance']} (n = {result['n']}, rotated {result['rotation']} times, "
+                  f"seed {result['seed']}) - Faces: {result['faces']}, best known: {result['best']}"
+                  f"{' (improved)' if result['improved'] else ''} [{result['time']:.1f}s, {result['cached']} cached]",
+                  flush=True)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a directory of instances in parallel.")
+    parser.add_argument("instances_dir", nargs="?", default="instances/2ima15")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--seeds", type=int, default=1, help="number of seeds to try per rotation")
+    parser.add_argument("--permutation", choices=PERMUTATIONS, default="sort_on_yx")
+    parser.add_argument("--summary", help="file to write the per-instance results and total score to (JSON)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance files instead of using the cache")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="directory of the result store")
+    parser.add_argument("--no-store", action="store_true", help="recompute everything and always write the results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = solve_batch(args.instances_dir, args.workers, args.seeds, args.permutation,
+                          None if args.no_cache else args.cache_dir, None if args.no_store else args.store_dir)
+    total_score = sum(r["faces"] for r in results)
+    best_score = sum(r["best"] for r in results)
+    print(f"Total score: {total_score}, best known: {best_score} ({len(results)} instances, "
+          f"{sum(r['improved'] for r in results)} improved, {time.perf_counter() - start:.1f}s)")
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump({"total_score": total_score, "best_score": best_score, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import random
+from datastructures.dcel import DCEL, sweep_coordinates
+from datastructures import metrics
+from algorithms.monotonize import monotonize_polygon
+from algorithms.triangulate import triangulate_monotone
+from algorithms.merge import hertel_mehlhorn, bruteforce_merge_adjacent_faces, bruteforce_merge_indirect_neighbours
+
+
+def compute_convex_cover(dcel: DCEL, times_rotated, permutation, merge="hertel_mehlhorn", merge_indirect=True, stop=None,
+                         on_cover=None):
+    """
+    Computes a convex cover of the polygon in the DCEL by sweeping it in the direction given by times_rotated,
+    and returns the number of pieces. The pieces are the interior faces of the DCEL afterwards. The coordinates are
+    not rotated, so the same DCEL can be used for the next direction after calling dcel.reset().
+
+    merge selects the strategy for merging the triangulated pieces (one of MERGES), merge_indirect whether
+    non-adjacent pieces are merged afterwards. If stop is given (e.g. a multiprocessing Event), the computation is
+    abandoned once it is set, in which case None is returned. Every stage checks stop in its loops. A merge stage
+    that is stopped ends early and leaves a convex cover, the other stages (monotonize and triangulate) leave the
+    DCEL unfinished.
+    If on_cover is given, it is called with the DCEL after every stage from the triangulation on, as from then on
+    the interior faces form a convex cover (with fewer pieces after every stage), also after a merge stage that was
+    stopped early.
+    Every stage is recorded as a phase of the same name if metrics are enabled (see datastructures.metrics).
+    """
+    stages = [
+        ("monotonize", lambda dcel: monotonize_polygon(dcel, direction=times_rotated, stop=stop)),
+        ("triangulate", lambda dcel: triangulate_monotone(dcel, triangulate_convex_faces=False,
+                                                          direction=times_rotated, stop=stop)),
+        ("merge", lambda dcel: merge_faces(dcel, merge, permutation, stop)),
+    ]
+    if merge_indirect:
+        stages.append(("merge_indirect", lambda dcel: bruteforce_merge_indirect_neighbours(dcel, stop)))
+    for i, (name, stage) in enumerate(stages):
+        if stop and stop.is_set():
+            return None
+        with metrics.phase(name):
+            stage(dcel)
+        # Only the merge stages leave a convex cover when they are stopped
+        if stop and stop.is_set() and not name.startswith("merge"):
+            return None
+        if on_cover and i >= 1:
+            on_cover(dcel)
+    if stop and stop.is_set():
+        return None
+    return len(dcel.interior_faces())
+
+
+# partition_monotone computes the pieces of hertel_mehlhorn without inserting the whole triangulation, but it is not
+# a strategy here, as it is slower than triangulate_monotone and hertel_mehlhorn on the pointer DCEL (see
+# benchmarks.suite, which times it)
+MERGES = ["hertel_mehlhorn", "adjacent"]
+
+
+def merge_faces(dcel: DCEL, merge, permutation, stop=None):
+    """
+    Merges adjacent pieces with the given strategy, one of MERGES.
+    The merging ends early once stop (if given) is set.
+    """
+    if merge == "hertel_mehlhorn":
+        hertel_mehlhorn(dcel, permutation, stop)
+    elif merge == "adjacent":
+        bruteforce_merge_adjacent_faces(dcel, stop)
+    else:
+        raise ValueError(f"Unknown merge strategy: {merge}")
+
+
+def random_permutation(diagonals, seed):
+    # Randomly shuffles diagonals
+    random.seed(seed)
+    random.shuffle(diagonals)
+
+
+def sort_on_yx(diagonals, direction=0):
+    # Sorts diagonals on lexicographically on their lower endpoint, first y then x (in the coordinates of the sweep direction)
+    diagonals.sort(key=lambda h: sweep_coordinates(h.origin, direction)[::-1])
+
+
+def sort_on_face(diagonals, direction=0):
+    # Sorts diagonals on their incident faces, the faces are lexicographically ordered on the origin of their outer component
+    diagonals.sort(key=lambda h: sweep_coordinates(h.incident_face.outer_component.origin, direction))
+
+
+PERMUTATIONS = ["sort_on_yx", "sort_on_face", "random"]
+
+
+def get_permutation(name, seed=0, direction=0):
+    """
+    Returns the permutation function with the given name (one of PERMUTATIONS), for use by hertel_mehlhorn. The
+    sorting permutations order the diagonals in the coordinates of the given sweep direction.
+    """
+    if name == "sort_on_yx":
+        return lambda diagonals: sort_on_yx(diagonals, direction)
+    if name == "sort_on_face":
+        return lambda diagonals: sort_on_face(diagonals, direction)
+    if name == "random":
+        return lambda diagonals: random_permutation(diagonals, seed)
+    raise ValueError(f"Unknown permutation: {name}")
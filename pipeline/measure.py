@@ -0,0 +1,85 @@
+"""
+Measures the wall time and peak memory of every phase of the pipeline, and the counters of the hot paths (see
+datastructures.metrics), on a number of instances.
+
+Usage (from the repository root):
+    python -m pipeline.measure instance_file [instance_file ...] [--rotations R [R ...]] [--permutation NAME]
+                               [--seed SEED] [--merge NAME] [--no-memory] [--output FILE]
+                               [--cache-dir DIR | --no-cache]
+
+The metrics are written as JSON to the output file, or to stdout if no output file is given: a list with an entry
+per instance, holding the metrics of loading the instance and building the DCEL, and a run per rotation.
+"""
+import argparse
+import json
+from datastructures import metrics
+from datastructures.dcel import DCEL
+from datastructures.instance import load_instance
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from pipeline.cover import compute_convex_cover, get_permutation, MERGES, PERMUTATIONS
+from pipeline.store import configuration
+
+
+def measure_instance(instance_file, rotations=range(4), permutation="sort_on_yx", seed=0, merge="hertel_mehlhorn",
+                     cache_dir=None, memory=True):
+    """
+    Computes convex covers of the instance for the given rotations with metrics enabled, and returns the metrics as
+    a dict. The instance is loaded through the instance cache in cache_dir, if given.
+    """
+    metrics.enable(memory)
+    try:
+        with metrics.phase("load"):
+            if cache_dir:
+                instance = load_cached_instance(instance_file, cache_dir)
+            else:
+                instance = load_instance(instance_file)
+        with metrics.phase("build"):
+            dcel = DCEL.from_instance(instance)
+        result = {"instance": instance.name, "n": instance.n, **metrics.snapshot(), "runs": []}
+
+        for times_rotated in rotations:
+            metrics.reset()
+            with metrics.phase("reset"):
+                dcel.reset()
+            faces = compute_convex_cover(dcel, times_rotated, get_permutation(permutation, seed, times_rotated), merge)
+            result["runs"].append({"configuration": configuration(times_rotated, permutation, seed, merge),
+                                   "faces": faces, **metrics.snapshot()})
+    finally:
+        metrics.disable()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the phases and hot paths of the pipeline.")
+    parser.add_argument("instance_files", nargs="+")
+    parser.add_argument("--rotations", type=int, nargs="+", default=[0, 1, 2, 3], choices=range(4))
+    parser.add_argument("--permutation", default="sort_on_yx", choices=PERMUTATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--merge", default="hertel_mehlhorn", choices=MERGES)
+    parser.add_argument("--no-memory", action="store_true", help="do not trace the peak memory, which is slow")
+    parser.add_argument("--output", help="file to write the metrics to (default: stdout)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance files instead of using the cache")
+    args = parser.parse_args()
+
+    results = []
+    for instance_file in args.instance_files:
+        results.append(measure_instance(instance_file, args.rotations, args.permutation, args.seed, args.merge,
+                                        None if args.no_cache else args.cache_dir, not args.no_memory))
+        if args.output:
+            # Only print a summary if stdout is not used for the metrics themselves
+            result = results[-1]
+            for run in result["runs"]:
+                times = ", ".join(f"{record['phase']} {record['time']:.2f}s" for record in run["phases"])
+                print(f"{result['instance']} (rotated {run['configuration']['rotation']} times): "
+                      f"{run['faces']} faces [{times}]")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        print(json.dumps(results, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Solves a single instance by running a portfolio of configurations (rotation x permutation x merge strategy) on a
+pool of worker processes, and keeps the best convex cover.
+
+Usage (from the repository root):
+    python -m pipeline.portfolio instance_file [--workers N] [--seeds N] [--permutations NAME ...] [--no-cache]
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datastructures.boundary import reflex_flags
+from datastructures.dcel import DCEL
+from datastructures.instance import Instance, load_instance
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from pipeline.cover import compute_convex_cover, get_permutation, PERMUTATIONS, MERGES
+
+# Instance and stop event of the worker process, set by init_worker, and the DCEL of the instance, built on first use
+worker_instance = None
+worker_stop = None
+worker_dcel = None
+
+
+def init_worker(instance, stop):
+    global worker_instance, worker_stop, worker_dcel
+    worker_instance = instance
+    worker_stop = stop
+    worker_dcel = None
+
+
+def run_configuration(configuration):
+    """
+    Runs a single configuration in a worker process. Returns the number of faces and the solution, or None if the
+    portfolio was stopped in the meantime.
+    """
+    global worker_dcel
+    times_rotated, permutation, seed, merge = configuration
+    if worker_stop.is_set():
+        return None
+    if worker_dcel is None:
+        worker_dcel = DCEL.from_instance(worker_instance)
+    else:
+        worker_dcel.reset()
+    faces = compute_convex_cover(worker_dcel, times_rotated, get_permutation(permutation, seed, times_rotated),
+                                 merge, stop=worker_stop)
+    if faces is None:
+        return None
+    return faces, worker_dcel.format_solution()
+
+
+def configurations(rotations=range(4), permutations=("sort_on_yx",), seeds=1, merges=("hertel_mehlhorn",)):
+    """
+    Returns all combinations of rotation, permutation, seed and merge strategy. Seeds other than 0 are only used
+    for the random permutation, as the other permutations are deterministic.
+    """
+    return [(times_rotated, permutation, seed, merge)
+            for permutation in permutations
+            for seed in (range(seeds) if permutation == "random" else [0])
+            for merge in merges
+            for times_rotated in rotations]
+
+
+def lower_bound(instance: Instance):
+    """
+    Returns a lower bound on the number of pieces in any convex cover of the polygon: a convex polygon without holes
+    needs one piece, a polygon with a reflex vertex at least two, and a polygon with a hole at least three (every
+    piece misses the hole, so it lies on one side of a line through the hole, and two such pieces leave a gap).
+    The bound is trivial, so a portfolio only exits early with it on convex or near-convex inputs: on other
+    polygons no cover reaches it and all configurations are run.
+    """
+    if len(instance.offsets) > 2:
+        return 3
+    return 2 if any(reflex_flags(instance.x, instance.y, instance.offsets)) else 1
+
+
+def solve_portfolio(instance: Instance, configurations, workers=None, bound=None, verbose=False):
+    """
+    Runs all configurations on a process pool and returns the best solution together with its number of faces and
+    configuration. As soon as a solution matches the lower bound (bound, or lower_bound(instance) if not given) the
+    remaining configurations are cancelled, and running ones stop within their current stage, which frees their
+    workers.
+    """
+    if bound is None:
+        bound = lower_bound(instance)
+
+    best_faces = float("inf")
+    best_solution = None
+    best_configuration = None
+    with multiprocessing.Manager() as manager:
+        stop = manager.Event()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(instance, stop)) as executor:
+            futures = {executor.submit(run_configuration, c): c for c in configurations}
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                faces, solution = result
+                if verbose:
+                    print(f"{futures[future]}: {faces} faces", flush=True)
+                if faces < best_faces:
+                    best_faces, best_solution, best_configuration = faces, solution, futures[future]
+                if best_faces <= bound:
+                    stop.set()
+                    for f in futures:
+                        f.cancel()
+                    break
+
+    return best_faces, best_solution, best_configuration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve an instance with a parallel portfolio of configurations.")
+    parser.add_argument("instance_file")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--seeds", type=int, default=1, help="number of seeds for the random permutation")
+    parser.add_argument("--permutations", nargs="+", choices=PERMUTATIONS, default=["sort_on_yx"])
+    parser.add_argument("--merges", nargs="+", choices=MERGES, default=["hertel_mehlhorn"])
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance file instead of using the cache")
+    args = parser.parse_args()
+
+    # A cached instance is memory-mapped by every worker instead of being copied to it
+    if args.no_cache:
+        instance = load_instance(args.instance_file)
+    else:
+        instance = load_cached_instance(args.instance_file, args.cache_dir)
+
+    start = time.perf_counter()
+    faces, solution, configuration = solve_portfolio(
+        instance, configurations(range(4), args.permutations, args.seeds, args.merges), args.workers, verbose=args.verbose)
+    times_rotated, permutation, seed, merge = configuration
+    print(f"{instance.name} (rotated {times_rotated} times, {permutation}, seed {seed}, {merge}) - "
+          f"Faces: {faces} [{time.perf_counter() - start:.1f}s]")
+
+    solution["instance"] = instance.name
+    solution["type"] = instance.type
+    with open(args.instance_file.replace("instance.json", "result.json"), "w") as f:
+        f.write(json.dumps(solution))
+
+
+if __name__ == "__main__":
+    main()
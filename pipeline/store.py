@@ -0,0 +1,220 @@
+"""
+On-disk store of computed convex covers.
+
+The store keeps two kinds of entries:
+    results: the solution of every (instance, configuration) pair that has been computed, addressed by the SHA-256
+        hash of the instance file and a hash of the configuration and of the source code of the pipeline, such
+        that a changed instance or a changed algorithm never returns a stale result.
+    best: per instance name, the solution with the fewest faces found so far, with its configuration.
+
+Every entry is a small JSON file with the number of faces and the configuration, next to a file with the same name
+and the extension .bin that holds the solution in the binary solution format (see datastructures.solution), which is
+memory-mapped when it is read. A best entry is only updated under an exclusive lock on a third file with the
+extension .lock, and read under a shared lock, such that concurrent batch workers never replace a better solution
+by a worse one or read the JSON file of one update with the solution of another.
+
+Usage (from the repository root), to list the best known face counts:
+    python -m pipeline.store [--store-dir DIR]
+"""
+import argparse
+import contextlib
+import fcntl
+import glob
+import hashlib
+import json
+import os
+from datastructures.instance_cache import file_hash
+from datastructures.solution import Solution, write_solution_binary, read_solution_binary
+
+DEFAULT_STORE_DIR = os.path.join(".cache", "store")
+# The modules whose source determines the outcome of compute_convex_cover, all data structures are included such
+# that modules the DCEL comes to depend on (like datastructures/boundary.py) are never missed
+PIPELINE_SOURCES = ["algorithms/*.py", "datastructures/*.py", "pipeline/cover.py"]
+
+pipeline_hash_value = None
+
+
+def pipeline_hash():
+    """
+    Returns a hash of the source code of the pipeline, computed once per process.
+    """
+    global pipeline_hash_value
+    if pipeline_hash_value is None:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        h = hashlib.sha256()
+        for pattern in PIPELINE_SOURCES:
+            for path in sorted(glob.glob(os.path.join(root, pattern))):
+                h.update(os.path.relpath(path, root).encode("utf-8"))
+                with open(path, "rb") as f:
+                    h.update(f.read())
+        pipeline_hash_value = h.hexdigest()
+    return pipeline_hash_value
+
+
+def configuration(times_rotated, permutation, seed=0, merge="hertel_mehlhorn", merge_indirect=True):
+    """
+    Returns the configuration of a run of compute_convex_cover as a dict. The seed only matters for the random
+    permutation and is set to 0 for the others, such that their results are shared between seeds.
+    """
+    return {
+        "rotation": times_rotated,
+        "permutation": permutation,
+        "seed": seed if permutation == "random" else 0,
+        "merge": merge,
+        "merge_indirect": merge_indirect,
+    }
+
+
+def configuration_key(configuration):
+    text = json.dumps([configuration, pipeline_hash()], sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def write_json(path, data):
+    """
+    Writes data to path through a temporary file, such that readers never see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def solution_path(path):
+    """
+    Returns the path of the binary solution file of the entry in the JSON file path.
+    """
+    return path[:-len(".json")] + ".bin"
+
+
+def write_entry(path, entry, solution: Solution):
+    """
+    Writes the entry and its solution, the solution first, such that an entry that can be read has a solution.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_solution_binary(solution_path(path), solution)
+    write_json(path, entry)
+
+
+def read_entry(path):
+    """
+    Returns the entry in the JSON file path with the key solution set to its Solution, or None.
+    """
+    entry = read_json(path)
+    if entry is None:
+        return None
+    try:
+        entry["solution"] = read_solution_binary(solution_path(path))
+    except (FileNotFoundError, ValueError):
+        return None
+    return entry
+
+
+@contextlib.contextmanager
+def locked(path, exclusive=False):
+    """
+    Holds a lock on the lock file of the entry in the JSON file path while the block runs, exclusive or shared.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path[:-len(".json")] + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ResultStore:
+    """
+    The store in the directory root, see the module documentation.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+
+    def result_path(self, instance_hash, configuration):
+        return os.path.join(self.root, "results", instance_hash[:2], instance_hash,
+                            configuration_key(configuration) + ".json")
+
+    def best_path(self, name):
+        return os.path.join(self.root, "best", name + ".json")
+
+    def get(self, instance_hash, configuration):
+        """
+        Returns the number of faces and the solution (a Solution) computed before for the instance and configuration,
+        or None.
+        """
+        entry = read_entry(self.result_path(instance_hash, configuration))
+        if entry is None:
+            return None
+        return entry["faces"], entry["solution"]
+
+    def put(self, instance_hash, configuration, faces, solution: Solution):
+        write_entry(self.result_path(instance_hash, configuration),
+                    {"configuration": configuration, "faces": faces}, solution)
+
+    def best(self, name, instance_hash=None):
+        """
+        Returns the best known entry of the instance (with keys instance_hash, faces, configuration and solution, a
+        Solution), or None. If instance_hash is given, entries for a different version of the instance are ignored.
+        """
+        path = self.best_path(name)
+        if not os.path.exists(path):
+            return None
+        with locked(path):
+            entry = read_entry(path)
+        if entry is None or instance_hash and entry["instance_hash"] != instance_hash:
+            return None
+        return entry
+
+    def update_best(self, name, instance_hash, faces, configuration, solution: Solution):
+        """
+        Stores the solution as the best known one if it has fewer faces than the current best known solution of
+        the instance. Returns whether it did. The comparison and the update happen under one exclusive lock.
+        """
+        path = self.best_path(name)
+        with locked(path, exclusive=True):
+            best = read_entry(path)
+            if best is not None and best["instance_hash"] == instance_hash and best["faces"] <= faces:
+                return False
+            write_entry(path, {"instance_hash": instance_hash, "faces": faces, "configuration": configuration},
+                        solution)
+        return True
+
+    def best_entries(self):
+        """
+        Returns the best known entries of all instances (without their solutions), by instance name.
+        """
+        entries = {}
+        for path in sorted(glob.glob(os.path.join(self.root, "best", "*.json"))):
+            entry = read_json(path)
+            if entry is not None:
+                entries[os.path.basename(path)[:-len(".json")]] = entry
+        return entries
+
+
+def instance_hash(instance_file):
+    return file_hash(instance_file).hex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the best known convex covers in the result store.")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+
+    entries = ResultStore(args.store_dir).best_entries()
+    for name, entry in entries.items():
+        c = entry["configuration"]
+        print(f"{name}: {entry['faces']} faces (rotated {c['rotation']} times, {c['permutation']}, "
+              f"seed {c['seed']}, {c['merge']})")
+    print(f"Total score: {sum(entry['faces'] for entry in entries.values())} ({len(entries)} instances)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,20 @@
+import argparse
+import json
+import math
 from PIL import Image, ImageDraw
+from datastructures.solution import Solution, is_binary_solution, read_solution_binary
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Default maximum number of pixels of a tiled rendering, and the maximum width and height of a tile
+MAX_PIXELS = 2 ** 26
+TILE_SIZE = 4096
+# Rings with more vertices are filled band by band, in bands of this many pixel rows
+BANDED_FILL_SIZE = 1000
+BAND_HEIGHT = 64
 
 
 def render_polygon(polygon, solution={"polygons": []}, resolution=10, name="polygon_drawing", lines=[], points=[]):
@@ -61,3 +77,222 @@ def render_polygon(polygon, solution={"polygons": []}, resolution=10, name="poly
         img1.ellipse([(p[0]-resolution, p[1]-resolution),
                      (p[0]+resolution, p[1]+resolution)], fill="black")
     img.save(name + ".png")
+
+
+def coordinate(c):
+    # Coordinates of solutions can be fractions
+    return c["num"] / c["den"] if isinstance(c, dict) else c
+
+
+def flatten(rings):
+    """
+    Returns the x and y coordinates of the points of all rings one after another, and the offsets of the rings:
+    ring i consists of the points offsets[i], ..., offsets[i + 1] - 1.
+    """
+    xs, ys, offsets = [], [], [0]
+    for ring in rings:
+        xs.extend(coordinate(p["x"]) for p in ring)
+        ys.extend(coordinate(p["y"]) for p in ring)
+        offsets.append(len(xs))
+    return xs, ys, offsets
+
+
+class PixelRings:
+    """
+    Rings in pixel coordinates, with the bounding box of every ring. The coordinates are transformed in a single
+    pass over all rings, vectorized if NumPy is installed.
+    """
+
+    def __init__(self, xs, ys, offsets, min_x, min_y, scale, height):
+        self.offsets = offsets
+        # The coordinates and the edges by band of large rings, see bands
+        self.band_edges = {}
+        if np is not None:
+            self.x = (np.asarray(xs, dtype=np.float64) - min_x) * scale
+            self.y = height - (np.asarray(ys, dtype=np.float64) - min_y) * scale
+            starts = np.asarray(self.offsets[:-1], dtype=np.int64)
+            if len(starts) and len(self.x):
+                self.boxes = np.stack([np.minimum.reduceat(self.x, starts), np.minimum.reduceat(self.y, starts),
+                                       np.maximum.reduceat(self.x, starts), np.maximum.reduceat(self.y, starts)],
+                                      axis=1).tolist()
+            else:
+                self.boxes = []
+        else:
+            self.x = [(x - min_x) * scale for x in xs]
+            self.y = [height - (y - min_y) * scale for y in ys]
+            self.boxes = []
+            for i in range(len(self.offsets) - 1):
+                start, end = self.offsets[i], self.offsets[i + 1]
+                x, y = self.x[start:end], self.y[start:end]
+                self.boxes.append((min(x), min(y), max(x), max(y)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def points(self, i, left, top):
+        """
+        Returns the flat list of pixel coordinates of ring i relative to the corner (left, top) of a tile.
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if np is not None:
+            return np.stack([self.x[start:end] - left, self.y[start:end] - top], axis=1).ravel().tolist()
+        return [c for x, y in zip(self.x[start:end], self.y[start:end]) for c in (x - left, y - top)]
+
+    def ring(self, i):
+        """
+        Returns the lists of pixel coordinates of ring i.
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if np is not None:
+            return self.x[start:end].tolist(), self.y[start:end].tolist()
+        return self.x[start:end], self.y[start:end]
+
+    def bands(self, i):
+        """
+        Returns the lists of pixel coordinates of ring i and its edges by band: edge k (from point k to point k + 1)
+        is in band j if it intersects the pixel rows from j * BAND_HEIGHT - 1 to (j + 1) * BAND_HEIGHT, the rows of
+        the band and one more on each side.
+        """
+        if i not in self.band_edges:
+            x, y = self.ring(i)
+            m = len(y)
+            edges = {}
+            for k in range(m):
+                # k + 1 - m is the index of the next point, also for the last point
+                low, high = min(y[k], y[k + 1 - m]), max(y[k], y[k + 1 - m])
+                for j in range(int((low - 1) // BAND_HEIGHT), int((high + 1) // BAND_HEIGHT) + 1):
+                    edges.setdefault(j, []).append(k)
+            self.band_edges[i] = x, y, edges
+        return self.band_edges[i]
+
+    def band_points(self, i, j, left, top):
+        """
+        Returns the flat list of pixel coordinates (relative to (left, top)) of ring i clipped to band j and the row
+        on each side of it. Where the ring leaves the clipped rows it comes back on the same side, so the parts in
+        between are joined by horizontal edges along the outer rows.
+        """
+        x, y, edges = self.bands(i)
+        m = len(y)
+        a, b = j * BAND_HEIGHT - 1, (j + 1) * BAND_HEIGHT + 1
+        points = []
+        for k in edges[j]:
+            x0, y0, x1, y1 = x[k], y[k], x[k + 1 - m], y[k + 1 - m]
+            t0, t1 = 0, 1
+            if y0 != y1:
+                ta, tb = (a - y0) / (y1 - y0), (b - y0) / (y1 - y0)
+                t0, t1 = max(0, min(ta, tb)), min(1, max(ta, tb))
+            points += [x0 + t0 * (x1 - x0) - left, y0 + t0 * (y1 - y0) - top,
+                       x0 + t1 * (x1 - x0) - left, y0 + t1 * (y1 - y0) - top]
+        return points
+
+    def fill(self, img: Image.Image, i, left, top, fill):
+        """
+        Fills ring i on a tile with the given corner. Filling a polygon takes time proportional to its number of
+        edges times its height in pixels, so large rings are filled band by band, each band only consisting of the
+        edges that intersect it. The horizontal edges that join the parts of the ring in a band would be filled as
+        well, so every band is drawn on a mask with a row to spare on each side, of which only the band is used.
+        """
+        if self.offsets[i + 1] - self.offsets[i] <= BANDED_FILL_SIZE:
+            ImageDraw.Draw(img).polygon(self.points(i, left, top), fill=fill, outline=None)
+            return
+        _, _, bands = self.bands(i)
+        for j in range(int(top // BAND_HEIGHT), int((top + img.height) // BAND_HEIGHT) + 1):
+            if j in bands:
+                points = self.band_points(i, j, left, j * BAND_HEIGHT - 1)
+                if len(points) >= 6:
+                    mask = Image.new("L", (img.width, BAND_HEIGHT + 2), 0)
+                    ImageDraw.Draw(mask).polygon(points, fill=255, outline=None)
+                    img.paste(fill, (0, j * BAND_HEIGHT - top), mask.crop((0, 1, img.width, BAND_HEIGHT + 1)))
+
+    def is_subpixel(self, i):
+        x0, y0, x1, y1 = self.boxes[i]
+        return x1 - x0 < 1 and y1 - y0 < 1
+
+    def by_tile(self, tile_size, columns, rows):
+        """
+        Returns for every tile (by row and column) the indices of the rings whose bounding box intersects it.
+        """
+        tiles = {}
+        for i, (x0, y0, x1, y1) in enumerate(self.boxes):
+            for row in range(max(0, int(y0 // tile_size)), min(rows - 1, int(y1 // tile_size)) + 1):
+                for column in range(max(0, int(x0 // tile_size)), min(columns - 1, int(x1 // tile_size)) + 1):
+                    tiles.setdefault((row, column), []).append(i)
+        return tiles
+
+
+def render_tiled(polygon, solution={"polygons": []}, name="polygon_drawing", max_pixels=MAX_PIXELS,
+                 tile_size=TILE_SIZE, resolution=10):
+    """
+    Renders the polygon and solution like render_polygon, but in bounded memory, for huge polygons and solutions.
+    The solution can also be a Solution (see datastructures.solution), whose arrays are used as they are.
+    The resolution (pixels per unit) is lowered such that the image has at most max_pixels pixels, and an image
+    larger than tile_size in either dimension is split into tiles of at most tile_size x tile_size pixels, which are
+    rendered one at a time and saved as name_<row>_<column>.png (or name.png if there is a single tile). Every tile
+    only draws the rings that intersect it, and pieces smaller than a pixel are drawn as a single pixel. Returns the
+    names of the files written.
+    """
+    outer = polygon["outer_boundary"]
+    min_x, max_x = min(p["x"] for p in outer), max(p["x"] for p in outer)
+    min_y, max_y = min(p["y"] for p in outer), max(p["y"] for p in outer)
+    area = max(max_x - min_x, 1) * max(max_y - min_y, 1)
+    scale = min(resolution, math.sqrt(max_pixels / area))
+    width = max(1, math.ceil((max_x - min_x) * scale))
+    height = max(1, math.ceil((max_y - min_y) * scale))
+
+    boundaries = PixelRings(*flatten([outer] + polygon["holes"]), min_x, min_y, scale, height)
+    if isinstance(solution, Solution):
+        pieces = PixelRings(solution.x, solution.y, solution.offsets, min_x, min_y, scale, height)
+    else:
+        pieces = PixelRings(*flatten(solution["polygons"]), min_x, min_y, scale, height)
+    columns, rows = math.ceil(width / tile_size), math.ceil(height / tile_size)
+    boundaries_by_tile = boundaries.by_tile(tile_size, columns, rows)
+    pieces_by_tile = pieces.by_tile(tile_size, columns, rows)
+
+    files = []
+    for row in range(rows):
+        for column in range(columns):
+            left, top = column * tile_size, row * tile_size
+            img = Image.new("RGB", (min(tile_size, width - left), min(tile_size, height - top)), "white")
+            draw = ImageDraw.Draw(img)
+            # The outer boundary is ring 0, the holes follow
+            tile_boundaries = boundaries_by_tile.get((row, column), [])
+            for i in tile_boundaries:
+                boundaries.fill(img, i, left, top, "#eeeeff" if i == 0 else "white")
+            for i in pieces_by_tile.get((row, column), []):
+                if pieces.is_subpixel(i):
+                    draw.point(pieces.points(i, left, top)[:2], fill="red")
+                else:
+                    draw.polygon(pieces.points(i, left, top), fill="#ffeeee", outline="red")
+            for i in tile_boundaries:
+                draw.polygon(boundaries.points(i, left, top), fill=None, outline="blue")
+            file = f"{name}.png" if rows == columns == 1 else f"{name}_{row}_{column}.png"
+            # Tiles are large, and compressing them harder takes much longer for little gain
+            img.save(file, compress_level=1)
+            files.append(file)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render an instance and its solution in bounded memory.")
+    parser.add_argument("instance_file")
+    parser.add_argument("result_file", nargs="?", help="solution (JSON or binary) to draw on top of the instance")
+    parser.add_argument("--name", default="polygon_drawing", help="name of the image files")
+    parser.add_argument("--max-pixels", type=int, default=MAX_PIXELS)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--resolution", type=float, default=10, help="maximum number of pixels per unit")
+    args = parser.parse_args()
+
+    with open(args.instance_file, "r") as f:
+        polygon = json.load(f)
+    solution = {"polygons": []}
+    if args.result_file and is_binary_solution(args.result_file):
+        solution = read_solution_binary(args.result_file)
+    elif args.result_file:
+        with open(args.result_file, "r") as f:
+            solution = json.load(f)
+    files = render_tiled(polygon, solution, args.name, args.max_pixels, args.tile_size, args.resolution)
+    print(f"Wrote {len(files)} file(s): {files[0]}{' ...' if len(files) > 1 else ''}")
+
+
+if __name__ == "__main__":
+    main()
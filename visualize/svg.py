@@ -0,0 +1,175 @@
+"""
+Streams an instance and its convex pieces to an SVG file, without building the drawing in memory first.
+
+Usage (from the repository root):
+    python -m visualize.svg instance_file [result_file] [--output FILE] [--viewport MIN_X MIN_Y MAX_X MAX_Y]
+                            [--cache-dir DIR | --no-cache]
+
+Without a result file the pieces are computed with the default pipeline and written straight from the faces of the
+DCEL. The result file can be a JSON or a binary solution file (see datastructures.solution). With a viewport only
+that region is exported: pieces that do not intersect it are skipped and the boundary rings are clipped to it, so a
+region of a huge instance can be exported quickly.
+"""
+import argparse
+import json
+from datastructures.dcel import DCEL, FaceType
+from datastructures.instance import Instance, load_instance
+from datastructures.instance_cache import load_cached_instance, DEFAULT_CACHE_DIR
+from datastructures.solution import is_binary_solution, load_solution
+from pipeline.cover import compute_convex_cover, get_permutation
+
+# Number of elements that are written to the file at once
+CHUNK_SIZE = 1000
+# Width of the lines relative to the largest dimension of the drawing
+STROKE_WIDTH = 1 / 2000
+
+
+def coordinate(c):
+    # Coordinates of solutions can be fractions
+    return c["num"] / c["den"] if isinstance(c, dict) else c
+
+
+def solution_pieces(solution):
+    """
+    Yields the pieces of a solution in the output format (as written by DCEL.format_solution) as lists of points.
+    """
+    for polygon in solution["polygons"]:
+        yield [(coordinate(p["x"]), coordinate(p["y"])) for p in polygon]
+
+
+def dcel_pieces(dcel: DCEL):
+    """
+    Yields the interior faces of the DCEL as lists of points, without building the solution first.
+    """
+    for f in dcel.faces:
+        if f.type == FaceType.INTERIOR:
+            e = f.outer_component
+            points = [(e.origin.x, e.origin.y)]
+            e = e.next
+            while e != f.outer_component:
+                points.append((e.origin.x, e.origin.y))
+                e = e.next
+            yield points
+
+
+def instance_rings(instance: Instance):
+    """
+    Yields the boundary rings of the instance as lists of points, the outer boundary first.
+    """
+    for ring in instance.rings():
+        yield [(instance.x[i], instance.y[i]) for i in ring]
+
+
+def intersects(points, viewport):
+    min_x, min_y, max_x, max_y = viewport
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs) <= max_x and max(xs) >= min_x and min(ys) <= max_y and max(ys) >= min_y
+
+
+def clip(points, viewport):
+    """
+    Clips the polygon to the viewport with the Sutherland-Hodgman algorithm. The result covers the same part of the
+    viewport, but it might have edges along the sides of the viewport that were not in the polygon.
+    """
+    min_x, min_y, max_x, max_y = viewport
+    # Every side as a function telling whether a point is inside, and one intersecting an edge with the side
+    sides = [
+        (lambda p: p[0] >= min_x, lambda p, q: (min_x, p[1] + (q[1] - p[1]) * (min_x - p[0]) / (q[0] - p[0]))),
+        (lambda p: p[0] <= max_x, lambda p, q: (max_x, p[1] + (q[1] - p[1]) * (max_x - p[0]) / (q[0] - p[0]))),
+        (lambda p: p[1] >= min_y, lambda p, q: (p[0] + (q[0] - p[0]) * (min_y - p[1]) / (q[1] - p[1]), min_y)),
+        (lambda p: p[1] <= max_y, lambda p, q: (p[0] + (q[0] - p[0]) * (max_y - p[1]) / (q[1] - p[1]), max_y)),
+    ]
+    for inside, intersection in sides:
+        if not points:
+            break
+        clipped = []
+        previous = points[-1]
+        for point in points:
+            if inside(point):
+                if not inside(previous):
+                    clipped.append(intersection(previous, point))
+                clipped.append(point)
+            elif inside(previous):
+                clipped.append(intersection(previous, point))
+            previous = point
+        points = clipped
+    return points
+
+
+def path_data(rings):
+    """
+    Returns the SVG path data of the rings, with y negated such that the y-axis points upwards.
+    """
+    return " ".join("M" + " L".join(f"{x:.15g} {-y:.15g}" for x, y in ring) + " Z" for ring in rings)
+
+
+def write_svg(svg_file, instance: Instance, pieces=(), viewport=None):
+    """
+    Writes the instance and the pieces (lists of points, e.g. from solution_pieces or dcel_pieces) to svg_file,
+    piece by piece and in chunks of CHUNK_SIZE elements. If a viewport (min_x, min_y, max_x, max_y) is given, only
+    that region is exported. Returns the number of pieces written.
+    """
+    if viewport is None:
+        rings = list(instance_rings(instance))
+        min_x, min_y = min(x for x, _ in rings[0]), min(y for _, y in rings[0])
+        max_x, max_y = max(x for x, _ in rings[0]), max(y for _, y in rings[0])
+    else:
+        rings = [clip(ring, viewport) for ring in instance_rings(instance) if intersects(ring, viewport)]
+        rings = [ring for ring in rings if ring]
+        min_x, min_y, max_x, max_y = viewport
+    width, height = max(max_x - min_x, 1), max(max_y - min_y, 1)
+    stroke_width = max(width, height) * STROKE_WIDTH
+
+    count = 0
+    with open(svg_file, "w") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{min_x:.15g} {-max_y:.15g} {width:.15g} {height:.15g}">\n')
+        if rings:
+            # The holes are cut out of the outer boundary by the even-odd rule
+            f.write(f'<path d="{path_data(rings)}" fill="#eeeeff" fill-rule="evenodd" stroke="blue" '
+                    f'stroke-width="{stroke_width:g}"/>\n')
+        f.write(f'<g fill="#ffeeee" fill-opacity="0.5" stroke="red" stroke-width="{stroke_width:g}">\n')
+        chunk = []
+        for points in pieces:
+            if viewport is not None and not intersects(points, viewport):
+                continue
+            chunk.append(f'<polygon points="{" ".join(f"{x:.15g},{-y:.15g}" for x, y in points)}"/>\n')
+            count += 1
+            if len(chunk) == CHUNK_SIZE:
+                f.write("".join(chunk))
+                chunk = []
+        f.write("".join(chunk))
+        f.write("</g>\n</svg>\n")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an instance and its convex pieces to SVG.")
+    parser.add_argument("instance_file")
+    parser.add_argument("result_file", nargs="?", help="solution to export (default: computed with the pipeline)")
+    parser.add_argument("--output", help="SVG file to write (default: the instance file with .svg)")
+    parser.add_argument("--viewport", type=float, nargs=4, metavar=("MIN_X", "MIN_Y", "MAX_X", "MAX_Y"))
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="directory of the binary instance cache")
+    parser.add_argument("--no-cache", action="store_true", help="parse the instance file instead of using the cache")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        instance = load_instance(args.instance_file)
+    else:
+        instance = load_cached_instance(args.instance_file, args.cache_dir)
+    if args.result_file and is_binary_solution(args.result_file):
+        pieces = load_solution(args.result_file).pieces()
+    elif args.result_file:
+        with open(args.result_file, "r") as f:
+            pieces = solution_pieces(json.load(f))
+    else:
+        dcel = DCEL.from_instance(instance)
+        compute_convex_cover(dcel, 0, get_permutation("sort_on_yx"))
+        pieces = dcel_pieces(dcel)
+    svg_file = args.output or args.instance_file.replace(".instance.json", "") + ".svg"
+    count = write_svg(svg_file, instance, pieces, args.viewport)
+    print(f"Wrote {count} pieces to {svg_file}")
+
+
+if __name__ == "__main__":
+    main()